@@ -0,0 +1,88 @@
+"""
+Memory accounting for a session's state.
+
+Measures the objects reachable from a session's schedule and XPath values
+with sys.getsizeof, counting every object once, so strings shared through
+interning or across entries are not double counted.
+"""
+import sys
+from array import array
+from collections import deque
+from typing import Dict, Optional, Set
+
+from history import History, Snapshot
+from recurrence import Recurrence
+from schedule import _MINUTES, Entry, Schedule
+
+
+def deep_size(obj, seen: Set[int]) -> int:
+    """
+    Return the size of an object and everything it references.
+
+    Args:
+        obj: Object to measure
+        seen: IDs of objects already counted; updated in place
+
+    Returns:
+        Size in bytes of the objects not counted before
+    """
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key, seen) + deep_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif isinstance(obj, (Entry, Recurrence, Snapshot)):
+        size += sum(deep_size(getattr(obj, slot), seen) for slot in type(obj).__slots__)
+    elif isinstance(obj, (str, bytes, int, float, bool, array)) or obj is None:
+        pass
+    elif hasattr(obj, '__dict__'):
+        size += deep_size(vars(obj), seen)
+    return size
+
+
+def session_report(schedule: Schedule, xpath_values: Dict[str, str],
+                   history: Optional[History] = None) -> Dict[str, float]:
+    """
+    Break down the memory held by one session's state.
+
+    Sections are measured in order and share one ``seen`` set, so a course
+    name is charged to the entries that first reference it and not again
+    to the course list or XPath mapping. The per-minute ints every schedule
+    shares are process-wide and not charged to the session.
+
+    Args:
+        schedule: Session schedule
+        xpath_values: Session XPath values
+        history: Session undo history; measured last, so only what it does
+            not share with the live state is charged to it
+
+    Returns:
+        Mapping with bytes for entries, day index, courses, xpath_values,
+        yaml_cache, history and total, plus entry count and bytes_per_entry
+    """
+    seen: Set[int] = {id(minute) for minute in _MINUTES}
+    report = {
+        'entries': deep_size(schedule._entries, seen),
+        'day_index': deep_size(schedule._starts, seen) + deep_size(schedule._ids, seen)
+        + deep_size(schedule._day_versions, seen),
+        'courses': deep_size(schedule._courses, seen) + deep_size(schedule._refs, seen),
+        'xpath_values': deep_size(xpath_values, seen),
+        'yaml_cache': deep_size(schedule._yaml_cache, seen),
+        'history': deep_size(history, seen) if history is not None else 0,
+    }
+    report['total'] = sum(report.values())
+    report['entry_count'] = len(schedule)
+    report['bytes_per_entry'] = report['total'] / len(schedule) if len(schedule) else 0.0
+    return report
+
+
+def format_report(report: Dict[str, float]) -> str:
+    """Render a session_report as aligned text lines."""
+    lines = [f"{section:<14} {int(report[section]):>12,} B"
+             for section in ('entries', 'day_index', 'courses', 'xpath_values', 'yaml_cache', 'history',
+                                    'total')]
+    lines.append(f"{int(report['entry_count']):,} entries, {report['bytes_per_entry']:.1f} B/entry")
+    return '\n'.join(lines)
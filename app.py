@@ -195,13 +195,642 @@
 # if __name__ == "__main__":
 #     main()
 
-import streamlit as st
-import yaml
 import os
-from utils import validate_time_format, generate_course_schedule_yaml, generate_xpath_yaml
+import sys
+import time
+import uuid
+from concurrent.futures import TimeoutError as FuturesTimeout
+from datetime import datetime
+from typing import List, Optional
+
+import streamlit as st
+import metrics
+from bundle import build_bundle, xpath_yaml
+from catalog import Catalog, catalog_from_store
+from core import DEFAULT_XPATH, validate_time_format
+from credentials import CredentialStore
+from history import History
+from importer import ImportResult, apply_import, parse_files, unknown_courses
+from metrics import REGISTRY, SIZE_BUCKETS, Rerun, timed_section
+from recurrence import Recurrence
+from schedule import Schedule, ScheduleConflict, XPathValues
+from store import SessionStore
+from xpath_tools import check_xpaths, derive_xpaths, parse_snapshot
+
+PAGE_SIZE = 25
+# SQLite file sessions are persisted to; set SCHEDULE_STORE to an empty value to disable
+STORE_PATH = os.environ.get("SCHEDULE_STORE", "sessions.db")
+# Directory of per-user credential files
+CREDENTIALS_DIR = os.environ.get("CREDENTIALS_DIR", "credentials")
+# Seconds a rerun waits for a credentials write before reporting it as pending
+CREDENTIALS_WAIT = 0.25
+# Seconds the shared course catalog is kept before it is rebuilt from saved sessions
+CATALOG_TTL = float(os.environ.get("CATALOG_TTL", "600"))
+# Seconds a catalog must have been kept before "Refresh catalog" may rebuild it
+CATALOG_MIN_AGE = float(os.environ.get("CATALOG_MIN_AGE", "60"))
+# Catalog courses suggested per lookup
+CATALOG_SUGGESTIONS = 8
+# Edits that can be undone per session
+UNDO_LIMIT = int(os.environ.get("UNDO_LIMIT", "50"))
+# Port of the /metrics sidecar; unset to disable it
+METRICS_PORT = os.environ.get("METRICS_PORT")
+# cProfile dumps of reruns slower than the threshold go here; unset to disable profiling
+PROFILE_OPTIONS = {
+    'profile_dir': os.environ.get("RERUN_PROFILE_DIR") or None,
+    'profile_threshold': float(os.environ.get("RERUN_PROFILE_THRESHOLD", "0.5")),
+}
+# Widgets counted per rerun
+WIDGETS = ('button', 'download_button', 'form_submit_button', 'text_input', 'text_area', 'selectbox',
+           'number_input', 'file_uploader', 'dataframe')
+
+metrics.instrument_widgets(st, WIDGETS)
+
+@st.cache_resource
+def start_metrics_server(port: int):
+    """Serve the metrics registry once per server process."""
+    try:
+        return metrics.serve(port)
+    except OSError as e:
+        st.warning(f"Metrics endpoint not started on port {port}: {e}")
+        return None
+
+@st.cache_resource
+def get_store(path: str) -> SessionStore:
+    """Open the session store once per server process."""
+    return SessionStore(path)
+
+@st.cache_resource(ttl=CATALOG_TTL)
+def get_catalog() -> Catalog:
+    """Build the course catalog from every saved session, once per process until it expires or is refreshed."""
+    if not STORE_PATH:
+        return Catalog()
+    return catalog_from_store(get_store(STORE_PATH))
+
+def catalog_age() -> float:
+    """Seconds since the shared catalog was built."""
+    return time.monotonic() - get_catalog().built
+
+def refresh_catalog():
+    """
+    Drop the cached catalog so the next lookup rebuilds it from the latest saved sessions.
+
+    The catalog is shared by every session, so refreshes within
+    CATALOG_MIN_AGE of the last build are ignored.
+    """
+    if catalog_age() >= CATALOG_MIN_AGE:
+        get_catalog.clear()
+
+def session_id() -> str:
+    """Return this browser session's ID, kept in the URL so a reconnect finds its saved state."""
+    if 'sid' not in st.session_state:
+        sid = st.query_params.get("sid")
+        if not sid:
+            sid = st.query_params["sid"] = uuid.uuid4().hex
+        st.session_state.sid = sid
+    return st.session_state.sid
+
+@timed_section('persist')
+def persist():
+    """Queue the session's schedule and XPaths for writing; returns without touching disk."""
+    record_state_size()
+    if STORE_PATH:
+        get_store(STORE_PATH).save(session_id(), st.session_state.schedule, st.session_state.xpath_values)
+
+def record_state_size():
+    """Observe the session's state size, measured again only after the schedule or XPaths change."""
+    schedule = st.session_state.schedule
+    xpath_values = st.session_state.xpath_values
+    # Undo and restore replace the objects, edits bump their versions
+    version = (id(schedule), schedule.version, id(xpath_values), xpath_values.version)
+    if st.session_state.get('measured_version') != version:
+        st.session_state.measured_version = version
+        # Imported here so reruns that change nothing skip loading the accounting module
+        from accounting import session_report
+        report = session_report(schedule, xpath_values, st.session_state.get('history'))
+        REGISTRY.observe('session_state_bytes', report['total'], buckets=SIZE_BUCKETS)
+
+@st.cache_resource
+def get_credential_store(directory: str) -> CredentialStore:
+    """Open the per-user credential store once per server process."""
+    return CredentialStore(directory)
+
+def credentials_status():
+    """Report the outcome of the last credentials write, waiting briefly for it to finish."""
+    write = st.session_state.get('credentials_write')
+    if write is None:
+        return
+    try:
+        path = write.result(timeout=CREDENTIALS_WAIT)
+    except FuturesTimeout:
+        st.info("Saving credentials in the background...")
+    except Exception as e:
+        st.error(f"Error saving credentials: {str(e)}")
+        del st.session_state.credentials_write
+    else:
+        st.session_state.credentials_saved = True
+        st.success(f"Credentials saved successfully to {path}!")
+        del st.session_state.credentials_write
+
+def restore() -> Optional[tuple]:
+    """Load the saved state for this session's ID, if there is any."""
+    if not STORE_PATH:
+        return None
+    return get_store(STORE_PATH).load(session_id())
+
+def paginate(items: List, key: str, page_size: int = PAGE_SIZE) -> List:
+    """
+    Render page controls for a list and return the items on the current page.
+
+    Args:
+        items: Full list of items to page through
+        key: Widget key prefix for this list
+        page_size: Number of items per page
+
+    Returns:
+        The slice of items on the selected page
+    """
+    pages = max(1, -(-len(items) // page_size))
+    page_key = f"{key}_page"
+    # Clamp the page after removals shrink the list
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages
+
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, key=page_key)
+    start = (page - 1) * page_size
+    if items:
+        st.caption(f"Showing {start + 1}-{min(start + page_size, len(items))} of {len(items)}")
+    return items[start:start + page_size]
+
+def remember(label: str):
+    """Record the session's state after an edit so it can be undone."""
+    st.session_state.history.record(st.session_state.schedule, st.session_state.xpath_values, label)
+
+def step_history(redo: bool = False):
+    """Undo (or redo) the last edit, replacing the session's schedule and XPaths."""
+    history = st.session_state.history
+    step = (history.redo if redo else history.undo)(st.session_state.schedule, st.session_state.xpath_values)
+    if step is None:
+        st.session_state.history_message = "Nothing to redo" if redo else "Nothing to undo"
+        return
+    st.session_state.schedule, st.session_state.xpath_values, label = step
+    # The restored schedule is a new object, so exports cached for the old one must go
+    st.session_state.pop('bundle', None)
+    st.session_state.history_message = f"{'Redone' if redo else 'Undone'}: {label}"
+
+def remove_entry(entry_id: int):
+    """Remove a schedule entry, dropping the course's XPath once it is unused."""
+    schedule = st.session_state.schedule
+    entry = schedule.remove(entry_id)
+    course_name = entry['name']
+
+    # If course is not used anywhere else, drop its xpath value too
+    if not schedule.is_used(course_name):
+        st.session_state.xpath_values.pop(course_name, None)
+    remember(f"Remove {course_name} ({entry.day} {entry.start_time})")
+
+def remove_course(course: str):
+    """Remove a course and its XPath from the XPath section."""
+    st.session_state.schedule.drop_course(course)
+    st.session_state.xpath_values.pop(course, None)
+    remember(f"Remove {course} from the course list")
+
+def fill_from_catalog():
+    """Fill the course form with the picked catalog course and its slot."""
+    choice = st.session_state.get('catalog_choice')
+    if choice is None:
+        return
+    name, slot = choice
+    course = get_catalog().get(name)
+    if course is None:
+        return
+    st.session_state.course_form_name = course.name
+    if slot is not None:
+        st.session_state.course_form_day, st.session_state.course_form_start, \
+            st.session_state.course_form_end = slot[:3]
+    # Applied when the course is added, unless the course already has an XPath
+    st.session_state.catalog_xpath = (course.name, course.xpath)
+
+def describe_catalog_choice(choice: tuple) -> str:
+    name, slot = choice
+    if slot is None:
+        return name
+    return f"{name} · {slot.day} {slot.start_time}-{slot.end_time} ({slot.sessions} using)"
+
+def catalog_picker():
+    """Prefix lookup in the shared course catalog; picking a match fills the course form."""
+    catalog = get_catalog()
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        query = st.text_input("Find in course catalog", key="catalog_query",
+                              placeholder=f"Start of a course name ({len(catalog)} courses)")
+    with col2:
+        st.button("Refresh catalog", on_click=refresh_catalog, disabled=catalog_age() < CATALOG_MIN_AGE,
+                  help="Rebuild the catalog from everyone's latest saved schedules "
+                       f"(at most once every {CATALOG_MIN_AGE:.0f} seconds)")
+    if not query.strip():
+        return
+    matches = catalog.complete(query, CATALOG_SUGGESTIONS)
+    if not matches:
+        st.caption("No catalog course starts with that")
+        return
+    options = [(course.name, slot) for course in matches for slot in (course.slots or (None,))]
+    st.selectbox("Catalog matches", options, index=None, format_func=describe_catalog_choice,
+                 key="catalog_choice", on_change=fill_from_catalog, placeholder="Pick a course and slot")
+
+def fill_xpaths_from_catalog(courses: List[str]):
+    """Give courses without an XPath the catalog's XPath for them."""
+    xpath_values = st.session_state.xpath_values
+    catalog = get_catalog()
+    for course in courses:
+        entry = catalog.get(course)
+        if course not in xpath_values and entry is not None and entry.xpath:
+            xpath_values[course] = entry.xpath
+    remember("Fill XPaths from catalog")
+
+def load_import(uploads: List) -> ImportResult:
+    """Parse uploaded files once per set of uploads and keep the result in the session."""
+    key = tuple(upload.file_id for upload in uploads)
+    cached = st.session_state.get('import_preview')
+    if cached is None or cached[0] != key:
+        result = parse_files([(upload.name, upload.getvalue().decode('utf-8', errors='replace'))
+                              for upload in uploads])
+        cached = st.session_state.import_preview = (key, result)
+    return cached[1]
+
+def import_files(key: tuple, result: ImportResult):
+    """Apply a validated import to the session in a single state update."""
+    st.session_state.import_conflicts = apply_import(
+        result, st.session_state.schedule, st.session_state.xpath_values)
+    st.session_state.imported_key = key
+    remember(f"Import {len(result.rows)} entries")
+
+@st.fragment
+@timed_section('schedule_editor', **PROFILE_OPTIONS)
+def schedule_editor():
+    """Course form, paginated schedule list and YAML export, rerun on their own."""
+    schedule = st.session_state.schedule
+
+    with st.expander("Import Existing Files"):
+        uploads = st.file_uploader("course_details.yaml, course_xpath.yaml or CSV (day, course, start, end, send_message, xpath)",
+                                   type=['yaml', 'yml', 'csv'], accept_multiple_files=True)
+        if uploads:
+            result = load_import(uploads)
+            key = st.session_state.import_preview[0]
+            errors = result.errors + [f"{course}: course is not in the schedule"
+                                      for course in unknown_courses(result, schedule)]
+            if st.session_state.get('imported_key') == key:
+                st.success(f"Imported {len(result.rows)} entries and {len(result.xpath_values)} XPaths")
+                for conflict in st.session_state.get('import_conflicts', []):
+                    st.warning(f"Time slot conflict: {conflict}")
+            elif errors:
+                st.error(f"Found {len(errors)} problem(s), nothing was imported:\n\n"
+                         + "\n".join(f"- {error}" for error in errors))
+            else:
+                st.caption(f"{len(result.rows)} entries and {len(result.xpath_values)} XPaths ready to import")
+                st.button("Import", on_click=import_files, args=(key, result))
+
+    # Course input form in a container for better organization
+    with st.container():
+        st.subheader("Add New Course")
+        catalog_picker()
+        with st.form("course_form"):
+            day = st.selectbox("Select Day", schedule.days, key="course_form_day")
+            course_name = st.text_input("Course Name *", help="This field is required", key="course_form_name")
+            col1, col2 = st.columns(2)
+            with col1:
+                start_time = st.text_input("Start Time (HH:MM) *", placeholder="12:05", key="course_form_start")
+            with col2:
+                end_time = st.text_input("End Time (HH:MM) *", placeholder="13:05", key="course_form_end")
+
+            # Changed checkbox to selectbox with default False
+            send_message = st.selectbox("Send Message", 
+                                        options=[False, True],
+                                        index=0,
+                                        format_func=lambda x: str(x))
+
+            with st.expander("Repeat (optional)"):
+                every_weeks = st.number_input("Every N weeks", min_value=1, value=1, step=1)
+                col1, col2 = st.columns(2)
+                with col1:
+                    first_date = st.date_input("First date", value=None, help="Required for every 2+ weeks")
+                with col2:
+                    last_date = st.date_input("Last date", value=None)
+                skip_dates = st.text_input("Skip dates", placeholder="2026-10-05, 2026-12-21",
+                                           help="Holidays or cancelled classes, as YYYY-MM-DD")
+
+            if st.form_submit_button("Add Course"):
+                if not all([course_name, start_time, end_time]):
+                    st.error("Please fill in all fields")
+                else:
+                    valid_start = validate_time_format(start_time)
+                    valid_end = validate_time_format(end_time)
+
+                    if not valid_start or not valid_end:
+                        st.error("Invalid time format. Please use HH:MM format (e.g., 12:05)")
+                    else:
+                        try:
+                            recurrence = Recurrence.from_fields({
+                                'every_weeks': int(every_weeks), 'start_date': first_date, 'end_date': last_date,
+                                'except': [value for value in skip_dates.replace(',', ' ').split()] or None,
+                            })
+                            schedule.add(day, course_name, valid_start, valid_end, send_message,
+                                         recurrence=recurrence)
+                        except ScheduleConflict as e:
+                            st.error(f"Time slot conflict: {e}")
+                        except ValueError as e:
+                            st.error(str(e))
+                        else:
+                            # A course picked from the catalog brings its XPath along
+                            catalog_xpath = st.session_state.pop('catalog_xpath', None)
+                            if (catalog_xpath and catalog_xpath[0] == course_name and catalog_xpath[1]
+                                    and course_name not in st.session_state.xpath_values):
+                                st.session_state.xpath_values[course_name] = catalog_xpath[1]
+                            remember(f"Add {course_name} on {day}")
+                            st.success(f"Added {course_name} to {day}")
+
+    st.subheader("Current Schedule")
+    st.caption(" · ".join(f"{day}: {schedule.count(day)}" for day in schedule.days))
+    upcoming()
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        day_filter = st.selectbox("Day", ["All days"] + schedule.days, key="schedule_day_filter")
+    with col2:
+        search = st.text_input("Search courses", key="schedule_search").strip().lower()
+
+    days = schedule.days if day_filter == "All days" else [day_filter]
+    rows = [(day, entry_id, course) for day in days for entry_id, course in schedule.entries(day)
+            if search in course['name'].lower()]
+    if not rows:
+        st.info("No matching courses" if search else "No courses scheduled")
+
+    for day, entry_id, course in paginate(rows, "schedule"):
+        col1, col2, col3 = st.columns([3, 1, 1])
+        with col1:
+            st.write(f"📚 {day} · {course['name']}: {course['start_time']} - {course['end_time']} | Notifications: {'✅' if course['send_message'] else '❌'}"
+                     + (f" | {describe_recurrence(course.recurrence)}" if course.recurrence else ""))
+        with col3:
+            # Callbacks run before the fragment reruns, so no st.rerun() is needed
+            st.button(f"Remove", key=f"remove_{entry_id}", on_click=remove_entry, args=(entry_id,))
+
+    # Generate and download YAML
+    if len(schedule):
+        if st.button("Generate Schedule YAML"):
+            with REGISTRY.timer('yaml_seconds', file='course_details.yaml'):
+                yaml_content = schedule.to_yaml()
+            REGISTRY.inc('yaml_bytes_total', len(yaml_content), file='course_details.yaml')
+            st.download_button(
+                label="Download Schedule YAML",
+                data=yaml_content,
+                file_name="course_details.yaml",
+                mime="text/yaml"
+            )
+        bundle_download("schedule_bundle")
+
+    persist()
+
+def describe_recurrence(recurrence: Recurrence) -> str:
+    """Short text for a rule, e.g. "every 2 weeks from 2026-09-07, 1 skipped"."""
+    parts = [f"every {recurrence.every_weeks} weeks" if recurrence.every_weeks > 1 else "weekly"]
+    if recurrence.start:
+        parts.append(f"from {recurrence.start.isoformat()}")
+    if recurrence.end:
+        parts.append(f"until {recurrence.end.isoformat()}")
+    text = " ".join(parts)
+    if recurrence.exceptions:
+        text += f", {len(recurrence.exceptions)} skipped"
+    return text
+
+def upcoming():
+    """
+    Show today's classes and the next one.
+
+    Occurrences are generated lazily, never for a whole term, and only
+    when the schedule or the date changed or the cached next class has
+    started; other reruns reuse the last result.
+    """
+    schedule = st.session_state.schedule
+    if not len(schedule):
+        return
+    now = datetime.now()
+    key = (id(schedule), schedule.version, now.date())
+    cached = st.session_state.get('upcoming')
+    if cached is None or cached[0] != key or (cached[2] is not None and cached[2].start < now):
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        today = ", ".join(f"{o.entry.name} {o.entry.start_time}"
+                          for o in schedule.occurrences(midnight, midnight.replace(hour=23, minute=59)))
+        following = next((occurrence for occurrence in schedule.occurrences(now) if occurrence.start >= now), None)
+        cached = st.session_state.upcoming = (key, today, following)
+    _, today, following = cached
+    text = "Today: " + (today or "no classes")
+    if following:
+        text += f" · Next: {following.entry.name} on {following.start:%a %Y-%m-%d %H:%M}"
+    st.caption(text)
+
+def bundle_download(key: str):
+    """
+    One-click ZIP of both YAML files, their compiled sidecar and a .env
+    template, rebuilt only when the schedule or XPaths change.
+    """
+    schedule = st.session_state.schedule
+    xpath_values = st.session_state.xpath_values
+    version = (id(schedule), schedule.version, tuple((course, xpath_values.get(course)) for course in schedule.courses))
+    cached = st.session_state.get('bundle')
+    if cached is None or cached[0] != version:
+        with REGISTRY.timer('yaml_seconds', file='course_config.zip'):
+            cached = st.session_state.bundle = (version, build_bundle(schedule, xpath_values))
+        REGISTRY.inc('yaml_bytes_total', len(cached[1]), file='course_config.zip')
+    st.download_button("Download Config Bundle (.zip)", data=cached[1], file_name="course_config.zip",
+                       mime="application/zip", key=key,
+                       help="course_details.yaml, course_xpath.yaml, the compiled course_schedule.bin "
+                            "and a .env template in one file")
+
+def load_snapshot(upload):
+    """Parse an uploaded page snapshot once per file and keep the tree in the session."""
+    cached = st.session_state.get('xpath_snapshot')
+    if cached is None or cached[0] != upload.file_id:
+        cached = st.session_state.xpath_snapshot = (upload.file_id, parse_snapshot(upload.getvalue()))
+    return cached[1]
+
+def snapshot_checker(courses: List[str], xpath_values: dict):
+    """Evaluate every course's XPath against an uploaded LMS page and show matches, misses and timings."""
+    with st.expander("Check XPaths Against a Saved Page"):
+        try:
+            import lxml  # noqa: F401
+        except ImportError:
+            st.info("Install lxml to check XPaths against saved pages.")
+            return
+        upload = st.file_uploader("Saved LMS page (.html)", type=['html', 'htm'], key="xpath_snapshot_upload")
+        if not upload:
+            return
+
+        root = load_snapshot(upload)
+        if st.button("Check XPaths"):
+            results = check_xpaths(root, {course: xpath_values.get(course) or DEFAULT_XPATH for course in courses})
+            missing = [result for result in results if result.error or not result.matches]
+            if missing:
+                st.error(f"{len(missing)} of {len(results)} XPath(s) match nothing on this page")
+            else:
+                st.success(f"All {len(results)} XPath(s) match")
+            st.dataframe([{
+                "Course": result.course,
+                "Matches": result.matches,
+                "First match": result.error or result.text,
+                "Time (ms)": round(result.seconds * 1000, 3),
+            } for result in results], use_container_width=True)
+
+        if st.button("Suggest XPaths"):
+            st.session_state.xpath_proposals = (upload.file_id, derive_xpaths(root, courses))
+        proposals = st.session_state.get('xpath_proposals')
+        if proposals and proposals[0] == upload.file_id:
+            proposals = proposals[1]
+            not_found = [course for course in courses if course not in proposals]
+            if not_found:
+                st.warning(f"No link found for: {', '.join(not_found)}")
+            if proposals:
+                st.dataframe([{
+                    "Course": proposal.course,
+                    "Suggested XPath": proposal.xpath,
+                    "Link text": proposal.text,
+                    "Anchored by": proposal.strategy,
+                    "Current XPath": xpath_values.get(proposal.course, ''),
+                } for proposal in proposals.values()], use_container_width=True)
+                st.button("Use Suggested XPaths", on_click=apply_proposals, args=(proposals,))
+
+def apply_proposals(proposals: dict):
+    """Replace the XPaths of the courses that have a suggestion; they go into course_xpath.yaml from here."""
+    for course, proposal in proposals.items():
+        if st.session_state.schedule.has_course(course):
+            st.session_state.xpath_values[course] = sys.intern(proposal.xpath)
+    st.session_state.pop('xpath_proposals', None)
+    remember("Use suggested XPaths")
+
+@st.fragment
+@timed_section('xpath_editor', **PROFILE_OPTIONS)
+def xpath_editor():
+    """XPath form, paginated course list and YAML export, rerun on their own."""
+    schedule = st.session_state.schedule
+    xpath_values = st.session_state.xpath_values
+
+    with st.form("xpath_form"):
+        # Check if there are any courses added to the schedule
+        if not schedule.courses:
+            st.warning("Please add courses in the Course Schedule section first.")
+            course_name = st.text_input("Course Name", disabled=True)
+            xpath_value = st.text_area("Course XPath", disabled=True)
+            st.form_submit_button("Add Course", disabled=True)
+        else:
+            course_name = st.selectbox(
+                "Select Course",
+                options=schedule.courses,
+                help="Select from courses already added to the schedule"
+            )
+            xpath_value = st.text_area("Course XPath", 
+                                   placeholder="/html/body/div[4]/...",
+                                   help="Enter the full XPath for the course")
+
+            if st.form_submit_button("Add Course"):
+                if not xpath_value:
+                    st.error("Please enter the XPath value")
+                else:
+                    # Interned so sessions using the same XPath share one string
+                    xpath_values[course_name] = sys.intern(xpath_value)
+                    remember(f"Set XPath for {course_name}")
+                    st.success(f"Added XPath for {course_name}")
+
+    if schedule.courses:
+        st.subheader("Current Courses")
+        search = st.text_input("Search courses", key="xpath_search").strip().lower()
+        courses = [course for course in schedule.courses if search in course.lower()]
+        if not courses:
+            st.info("No matching courses")
+
+        for course in paginate(courses, "xpath"):
+            col1, col2, col3 = st.columns([2, 2, 1])
+            with col1:
+                st.write(f"Course: {course}")
+            with col2:
+                if course in xpath_values:
+                    st.code(xpath_values[course], language=None)
+            with col3:
+                st.button("Remove", key=f"remove_xpath_{course}", on_click=remove_course, args=(course,))
+
+        catalog = get_catalog()
+        missing = []
+        for course in schedule.courses:
+            entry = catalog.get(course) if course not in xpath_values else None
+            if entry is not None and entry.xpath:
+                missing.append(course)
+        if missing:
+            st.button(f"Fill {len(missing)} missing XPath(s) from the course catalog",
+                      on_click=fill_xpaths_from_catalog, args=(missing,),
+                      help="Uses the XPath most sessions saved for each course")
+
+        snapshot_checker(schedule.courses, xpath_values)
+
+        if st.button("Generate XPath YAML"):
+            with REGISTRY.timer('yaml_seconds', file='course_xpath.yaml'):
+                xpath_content = xpath_yaml(schedule, xpath_values)
+            REGISTRY.inc('yaml_bytes_total', len(xpath_content), file='course_xpath.yaml')
+            st.download_button(
+                label="Download XPath YAML",
+                data=xpath_content,
+                file_name="course_xpath.yaml",
+                mime="text/yaml"
+            )
+        if len(schedule):
+            bundle_download("xpath_bundle")
+
+    persist()
+
+@timed_section('init')
+def init_session():
+    """Initialize session states, restoring saved work when a session reconnects."""
+    if 'schedule' not in st.session_state:
+        restored = restore()
+        if restored:
+            st.session_state.schedule, st.session_state.xpath_values = restored
+        else:
+            st.session_state.schedule = Schedule()
+    if 'active_section' not in st.session_state:
+        st.session_state.active_section = None
+    if 'xpath_values' not in st.session_state:
+        st.session_state.xpath_values = XPathValues()
+    if 'credentials_saved' not in st.session_state:
+        st.session_state.credentials_saved = False
+    if 'history' not in st.session_state:
+        st.session_state.history = History(UNDO_LIMIT)
+        st.session_state.history.record(st.session_state.schedule, st.session_state.xpath_values)
+
+@timed_section('credentials')
+def credentials_form():
+    """Credentials form; the .env file is written off the script thread."""
+    with st.form("credentials_form"):
+        lms_id = st.text_input("LMS ID", type="default", help="Enter your LMS ID/username")
+        password = st.text_input("Password", type="password", help="Enter your password")
+        webhook_url = st.text_input("Webhook URL (optional)",
+                                    help="Notifications for courses with Send Message enabled are posted here")
+
+        if st.form_submit_button("Save Credentials"):
+            if not lms_id or not password:
+                st.error("Please fill in all required fields")
+            else:
+                # Each LMS ID gets its own file, written atomically off the script thread;
+                # timed from before it is queued so time spent waiting counts too
+                start = time.perf_counter()
+                write = get_credential_store(CREDENTIALS_DIR).save(
+                    lms_id, lms_id, password, webhook_url.strip() or None)
+                write.add_done_callback(
+                    lambda _, start=start: REGISTRY.observe('env_write_seconds', time.perf_counter() - start))
+                st.session_state.credentials_write = write
+
+    credentials_status()
 
 def main():
     st.set_page_config(page_title="Course Schedule YAML Generator", layout="wide")
+    if METRICS_PORT:
+        start_metrics_server(int(METRICS_PORT))
 
     st.title("Course Schedule YAML Generator")
     st.markdown("""
@@ -224,208 +853,49 @@ def main():
         if st.button("Configure Credentials", use_container_width=True):
             st.session_state.active_section = "credentials"
 
-    # Initialize session states
-    if 'courses' not in st.session_state:
-        st.session_state.courses = []
-    if 'schedule' not in st.session_state:
-        st.session_state.schedule = {
-            'Monday': [], 'Tuesday': [], 'Wednesday': [],
-            'Thursday': [], 'Friday': []
-        }
-    if 'active_section' not in st.session_state:
-        st.session_state.active_section = None
-    if 'xpath_values' not in st.session_state:
-        st.session_state.xpath_values = {}
-    if 'credentials_saved' not in st.session_state:
-        st.session_state.credentials_saved = False
+    init_session()
 
     # Course Schedule YAML Section
     if st.session_state.active_section == "schedule":
         st.header("Course Schedule Generator")
-
-        # Course input form in a container for better organization
-        with st.container():
-            st.subheader("Add New Course")
-            with st.form("course_form"):
-                day = st.selectbox("Select Day", 
-                                  ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'])
-                course_name = st.text_input("Course Name *", help="This field is required")
-                col1, col2 = st.columns(2)
-                with col1:
-                    start_time = st.text_input("Start Time (HH:MM) *", placeholder="12:05")
-                with col2:
-                    end_time = st.text_input("End Time (HH:MM) *", placeholder="13:05")
-
-                # Changed checkbox to selectbox with default False
-                send_message = st.selectbox("Send Message", 
-                                            options=[False, True],
-                                            index=0,
-                                            format_func=lambda x: str(x))
-
-                if st.form_submit_button("Add Course"):
-                    if not all([course_name, start_time, end_time]):
-                        st.error("Please fill in all fields")
-                    else:
-                        valid_start = validate_time_format(start_time)
-                        valid_end = validate_time_format(end_time)
-
-                        if not valid_start or not valid_end:
-                            st.error("Invalid time format. Please use HH:MM format (e.g., 12:05)")
-                        else:
-                            if course_name not in st.session_state.courses:
-                                st.session_state.courses.append(course_name)
-                            st.session_state.schedule[day].append({
-                                'name': course_name,
-                                'start_time': valid_start,
-                                'end_time': valid_end,
-                                'send_message': send_message
-                            })
-                            st.success(f"Added {course_name} to {day}")
-
-        st.subheader("Current Schedule")
-        for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']:
-            if st.session_state.schedule[day]:
-                with st.expander(f"{day} ({len(st.session_state.schedule[day])} courses)", expanded=True):
-                    for idx, course in enumerate(st.session_state.schedule[day]):
-                        col1, col2, col3 = st.columns([3, 1, 1])
-                        with col1:
-                            st.write(f"📚 {course['name']}: {course['start_time']} - {course['end_time']} | Notifications: {'✅' if course['send_message'] else '❌'}")
-                        with col3:
-                            if st.button(f"Remove", key=f"remove_{day}_{idx}"):
-                                course_name = course['name']
-                                # Remove course from schedule
-                                st.session_state.schedule[day].pop(idx)
-
-                                # Check if course exists in other days
-                                is_used = False
-                                for other_day, courses in st.session_state.schedule.items():
-                                    if any(c['name'] == course_name for c in courses):
-                                        is_used = True
-                                        break
-
-                                # If course is not used anywhere else, remove from courses list and xpath values
-                                if not is_used:
-                                    if course_name in st.session_state.courses:
-                                        st.session_state.courses.remove(course_name)
-                                    if course_name in st.session_state.xpath_values:
-                                        del st.session_state.xpath_values[course_name]
-                                st.rerun()
-                    st.divider()
-            else:
-                st.info(f"No courses scheduled for {day}")
-
-        # Generate and download YAML
-        if any(courses for courses in st.session_state.schedule.values()):
-            if st.button("Generate Schedule YAML"):
-                yaml_content = generate_course_schedule_yaml(st.session_state.schedule)
-                st.download_button(
-                    label="Download Schedule YAML",
-                    data=yaml_content,
-                    file_name="course_details.yaml",
-                    mime="text/yaml"
-                )
+        schedule_editor()
 
     # XPath YAML Section
     elif st.session_state.active_section == "xpath":
         st.header("Course XPath Generator")
         st.info("Note: Course names must match exactly with those used in the course schedule YAML file.")
-
-        with st.form("xpath_form"):
-            # Check if there are any courses added to the schedule
-            if not st.session_state.courses:
-                st.warning("Please add courses in the Course Schedule section first.")
-                course_name = st.text_input("Course Name", disabled=True)
-                xpath_value = st.text_area("Course XPath", disabled=True)
-                st.form_submit_button("Add Course", disabled=True)
-            else:
-                course_name = st.selectbox(
-                    "Select Course",
-                    options=st.session_state.courses,
-                    help="Select from courses already added to the schedule"
-                )
-                xpath_value = st.text_area("Course XPath", 
-                                       placeholder="/html/body/div[4]/...",
-                                       help="Enter the full XPath for the course")
-
-                if st.form_submit_button("Add Course"):
-                    if not xpath_value:
-                        st.error("Please enter the XPath value")
-                    else:
-                        st.session_state.xpath_values[course_name] = xpath_value
-                        st.success(f"Added XPath for {course_name}")
-
-        if st.session_state.courses:
-            st.subheader("Current Courses")
-            courses_to_remove = []
-            for i, course in enumerate(st.session_state.courses):
-                col1, col2, col3 = st.columns([2, 2, 1])
-                with col1:
-                    st.write(f"Course: {course}")
-                with col2:
-                    if course in st.session_state.xpath_values:
-                        st.text_area("XPath", value=st.session_state.xpath_values[course], 
-                                   key=f"xpath_view_{i}", disabled=True)
-                with col3:
-                    if st.button("Remove", key=f"remove_xpath_{i}"):
-                        courses_to_remove.append(course)
-
-            if courses_to_remove:
-                for course in courses_to_remove:
-                    if course in st.session_state.courses:
-                        st.session_state.courses.remove(course)
-                    if course in st.session_state.xpath_values:
-                        del st.session_state.xpath_values[course]
-                st.rerun()
-
-            if st.button("Generate XPath YAML"):
-                xpath_content = generate_xpath_yaml(courses=st.session_state.courses)
-                st.download_button(
-                    label="Download XPath YAML",
-                    data=xpath_content,
-                    file_name="course_xpath.yaml",
-                    mime="text/yaml"
-                )
+        xpath_editor()
 
     # New Credentials Section
     elif st.session_state.active_section == "credentials":
         st.header("Configure Credentials")
-        st.info("Enter your credentials to generate the .env file")
-
-        with st.form("credentials_form"):
-            lms_id = st.text_input("LMS ID", type="default", help="Enter your LMS ID/username")
-            password = st.text_input("Password", type="password", help="Enter your password")
+        st.info("Enter your credentials to generate your .env file")
+        credentials_form()
+
+
+    # Undo/redo and reset buttons
+    history = st.session_state.history
+    if st.session_state.active_section or history.can_undo or history.can_redo:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.button("Undo", on_click=step_history, help=f"Revert the last change (up to {history.limit})")
+        with col2:
+            st.button("Redo", on_click=step_history, kwargs={'redo': True}, help="Apply an undone change again")
+        with col3:
+            if st.session_state.active_section and st.button("Reset All", help="Can be undone"):
+                st.session_state.schedule = Schedule()
+                st.session_state.active_section = None
+                st.session_state.xpath_values = XPathValues()
+                st.session_state.pop('bundle', None)
+                st.session_state.credentials_saved = False
+                remember("Reset All")
+                st.rerun()
+    message = st.session_state.pop('history_message', None)
+    if message:
+        st.toast(message)
 
-            if st.form_submit_button("Save Credentials"):
-                if not lms_id or not password:
-                    st.error("Please fill in all required fields")
-                else:
-                    # Create .env file content
-                    env_content = f"""lmsid={lms_id}
-password={password}
-webhookurl=null"""
-
-                    # Write to .env file
-                    try:
-                        with open(".env", "w") as f:
-                            f.write(env_content)
-                        st.session_state.credentials_saved = True
-                        st.success("Credentials saved successfully!")
-                    except Exception as e:
-                        st.error(f"Error saving credentials: {str(e)}")
-
-
-    # Reset button
-    if st.session_state.active_section:
-        if st.button("Reset All"):
-            st.session_state.courses = []
-            st.session_state.schedule = {
-                'Monday': [], 'Tuesday': [], 'Wednesday': [],
-                'Thursday': [], 'Friday': []
-            }
-            st.session_state.active_section = None
-            st.session_state.xpath_values = {}
-            st.session_state.credentials_saved = False
-            st.rerun()
+    persist()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with Rerun(**PROFILE_OPTIONS):
+        main()
\ No newline at end of file
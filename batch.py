@@ -0,0 +1,235 @@
+"""
+Headless batch generation of course schedule and XPath YAML bundles.
+
+Reads a roster (CSV, JSON or JSON lines) with one row per scheduled course
+and writes a ``course_details.yaml`` / ``course_xpath.yaml`` pair for every
+student, without starting Streamlit, plus the compiled
+``course_schedule.bin`` sidecar consumers can map instead of parsing YAML.
+
+Usage:
+    python batch.py roster.csv output_dir [--workers N]
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import deque
+from itertools import groupby
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from compiled import compile_schedule, write_compiled
+from core import describe_conflict, generate_xpath_yaml, parse_bool, validate_time_format
+from recurrence import Recurrence, fields_from_row
+from schedule import Schedule
+
+ROSTER_FIELDS = ['student', 'day', 'course', 'start', 'end', 'send_message', 'xpath',
+                 'every_weeks', 'start_date', 'end_date', 'except']
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+RosterRow = Tuple[int, Dict[str, str]]
+
+
+def read_roster(path: str) -> Iterator[RosterRow]:
+    """
+    Stream rows from a roster file.
+
+    CSV and JSON lines files are read one row at a time; a ``.json`` file
+    holding a single array is loaded in full.
+
+    Args:
+        path: Path to a ``.csv``, ``.jsonl`` or ``.json`` roster
+
+    Yields:
+        Tuples of (line number, row dict)
+    """
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, newline='', encoding='utf-8') as f:
+        if ext == '.csv':
+            reader = csv.DictReader(f)
+            missing = [field for field in ('student', 'day', 'course', 'start', 'end')
+                       if field not in (reader.fieldnames or [])]
+            if missing:
+                raise ValueError(f"Roster is missing columns: {', '.join(missing)}")
+            for row in reader:
+                yield reader.line_num, row
+        elif ext == '.jsonl':
+            for line_no, line in enumerate(f, start=1):
+                if line.strip():
+                    yield line_no, json.loads(line)
+        elif ext == '.json':
+            for idx, row in enumerate(json.load(f), start=1):
+                yield idx, row
+        else:
+            raise ValueError(f"Unsupported roster format: {path}")
+
+
+def iter_students(rows: Iterable[RosterRow]) -> Iterator[Tuple[str, List[RosterRow]]]:
+    """
+    Group roster rows by student.
+
+    Rows for one student must be contiguous so that only a single student's
+    rows are held in memory at a time.
+
+    Args:
+        rows: Rows as produced by read_roster
+
+    Yields:
+        Tuples of (student, rows for that student)
+    """
+    seen = set()
+    for student, group in groupby(rows, key=lambda item: str(item[1].get('student') or '').strip()):
+        if student in seen:
+            raise ValueError(f"Rows for student '{student}' are not contiguous in the roster")
+        seen.add(student)
+        yield student, list(group)
+
+
+def student_dir_name(student: str) -> str:
+    """
+    Return a filesystem-safe directory name for a student.
+
+    The readable part is sanitized; the hash keeps students whose IDs
+    sanitize to the same text apart, as credentials.user_file_name does.
+    """
+    safe = re.sub(r'[^\w.-]+', '_', student).strip('._') or 'student'
+    digest = hashlib.sha256(student.encode('utf-8')).hexdigest()[:12]
+    return f"{safe[:64]}-{digest}"
+
+
+def build_student_bundle(student: str, rows: List[RosterRow], output_dir: str) -> Dict:
+    """
+    Validate one student's rows and write their YAML bundle.
+
+    Args:
+        student: Student identifier
+        rows: The student's roster rows
+        output_dir: Directory that receives one sub-directory per student
+
+    Returns:
+        Summary dict with the student, bundle path (None if nothing was
+        written), entry count and row errors
+    """
+    errors = []
+    if not student:
+        return {'student': student, 'path': None, 'entries': 0,
+                'errors': [f"line {line_no}: missing student" for line_no, _ in rows]}
+
+    schedule = Schedule()
+    xpath_values = {}
+    for line_no, row in rows:
+        day = str(row.get('day') or '').strip().capitalize()
+        course_name = str(row.get('course') or '').strip()
+        start_time = validate_time_format(str(row.get('start') or '').strip())
+        end_time = validate_time_format(str(row.get('end') or '').strip())
+        send_message = parse_bool(row.get('send_message'))
+
+        if day not in schedule.days:
+            errors.append(f"line {line_no}: unknown day '{row.get('day')}'")
+        elif not course_name:
+            errors.append(f"line {line_no}: missing course name")
+        elif not start_time or not end_time:
+            errors.append(f"line {line_no}: invalid time format")
+        elif send_message is None:
+            errors.append(f"line {line_no}: invalid send_message '{row.get('send_message')}'")
+        else:
+            try:
+                recurrence = Recurrence.from_fields(fields_from_row(row))
+                # Overlaps are collected for the whole student below
+                schedule.add(day, course_name, start_time, end_time, send_message, allow_conflicts=True,
+                             recurrence=recurrence)
+            except ValueError as e:
+                errors.append(f"line {line_no}: {e}")
+                continue
+            xpath = str(row.get('xpath') or '').strip()
+            if xpath:
+                xpath_values[course_name] = xpath
+
+    errors.extend(describe_conflict(*conflict) for conflict in schedule.conflicts())
+    if not len(schedule):
+        # Nothing valid to write; an empty bundle would look like a real one
+        errors.append("no valid rows, bundle not written")
+        return {'student': student, 'path': None, 'entries': 0, 'errors': errors}
+
+    bundle_dir = os.path.join(output_dir, student_dir_name(student))
+    os.makedirs(bundle_dir, exist_ok=True)
+    details_yaml = schedule.to_yaml()
+    xpath_yaml = generate_xpath_yaml(schedule.courses, xpath_values)
+    with open(os.path.join(bundle_dir, 'course_details.yaml'), 'w', encoding='utf-8') as f:
+        f.write(details_yaml)
+    with open(os.path.join(bundle_dir, 'course_xpath.yaml'), 'w', encoding='utf-8') as f:
+        f.write(xpath_yaml)
+    write_compiled(bundle_dir, compile_schedule(schedule, xpath_values, details_yaml, xpath_yaml))
+
+    return {'student': student, 'path': bundle_dir,
+            'entries': len(schedule), 'errors': errors}
+
+
+def _bounded_map(executor: 'Executor', items: Iterable[Tuple[str, List[RosterRow]]],
+                 output_dir: str, window: int) -> Iterator[Dict]:
+    # Keep at most `window` students in flight so memory does not grow with the roster
+    pending = deque()
+    for student, rows in items:
+        pending.append(executor.submit(build_student_bundle, student, rows, output_dir))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def generate_bundles(roster_path: str, output_dir: str, workers: int = 1) -> Iterator[Dict]:
+    """
+    Generate a YAML bundle for every student in a roster.
+
+    Args:
+        roster_path: Path to the roster file
+        output_dir: Directory that receives one sub-directory per student
+        workers: Number of worker processes; 1 runs in-process and 0 uses
+            every available core
+
+    Yields:
+        Per-student summaries in roster order
+    """
+    students = iter_students(read_roster(roster_path))
+    if workers == 1:
+        for student, rows in students:
+            yield build_student_bundle(student, rows, output_dir)
+        return
+
+    # Imported here so single-process runs skip loading multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from _bounded_map(executor, students, output_dir, window=workers * 4)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate course YAML bundles for a student roster.")
+    parser.add_argument('roster', help="Roster file (.csv, .json or .jsonl) with columns: "
+                                       + ', '.join(ROSTER_FIELDS))
+    parser.add_argument('output_dir', help="Directory to write one bundle per student into")
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help="Worker processes (0 = all cores, default 1)")
+    args = parser.parse_args(argv)
+
+    written = 0
+    failed = 0
+    for summary in generate_bundles(args.roster, args.output_dir, workers=args.workers):
+        if summary['path'] is not None:
+            written += 1
+        for error in summary['errors']:
+            print(f"{summary['student'] or '<no student>'}: {error}", file=sys.stderr)
+        if summary['errors']:
+            failed += 1
+
+    print(f"Wrote {written} bundle(s) to {args.output_dir}; {failed} student(s) with errors")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
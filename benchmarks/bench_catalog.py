@@ -0,0 +1,90 @@
+"""
+Course catalog build time and per-keystroke lookup cost.
+
+Generates saved sessions that draw their courses from a shared pool,
+builds a catalog.Catalog from them, then types course names one character
+at a time and times Catalog.complete() against a linear scan over every
+catalog course, checking both return the same courses.
+
+Usage:
+    python benchmarks/bench_catalog.py [--sessions 2000] [--pool 5000] [--per-session 12]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import Catalog, normalize
+from core import DAYS
+
+SUBJECTS = ('Linear Algebra', 'Calculus', 'Organic Chemistry', 'Microeconomics', 'Statistics', 'Physics',
+            'Data Structures', 'Operating Systems', 'Modern History', 'Molecular Biology')
+
+
+def sessions(count: int, pool: int, per_session: int, rnd: random.Random) -> List[tuple]:
+    """Saved sessions as store.SessionStore.scan() yields them, minus the session ID."""
+    names = [f"{SUBJECTS[i % len(SUBJECTS)]} {100 + i // len(SUBJECTS)}" for i in range(pool)]
+    # Popular courses are shared by many sessions, most are rare
+    weights = [1 / (rank + 1) for rank in range(pool)]
+    index = {name: i for i, name in enumerate(names)}
+    result = []
+    for _ in range(count):
+        days = {}
+        xpath_values = {}
+        for name in set(rnd.choices(names, weights, k=per_session)):
+            i = index[name]
+            hour = 8 + i % 10
+            days.setdefault(DAYS[i % 5], []).append([name, f"{hour:02d}:00", f"{hour:02d}:50", False])
+            xpath_values[name] = f"//a[@data-course='{i}']"
+        result.append((days, xpath_values))
+    return result
+
+
+def scan(courses: List, prefix: str, limit: int) -> List:
+    """What a lookup costs without an index: test every course."""
+    key = normalize(prefix)
+    matches = [course for course in courses if normalize(course.name).startswith(key)]
+    matches.sort(key=lambda course: (-course.sessions, normalize(course.name)))
+    return matches[:limit]
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Time course catalog builds and prefix lookups.")
+    parser.add_argument('--sessions', type=int, default=2000, help="Saved sessions (default 2000)")
+    parser.add_argument('--pool', type=int, default=5000, help="Distinct course names (default 5000)")
+    parser.add_argument('--per-session', type=int, default=12, help="Courses per session (default 12)")
+    parser.add_argument('--queries', type=int, default=200, help="Course names typed (default 200)")
+    args = parser.parse_args(argv)
+
+    rnd = random.Random(0)
+    saved = sessions(args.sessions, args.pool, args.per_session, rnd)
+    start = time.perf_counter()
+    catalog = Catalog.build(saved)
+    print(f"Built catalog of {len(catalog):,} courses from {args.sessions:,} sessions "
+          f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    courses = list(catalog)
+    typed = [course.name for course in rnd.sample(courses, min(args.queries, len(courses)))]
+    prefixes = [name[:length] for name in typed for length in range(1, len(name) + 1)]
+
+    start = time.perf_counter()
+    indexed = [catalog.complete(prefix, 8) for prefix in prefixes]
+    indexed_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    scanned = [scan(courses, prefix, 8) for prefix in prefixes]
+    scan_seconds = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(indexed, scanned)
+                     if sorted(c.sessions for c in a) != sorted(c.sessions for c in b))
+    print(f"{len(prefixes):,} keystrokes: indexed {indexed_seconds * 1e6 / len(prefixes):.1f} us, "
+          f"scan {scan_seconds * 1e6 / len(prefixes):.1f} us per lookup "
+          f"({scan_seconds / indexed_seconds:.0f}x); {mismatches} mismatches")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Consumer startup and "next class" lookups: YAML vs the compiled sidecar.
+
+Writes a bundle per user (YAML files plus course_schedule.bin), then times
+what a consumer does on start: parse both YAML files, or map the sidecar
+after checking it against the YAML hash. Lookups compare
+recurrence.next_occurrence over parsed entries with
+CompiledSchedule.next_class on the mapped file.
+
+Usage:
+    python benchmarks/bench_compiled.py [--users 200] [--courses 20] [--lookups 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiled import COMPILED_FILE, compile_schedule, open_compiled, write_compiled
+from core import DAYS, generate_xpath_yaml
+from importer import parse_schedule_yaml, parse_xpath_yaml
+from recurrence import next_occurrence
+from schedule import Entry, Schedule
+
+
+def write_bundles(directory: str, users: int, courses: int) -> List[str]:
+    paths = []
+    for i in range(users):
+        schedule = Schedule()
+        xpath_values = {}
+        for n in range(courses):
+            hour = 8 + n // len(DAYS)
+            schedule.add(DAYS[n % len(DAYS)], f"Course {n}", f"{hour:02d}:00", f"{hour:02d}:50", n % 2 == 0)
+            xpath_values[f"Course {n}"] = f"//a[.='Course {n}']"
+        path = os.path.join(directory, f"user{i:04d}")
+        os.makedirs(path)
+        details, xpaths = schedule.to_yaml(), generate_xpath_yaml(schedule.courses, xpath_values)
+        with open(os.path.join(path, 'course_details.yaml'), 'w', encoding='utf-8') as f:
+            f.write(details)
+        with open(os.path.join(path, 'course_xpath.yaml'), 'w', encoding='utf-8') as f:
+            f.write(xpaths)
+        write_compiled(path, compile_schedule(schedule, xpath_values, details, xpaths))
+        paths.append(path)
+    return paths
+
+
+def load_yaml(path: str):
+    with open(os.path.join(path, 'course_details.yaml'), encoding='utf-8') as f:
+        schedule = parse_schedule_yaml(f.read())
+    with open(os.path.join(path, 'course_xpath.yaml'), encoding='utf-8') as f:
+        xpaths = parse_xpath_yaml(f.read())
+    entries = [Entry(course, day, int(start[:2]) * 60 + int(start[3:]), int(end[:2]) * 60 + int(end[3:]), send,
+                     rule) for day, course, start, end, send, rule in schedule.rows]
+    return entries, xpaths.xpath_values
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare YAML and compiled schedule loading.")
+    parser.add_argument('--users', type=int, default=200, help="Bundles to load (default 200)")
+    parser.add_argument('--courses', type=int, default=20, help="Entries per bundle (default 20)")
+    parser.add_argument('--lookups', type=int, default=20000, help="next-class lookups to time (default 20000)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_bundles(directory, args.users, args.courses)
+        yaml_bytes = sum(os.path.getsize(os.path.join(path, name)) for path in paths
+                         for name in ('course_details.yaml', 'course_xpath.yaml'))
+        compiled_bytes = sum(os.path.getsize(os.path.join(path, COMPILED_FILE)) for path in paths)
+        print(f"{args.users} bundles x {args.courses} entries: YAML {yaml_bytes / args.users:.0f} B, "
+              f"sidecar {compiled_bytes / args.users:.0f} B per bundle")
+
+        start = time.perf_counter()
+        parsed = [load_yaml(path) for path in paths]
+        yaml_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        tables = [open_compiled(path) for path in paths]
+        compiled_seconds = time.perf_counter() - start
+        assert all(table is not None for table in tables)
+        print(f"Load all: YAML {yaml_seconds * 1000:.1f} ms, compiled (hash check + mmap) "
+              f"{compiled_seconds * 1000:.1f} ms ({yaml_seconds / compiled_seconds:.1f}x)")
+
+        rnd = random.Random(0)
+        base = datetime(2026, 9, 7)
+        queries = [(rnd.randrange(args.users), base + timedelta(minutes=rnd.randrange(7 * 24 * 60)))
+                   for _ in range(args.lookups)]
+        start = time.perf_counter()
+        expected = [next_occurrence(parsed[user][0], now) for user, now in queries]
+        objects_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        found = [tables[user].next_class(now) for user, now in queries]
+        table_seconds = time.perf_counter() - start
+        mismatches = sum(1 for want, got in zip(expected, found) if (want.start, want.end) != got[:2])
+        print(f"next class x{args.lookups}: entries {objects_seconds * 1e6 / args.lookups:.1f} us, "
+              f"compiled {table_seconds * 1e6 / args.lookups:.1f} us per lookup; {mismatches} mismatches")
+        for table in tables:
+            table.close()
+        return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Memory and time of undo history over a long edit session.
+
+Starts from a schedule of ``--entries`` entries and applies ``--edits``
+random edits (add, remove, set XPath), recording
+each one. The structurally shared History is compared with the naive
+approach of keeping a deep copy of the schedule and XPaths per edit, both
+bounded to the same number of steps. Memory is measured with
+accounting.deep_size after the live state, so only what the history does
+not share with the session is charged to it; undoing every step back is
+checked against the states seen.
+
+Usage:
+    python benchmarks/bench_history.py [--entries 200,2000] [--edits 2000] [--limit 50]
+"""
+import argparse
+import copy
+import os
+import random
+import sys
+import time
+from collections import deque
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from accounting import deep_size
+from core import DAYS, DEFAULT_XPATH
+from history import History
+from schedule import _MINUTES, Schedule, XPathValues
+
+
+def initial_schedule(entries: int, courses: int) -> Schedule:
+    schedule = Schedule()
+    for i in range(entries):
+        start = (i * 7) % (23 * 60)
+        schedule.add(DAYS[i % len(DAYS)], f"Course {i % courses}", f"{start // 60:02d}:{start % 60:02d}",
+                     f"{(start + 45) // 60:02d}:{(start + 45) % 60:02d}", i % 2 == 0, allow_conflicts=True)
+    return schedule
+
+
+def edit(rnd: random.Random, schedule: Schedule, xpath_values: dict, courses: int) -> None:
+    """Apply one random edit the way the app does."""
+    roll = rnd.random()
+    if roll < 0.5 or not len(schedule):
+        start = rnd.randrange(23 * 60)
+        schedule.add(rnd.choice(DAYS), f"Course {rnd.randrange(courses)}", f"{start // 60:02d}:{start % 60:02d}",
+                     f"{(start + 45) // 60:02d}:{(start + 45) % 60:02d}", False, allow_conflicts=True)
+    elif roll < 0.85:
+        name = schedule.remove(rnd.choice(list(schedule._entries))).name
+        if not schedule.is_used(name):
+            xpath_values.pop(name, None)
+    elif schedule.courses:
+        xpath_values[rnd.choice(schedule.courses)] = sys.intern(DEFAULT_XPATH)
+
+
+def state_text(schedule: Schedule, xpath_values: dict) -> str:
+    return schedule.to_yaml() + repr(sorted(xpath_values.items()))
+
+
+def run(entries: int, edits: int, limit: int, courses: int, naive: bool, seed: int = 0) -> tuple:
+    """
+    Replay one edit session, keeping history one way or the other.
+
+    Returns:
+        (bytes the history retains, mean seconds to record an edit, history,
+        texts of the undoable states, final schedule, final XPaths)
+    """
+    rnd = random.Random(seed)
+    schedule = initial_schedule(entries, courses)
+    xpath_values = XPathValues()
+    history = deque(maxlen=limit) if naive else History(limit)
+    states = deque([state_text(schedule, xpath_values)], maxlen=limit + 1)
+    elapsed = 0.0
+    for i in range(edits + 1):
+        if i:
+            edit(rnd, schedule, xpath_values, courses)
+        start = time.perf_counter()
+        if naive:
+            history.append(copy.deepcopy((schedule, xpath_values)))
+            changed = True
+        else:
+            changed = history.record(schedule, xpath_values, f"edit {i}")
+        elapsed += time.perf_counter() - start
+        if changed and not naive:
+            states.append(state_text(schedule, xpath_values))
+    seen = {id(minute) for minute in _MINUTES}
+    deep_size((schedule, xpath_values), seen)
+    return deep_size(history, seen), elapsed / (edits + 1), history, list(states), schedule, xpath_values
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare structurally shared undo history with deep copies.")
+    parser.add_argument('--entries', default='200,2000', help="Comma-separated starting sizes (default 200,2000)")
+    parser.add_argument('--edits', type=int, default=2000, help="Edits per session (default 2000)")
+    parser.add_argument('--limit', type=int, default=50, help="Undo steps kept (default 50)")
+    parser.add_argument('--courses', type=int, default=40, help="Distinct courses (default 40)")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for entries in [int(n) for n in args.entries.split(',') if n.strip()]:
+        shared, shared_seconds, history, states, schedule, xpath_values = run(
+            entries, args.edits, args.limit, args.courses, naive=False)
+        copies, copy_seconds, *_ = run(entries, args.edits, args.limit, args.courses, naive=True)
+        print(f"{entries:,} entries, {args.edits:,} edits, {args.limit} steps kept:")
+        print(f"  deep copies  {copies / 1e6:8.2f} MB  {copy_seconds * 1e6:8.1f} us/edit")
+        print(f"  shared       {shared / 1e6:8.2f} MB  {shared_seconds * 1e6:8.1f} us/edit  "
+              f"({copies / max(shared, 1):.0f}x less memory)")
+
+        # Undo every kept step and compare with the states recorded on the way
+        undone = 0
+        for expected in reversed(states[:-1]):
+            step = history.undo(schedule, xpath_values)
+            if step is None:
+                break
+            schedule, xpath_values, _ = step
+            undone += 1
+            if state_text(schedule, xpath_values) != expected:
+                failures += 1
+        print(f"  undid {undone} steps, {failures} mismatches")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
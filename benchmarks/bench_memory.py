@@ -0,0 +1,101 @@
+"""
+Memory per session: original dict-based schedule vs the compact one.
+
+Builds the same schedule twice, once in the layout Schedule used before
+entries became slotted records (a dict per entry, (start, ID) tuples and
+span tuples per entry, fresh strings from every form submission), and once
+with Schedule, and reports the memory each retains as measured by
+tracemalloc, plus the accounting.session_report breakdown.
+
+Usage:
+    python benchmarks/bench_memory.py [--entries 1000,10000] [--courses 40]
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from accounting import format_report, session_report
+from core import DAYS, DEFAULT_XPATH
+from schedule import Schedule
+
+
+def form_rows(entries: int, courses: int) -> List[tuple]:
+    """Rows as a form would submit them; every string is a separate object."""
+    rows = []
+    for i in range(entries):
+        start = (i * 7) % (23 * 60)
+        end = start + 45
+        rows.append((DAYS[i % len(DAYS)], ''.join(['Course ', str(i % courses)]),
+                     ''.join([f"{start // 60:02d}", ':', f"{start % 60:02d}"]),
+                     ''.join([f"{end // 60:02d}", ':', f"{end % 60:02d}"]), i % 2 == 0))
+    return rows
+
+
+def form_xpaths(courses: int) -> Dict[str, str]:
+    """XPaths as typed per course: the same long path, each a separate string."""
+    return {''.join(['Course ', str(i)]): ''.join([DEFAULT_XPATH[:-7], 'span[3]']) for i in range(courses)}
+
+
+def build_legacy(rows: List[tuple], xpaths: Dict[str, str]) -> tuple:
+    """The dict-per-entry layout the schedule used before this change."""
+    days = {day: {} for day in DAYS}
+    order = {day: [] for day in DAYS}
+    spans, entry_days, refs, course_list = {}, {}, {}, {}
+    for entry_id, (day, name, start_time, end_time, send_message) in enumerate(rows, start=1):
+        days[day][entry_id] = {'name': name, 'start_time': start_time, 'end_time': end_time,
+                               'send_message': send_message}
+        start = int(start_time[:2]) * 60 + int(start_time[3:])
+        order[day].append((start, entry_id))
+        spans[entry_id] = (start, int(end_time[:2]) * 60 + int(end_time[3:]))
+        entry_days[entry_id] = day
+        refs[name] = refs.get(name, 0) + 1
+        course_list[name] = None
+    return days, order, spans, entry_days, refs, course_list, dict(xpaths)
+
+
+def build_compact(rows: List[tuple], xpaths: Dict[str, str]) -> tuple:
+    schedule = Schedule()
+    for day, name, start_time, end_time, send_message in rows:
+        schedule.add(day, name, start_time, end_time, send_message, allow_conflicts=True)
+    return schedule, {sys.intern(course): sys.intern(xpath) for course, xpath in xpaths.items()}
+
+
+def retained(build: Callable[[], object]) -> tuple:
+    """Return (result, bytes still allocated once build returns)."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare session memory of the old and compact schedule.")
+    parser.add_argument('--entries', default='1000,10000', help="Comma-separated entry counts (default 1000,10000)")
+    parser.add_argument('--courses', type=int, default=40, help="Distinct courses (default 40)")
+    args = parser.parse_args(argv)
+
+    # Warm up the shared per-minute tables so they are not charged to the first session
+    build_compact(form_rows(10, 2), {})
+    for entries in [int(n) for n in args.entries.split(',') if n.strip()]:
+        rows = form_rows(entries, args.courses)
+        xpaths = form_xpaths(args.courses)
+        _, legacy = retained(lambda: build_legacy(rows, xpaths))
+        (schedule, xpath_values), compact = retained(lambda: build_compact(rows, xpaths))
+        print(f"{entries:,} entries: original {legacy / 1e6:.2f} MB ({legacy / entries:.0f} B/entry), "
+              f"compact {compact / 1e6:.2f} MB ({compact / entries:.0f} B/entry), "
+              f"{1 - compact / legacy:.0%} smaller")
+        print(format_report(session_report(schedule, xpath_values)))
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+Overhead of the in-process metrics registry.
+
+Times the registry operations the app performs on every rerun (counter
+increments, histogram observations, section timers and counted widget
+calls) so their cost can be compared with a rerun's total time.
+
+Usage:
+    python benchmarks/bench_metrics.py [--calls 200000]
+"""
+import argparse
+import os
+import sys
+import time
+import types
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import Registry, Rerun, instrument_widgets, section
+
+
+def per_call(fn: Callable[[], object], calls: int) -> float:
+    """Return the mean seconds per call of ``fn``."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark metrics registry overhead.")
+    parser.add_argument('--calls', type=int, default=200000, help="Calls per operation (default 200000)")
+    args = parser.parse_args(argv)
+
+    registry = Registry()
+    widgets = types.SimpleNamespace(button=lambda label: False)
+    plain = widgets.button
+    instrument_widgets(widgets, ('button',))
+
+    def timed() -> None:
+        with registry.timer('section_seconds', section='bench'):
+            pass
+
+    def timed_section() -> None:
+        with section('bench', registry=registry):
+            pass
+
+    results = {
+        'inc': per_call(lambda: registry.inc('yaml_bytes_total', 512, file='course_details.yaml'), args.calls),
+        'observe': per_call(lambda: registry.observe('rerun_seconds', 0.01, kind='app'), args.calls),
+        'timer': per_call(timed, args.calls),
+        'widget (plain)': per_call(lambda: plain('Add'), args.calls),
+    }
+    with Rerun(registry):
+        results['widget (counted)'] = per_call(lambda: widgets.button('Add'), args.calls)
+        results['section in rerun'] = per_call(timed_section, args.calls)
+    results['rerun (empty)'] = per_call(lambda: Rerun(registry).__enter__().__exit__(None, None, None),
+                                        args.calls // 10)
+
+    for name, seconds in results.items():
+        print(f"{name:<20} {seconds * 1e6:7.2f} us")
+    started = time.perf_counter()
+    text = registry.to_prometheus()
+    print(f"Prometheus render    {(time.perf_counter() - started) * 1000:7.2f} ms ({len(text):,} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
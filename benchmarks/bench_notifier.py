@@ -0,0 +1,119 @@
+"""
+Throughput and latency of the webhook notifier against a local stub server.
+
+Starts a keep-alive HTTP/1.1 stub on localhost that can add latency and
+fail a share of requests with 503, fires events for many users through a
+Notifier and reports requests sent, connections opened, retries,
+throughput and delivery latency.
+
+Usage:
+    python benchmarks/bench_notifier.py [--users 200] [--events 5000] [--window 0.2]
+        [--server-latency 0.01] [--failure-rate 0.05]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from notifier import Notifier
+from scheduler import JOIN, LEAVE, ClassEvent
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency: float, failure_rate: float):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self.events = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.server.latency)
+        failed = random.random() < self.server.failure_rate
+        with self.server.lock:
+            self.server.requests += 1
+            if not failed:
+                self.server.events += body.count(b'\\n') + 1
+        self.send_response(503 if failed else 204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+async def run(args: argparse.Namespace, server: StubServer) -> Notifier:
+    url = f"http://127.0.0.1:{server.server_port}/hook"
+    notifier = Notifier(lambda user: f"{url}/{user}", window=args.window, base_delay=0.05)
+    rng = random.Random(0)
+    blocked = 0.0
+    # Spread the events over about a second, several users firing at the same moment
+    for i in range(args.events):
+        event = ClassEvent(f"user{rng.randrange(args.users)}", rng.choice([JOIN, LEAVE]), 'Monday',
+                           f"Course {i % 10}", '09:00', '10:00', True)
+        start = time.perf_counter()
+        notifier.notify(event)
+        blocked = max(blocked, time.perf_counter() - start)
+        if i % 50 == 0:
+            await asyncio.sleep(0.01)
+    await notifier.close()
+    notifier.max_notify_seconds = blocked
+    return notifier
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the webhook notifier against a stub server.")
+    parser.add_argument('--users', type=int, default=200, help="Distinct webhooks (default 200)")
+    parser.add_argument('--events', type=int, default=5000, help="Events to send (default 5000)")
+    parser.add_argument('--window', type=float, default=0.2, help="Coalescing window in seconds (default 0.2)")
+    parser.add_argument('--server-latency', type=float, default=0.01, help="Stub response delay (default 0.01)")
+    parser.add_argument('--failure-rate', type=float, default=0.05, help="Share of 503 responses (default 0.05)")
+    args = parser.parse_args(argv)
+
+    server = StubServer(args.server_latency, args.failure_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        start = time.perf_counter()
+        notifier = asyncio.run(run(args, server))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.shutdown()
+
+    print(f"{args.events:,} events -> {server.requests:,} requests ({notifier.sent:,} batches delivered, "
+          f"{notifier.retries} retries, {notifier.failed} failed) over {server.connections} connection(s)")
+    print(f"{server.events:,} events delivered in {elapsed:.2f} s ({server.events / elapsed:,.0f} events/s)")
+    print(f"Batch latency p50 {percentile(notifier.latencies, 50) * 1000:.0f} ms, "
+          f"p95 {percentile(notifier.latencies, 95) * 1000:.0f} ms, "
+          f"p99 {percentile(notifier.latencies, 99) * 1000:.0f} ms; "
+          f"slowest notify() call {notifier.max_notify_seconds * 1e6:.0f} us")
+    return 0 if notifier.failed == 0 and server.events == args.events else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
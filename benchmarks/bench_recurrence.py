@@ -0,0 +1,78 @@
+"""
+Lazy recurrence expansion vs materializing a term.
+
+Builds a schedule with a mix of weekly, alternate-week and term-bounded
+entries and times answering "what's next" and "what's on today" through the
+lazy occurrence generators, against expanding every occurrence of the term
+up front and searching that list.
+
+Usage:
+    python benchmarks/bench_recurrence.py [--entries 5000] [--weeks 16]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import DAYS
+from recurrence import Recurrence
+from schedule import Schedule
+
+TERM_START = date(2026, 9, 7)
+
+
+def build(entries: int, weeks: int) -> Schedule:
+    rng = random.Random(0)
+    term_end = TERM_START + timedelta(weeks=weeks)
+    schedule = Schedule()
+    for i in range(entries):
+        start = rng.randrange(7 * 60, 21 * 60)
+        rule = rng.choice([None,
+                           Recurrence(2, TERM_START + timedelta(weeks=rng.randrange(2))),
+                           Recurrence(start=TERM_START, end=term_end,
+                                      exceptions=[TERM_START + timedelta(days=rng.randrange(weeks * 7))])])
+        schedule.add(rng.choice(DAYS), f"Course {i}", f"{start // 60:02d}:{start % 60:02d}",
+                     f"{(start + 60) // 60:02d}:{(start + 60) % 60:02d}", False,
+                     allow_conflicts=True, recurrence=rule)
+    return schedule
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark lazy recurrence expansion.")
+    parser.add_argument('--entries', type=int, default=5000, help="Schedule entries (default 5000)")
+    parser.add_argument('--weeks', type=int, default=16, help="Term length in weeks (default 16)")
+    args = parser.parse_args(argv)
+
+    schedule = build(args.entries, args.weeks)
+    now = datetime.combine(TERM_START + timedelta(weeks=args.weeks // 2, days=2), datetime.min.time()) \
+        + timedelta(hours=13)
+    midnight = now.replace(hour=0)
+    term = (datetime.combine(TERM_START, datetime.min.time()),
+            datetime.combine(TERM_START + timedelta(weeks=args.weeks), datetime.min.time()))
+
+    lazy_next = timed(lambda: next(o for o in schedule.occurrences(now) if o.start >= now))
+    lazy_today = timed(lambda: list(schedule.occurrences(midnight, midnight + timedelta(hours=23, minutes=59))))
+    materialized = []
+    full = timed(lambda: materialized.extend(schedule.occurrences(*term)))
+    eager_next = timed(lambda: min(o.start for o in materialized if o.start >= now))
+
+    print(f"{args.entries:,} entries, {args.weeks}-week term: {len(materialized):,} occurrences in total")
+    print(f"Next class, lazy:      {lazy_next * 1000:8.1f} ms")
+    print(f"Today's classes, lazy: {lazy_today * 1000:8.1f} ms")
+    print(f"Materialize term:      {full * 1000:8.1f} ms (+{eager_next * 1000:.1f} ms to search it)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
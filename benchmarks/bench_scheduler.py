@@ -0,0 +1,97 @@
+"""
+Scale check for the class scheduler.
+
+Loads many users' schedules, replays a full week on a FakeClock to count
+and time every fired event, then runs the scheduler on the real clock for
+a few seconds to measure idle CPU.
+
+Usage:
+    python benchmarks/bench_scheduler.py [--users 5000] [--courses 10] [--idle 3]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import DAYS
+from scheduler import FakeClock, Scheduler
+
+
+def random_rows(rng: random.Random, courses: int) -> List[tuple]:
+    rows = []
+    for i in range(courses):
+        start = rng.randrange(7 * 60, 20 * 60)
+        end = start + rng.choice([45, 60, 90])
+        rows.append((rng.choice(DAYS), f"Course {i}", f"{start // 60:02d}:{start % 60:02d}",
+                     f"{end // 60:02d}:{end % 60:02d}", rng.random() < 0.5))
+    return rows
+
+
+def load(scheduler: Scheduler, users: int, courses: int) -> float:
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for user in range(users):
+        scheduler.set_schedule(f"user{user}", random_rows(rng, courses))
+    return time.perf_counter() - start
+
+
+async def replay_week(users: int, courses: int) -> None:
+    clock = FakeClock(datetime(2026, 1, 5))  # a Monday
+    fired = []
+
+    async def handler(event) -> None:
+        fired.append(clock.now() - event.due)
+
+    scheduler = Scheduler({'join': handler, 'leave': handler}, clock=clock)
+    elapsed = load(scheduler, users, courses)
+    print(f"Loaded {users:,} users ({len(scheduler):,} events) in {elapsed * 1000:.0f} ms")
+
+    task = asyncio.ensure_future(scheduler.run())
+    start = time.perf_counter()
+    await clock.advance(timedelta(days=7).total_seconds() - 1)
+    await scheduler.drain()
+    elapsed = time.perf_counter() - start
+    scheduler.stop()
+    await task
+    late = sum(1 for delay in fired if delay)
+    print(f"Fake week: {scheduler.fired:,} events fired in {elapsed:.2f} s "
+          f"({scheduler.fired / elapsed:,.0f} events/s), {late} fired late, {scheduler.skipped} skipped")
+
+
+async def idle_cpu(users: int, courses: int, seconds: float) -> None:
+    async def handler(event) -> None:
+        pass
+
+    scheduler = Scheduler({'join': handler, 'leave': handler})
+    load(scheduler, users, courses)
+    task = asyncio.ensure_future(scheduler.run())
+    await asyncio.sleep(0.1)
+    cpu = time.process_time()
+    await asyncio.sleep(seconds)
+    cpu = time.process_time() - cpu
+    scheduler.stop()
+    await task
+    print(f"Real clock: {cpu * 1000:.1f} ms CPU over {seconds:.0f} s with {users:,} users loaded "
+          f"({scheduler.fired} events fired)")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the class scheduler.")
+    parser.add_argument('--users', type=int, default=5000, help="Users to load (default 5000)")
+    parser.add_argument('--courses', type=int, default=10, help="Courses per user (default 10)")
+    parser.add_argument('--idle', type=float, default=3.0, help="Seconds to measure idle CPU (default 3)")
+    args = parser.parse_args(argv)
+
+    asyncio.run(replay_week(args.users, args.courses))
+    asyncio.run(idle_cpu(args.users, args.courses, args.idle))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
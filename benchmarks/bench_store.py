@@ -0,0 +1,132 @@
+"""
+Rerun cost with and without the SQLite session store.
+
+Runs the same AppTest session (schedule section open, N courses added)
+with persistence disabled and enabled and compares rerun latency, then
+times SessionStore.save directly for an unchanged session, a one-entry
+edit and a synchronous flush to disk.
+
+Usage:
+    python benchmarks/bench_store.py [--courses 200] [--reruns 50]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def rerun_latencies(app_path: str, courses: int, reruns: int) -> List[float]:
+    """
+    Open the schedule section, add ``courses`` entries and time ``reruns`` full reruns.
+
+    Returns:
+        Rerun latencies in seconds
+    """
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(app_path, default_timeout=120).run()
+    next(button for button in at.button if button.label == "Create Course Schedule YAML").click().run()
+    schedule = at.session_state.schedule
+    for i in range(courses):
+        start = i % (23 * 60)
+        schedule.add(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'][i % 5], f"Course {i % 40}",
+                     f"{start // 60:02d}:{start % 60:02d}", f"{(start + 1) // 60:02d}:{(start + 1) % 60:02d}",
+                     True, allow_conflicts=True)
+    at.run()
+
+    latencies = []
+    for i in range(reruns):
+        # Every other rerun follows an edit, so both the no-op and the dirty save paths are hit
+        if i % 2:
+            at.session_state.schedule.add('Friday', 'Edited', '23:58', '23:59', False, allow_conflicts=True)
+        start = time.perf_counter()
+        at.run()
+        latencies.append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    return latencies
+
+
+def save_costs(path: str, courses: int, repeat: int = 200) -> Dict[str, float]:
+    """Time SessionStore.save on its own, returning mean microseconds per case."""
+    from schedule import Schedule
+    from store import SessionStore
+
+    store = SessionStore(path, flush_interval=60)
+    schedule = Schedule()
+    for i in range(courses):
+        start = i % (23 * 60)
+        schedule.add(schedule.days[i % 5], f"Course {i % 40}", f"{start // 60:02d}:{start % 60:02d}",
+                     f"{(start + 1) // 60:02d}:{(start + 1) % 60:02d}", True, allow_conflicts=True)
+    xpath_values = {f"Course {i}": f"//div[{i}]" for i in range(40)}
+    store.save('bench', schedule, xpath_values)
+
+    costs = {}
+    start = time.perf_counter()
+    for _ in range(repeat):
+        store.save('bench', schedule, xpath_values)
+    costs['save, unchanged'] = (time.perf_counter() - start) / repeat * 1e6
+
+    total = 0.0
+    for _ in range(repeat):
+        entry_id = schedule.add('Friday', 'Edited', '23:58', '23:59', False, allow_conflicts=True)
+        start = time.perf_counter()
+        store.save('bench', schedule, xpath_values)
+        total += time.perf_counter() - start
+        schedule.remove(entry_id)
+    costs['save, one edit'] = total / repeat * 1e6
+
+    total = 0.0
+    for _ in range(20):
+        schedule.add('Friday', 'Edited', '23:58', '23:59', False, allow_conflicts=True)
+        start = time.perf_counter()
+        store.save('bench', schedule, xpath_values)
+        store.flush()
+        total += time.perf_counter() - start
+    costs['save + synchronous flush'] = total / 20 * 1e6
+    store.close()
+    return costs
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare rerun cost with and without the session store.")
+    parser.add_argument('--courses', type=int, default=200, help="Entries in the session (default 200)")
+    parser.add_argument('--reruns', type=int, default=50, help="Timed reruns per variant (default 50)")
+    args = parser.parse_args(argv)
+
+    import streamlit.logger
+
+    streamlit.logger.set_log_level('error')
+    workdir = tempfile.mkdtemp(prefix='bench_store_')
+    for name in os.listdir(ROOT):
+        if name.endswith('.py'):
+            shutil.copy(os.path.join(ROOT, name), workdir)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    sys.path.insert(0, workdir)
+    try:
+        for label, store_path in [('without store', ''), ('with store', os.path.join(workdir, 'sessions.db'))]:
+            os.environ['SCHEDULE_STORE'] = store_path
+            latencies = rerun_latencies(os.path.join(workdir, 'app.py'), args.courses, args.reruns)
+            ordered = sorted(latencies)
+            print(f"{label:<14} rerun mean {statistics.mean(latencies) * 1000:7.2f} ms  "
+                  f"p50 {ordered[len(ordered) // 2] * 1000:7.2f} ms  "
+                  f"p95 {ordered[int(len(ordered) * 0.95)] * 1000:7.2f} ms")
+
+        for label, micros in save_costs(os.path.join(workdir, 'save_bench.db'), args.courses).items():
+            print(f"{label:<26} {micros:9.1f} us")
+    finally:
+        os.environ.pop('SCHEDULE_STORE', None)
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
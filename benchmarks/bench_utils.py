@@ -0,0 +1,241 @@
+"""
+Micro-benchmarks for the utils.py hot paths.
+
+Runs validate_time_format, generate_course_schedule_yaml and
+generate_xpath_yaml on synthetic schedules and reports throughput, peak
+traced memory and allocated blocks per entry. Streamlit is replaced by a
+stub module with a fake ``session_state``, so no server is needed.
+
+Results can be saved as a local baseline and later runs diffed against it.
+
+Usage:
+    python benchmarks/bench_utils.py [--sizes 10,1000,100000,1000000] [--repeat 3]
+    python benchmarks/bench_utils.py --save      # write benchmarks/baseline.json
+    python benchmarks/bench_utils.py --compare   # diff against the baseline
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import sys
+import timeit
+import tracemalloc
+import types
+from typing import Callable, Dict, Iterator, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core import DAYS, validate_times
+
+DEFAULT_SIZES = [10, 1000, 100000, 1000000]
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+
+class FakeSessionState(dict):
+    """Dict with attribute access, enough of st.session_state for utils."""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+
+@contextlib.contextmanager
+def fake_streamlit(**state) -> Iterator[types.ModuleType]:
+    """
+    Install a stub ``streamlit`` module holding a FakeSessionState.
+
+    Args:
+        **state: Initial session state values
+
+    Yields:
+        The stub module; the previous ``streamlit`` entry is restored on exit
+    """
+    previous = sys.modules.get('streamlit')
+    module = types.ModuleType('streamlit')
+    module.session_state = FakeSessionState(state)
+    sys.modules['streamlit'] = module
+    try:
+        yield module
+    finally:
+        if previous is None:
+            sys.modules.pop('streamlit', None)
+        else:
+            sys.modules['streamlit'] = previous
+
+
+def synthetic_schedule(size: int) -> Dict[str, List[Dict]]:
+    """
+    Build a schedule with ``size`` entries spread evenly over the week.
+
+    Course names repeat every few entries and times cycle through the day,
+    roughly like a real timetable.
+    """
+    schedule_data = {day: [] for day in DAYS}
+    courses = max(1, size // 5)
+    for i in range(size):
+        start = (i * 7) % (23 * 60)
+        end = start + 45
+        schedule_data[DAYS[i % len(DAYS)]].append({
+            'name': f"Course {i % courses}",
+            'start_time': f"{start // 60:02d}:{start % 60:02d}",
+            'end_time': f"{end // 60:02d}:{end % 60:02d}",
+            'send_message': i % 2 == 0
+        })
+    return schedule_data
+
+
+def synthetic_times(size: int) -> List[str]:
+    """Return ``size`` time strings in the mix of formats users type."""
+    formats = ['{h:02d}:{m:02d}', '{h}:{m:02d}', '{h:02d}:{m:02d}:00', '{h}:{m}']
+    return [formats[i % len(formats)].format(h=(i // 60) % 24, m=i % 60) for i in range(size)]
+
+
+def measure(fn: Callable[[], object], size: int, repeat: int) -> Dict[str, float]:
+    """
+    Time a benchmark and trace its memory in a separate run.
+
+    Args:
+        fn: Benchmark body
+        size: Number of entries it processes
+        repeat: Timed runs; the fastest is reported. Inputs under 100k
+            entries are called enough times per run to take at least 0.2 s
+
+    Returns:
+        Mapping with seconds, entries_per_s, peak_bytes, peak_bytes_per_entry
+        and blocks_per_entry (blocks still allocated by the result)
+    """
+    # timeit's autorange loops small inputs until a run takes 0.2 s, so the
+    # per-call time is not dominated by timer resolution
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange() if size < 100000 else (1, None)
+    number = max(number, 1)
+    gc.collect()
+    seconds = min(timer.repeat(repeat=repeat, number=number)) / number
+
+    # Tracing slows the run down a lot, so it is kept out of the timings
+    gc.collect()
+    tracemalloc.start()
+    before = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    after = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+    del result
+
+    return {
+        'seconds': seconds,
+        'entries_per_s': size / seconds if seconds else float('inf'),
+        'peak_bytes': peak,
+        'peak_bytes_per_entry': peak / size,
+        'blocks_per_entry': (after - before) / size,
+    }
+
+
+def run(sizes: List[int], repeat: int) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Run every benchmark at every size.
+
+    Returns:
+        Mapping of benchmark name -> size (as a string) -> measurements
+    """
+    with fake_streamlit(xpath_values={}) as st:
+        import utils
+
+        results: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for size in sizes:
+            times = synthetic_times(size)
+            schedule_data = synthetic_schedule(size)
+            courses = [f"Course {i}" for i in range(size)]
+            st.session_state.xpath_values = {course: f"//div[{i}]/a" for i, course in enumerate(courses) if i % 2}
+
+            benchmarks: List[Tuple[str, Callable[[], object]]] = [
+                ('validate_time_format', lambda: [utils.validate_time_format(value) for value in times]),
+                ('validate_times', lambda: validate_times(times)),
+                ('generate_course_schedule_yaml', lambda: utils.generate_course_schedule_yaml(schedule_data)),
+                # No explicit mapping, so the values come from the fake session state
+                ('generate_xpath_yaml', lambda: utils.generate_xpath_yaml(courses)),
+            ]
+            for name, fn in benchmarks:
+                stats = measure(fn, size, repeat)
+                results.setdefault(name, {})[str(size)] = stats
+                print(f"{name:<30} {size:>9,}  {stats['entries_per_s']:>13,.0f} entries/s  "
+                      f"peak {stats['peak_bytes'] / 1e6:9.2f} MB  "
+                      f"{stats['peak_bytes_per_entry']:8.1f} B/entry  "
+                      f"{stats['blocks_per_entry']:6.2f} blocks/entry", flush=True)
+    return results
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Diff results against a baseline.
+
+    Args:
+        results: Output of run
+        baseline: A previous run loaded from the baseline file
+        tolerance: Allowed relative slowdown or memory growth, e.g. 0.2
+
+    Returns:
+        Descriptions of every measurement that regressed beyond the tolerance
+    """
+    regressions = []
+    for name, by_size in results.items():
+        for size, stats in by_size.items():
+            old = baseline.get(name, {}).get(size)
+            if old is None:
+                continue
+            speed = stats['entries_per_s'] / old['entries_per_s'] - 1
+            memory = stats['peak_bytes'] / old['peak_bytes'] - 1 if old['peak_bytes'] else 0.0
+            print(f"{name:<30} {int(size):>9,}  throughput {speed:+7.1%}  peak memory {memory:+7.1%}")
+            if speed < -tolerance:
+                regressions.append(f"{name} at {size}: throughput {speed:+.1%}")
+            if memory > tolerance:
+                regressions.append(f"{name} at {size}: peak memory {memory:+.1%}")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the utils.py hot paths.")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated entry counts (default 10,1000,100000,1000000)")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="Timed runs per benchmark; the fastest counts (default 3)")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline JSON file")
+    parser.add_argument('--save', action='store_true', help="Write the results as the new baseline")
+    parser.add_argument('--compare', action='store_true', help="Diff the results against the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Allowed slowdown or memory growth when comparing (default 0.2)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    results = run(sizes, args.repeat)
+
+    status = 0
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}; run with --save first")
+            return 1
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        status = 1 if regressions else 0
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump({'python': platform.python_version(), 'platform': platform.platform(),
+                       'results': results}, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
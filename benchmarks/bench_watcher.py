@@ -0,0 +1,121 @@
+"""
+Cost of picking up schedule edits with watcher.BundleWatcher vs a full reload.
+
+Writes a bundles directory with many users, loads it once, then measures:
+a poll when nothing changed, a poll after every file was rewritten with the
+same content (hash skip), and a poll after one entry of one user changed,
+against re-parsing every file into a fresh Scheduler as a restart would.
+
+Usage:
+    python benchmarks/bench_watcher.py [--users 500] [--courses 10] [--rounds 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import DAYS
+from scheduler import Scheduler
+from schedule import Schedule
+from watcher import SCHEDULE_FILE, XPATH_FILE, BundleWatcher
+
+
+def write_bundles(directory: str, users: int, courses: int) -> None:
+    """Write a schedule and XPath file for each user, ``courses`` entries spread over the week."""
+    for i in range(users):
+        schedule = Schedule()
+        for n in range(courses):
+            hour = 8 + n // len(DAYS)
+            schedule.add(DAYS[n % len(DAYS)], f"Course {n}", f"{hour:02d}:00", f"{hour:02d}:50", n % 2 == 0)
+        path = os.path.join(directory, f"user{i:04d}")
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, SCHEDULE_FILE), 'w', encoding='utf-8') as f:
+            f.write(schedule.to_yaml())
+        with open(os.path.join(path, XPATH_FILE), 'w', encoding='utf-8') as f:
+            f.write(''.join(f"Course {n}: //a[.='Course {n}']\n" for n in range(courses)))
+
+
+def full_reload(directory: str) -> Scheduler:
+    """Parse every schedule into a new Scheduler, as a restarted process would."""
+    scheduler = Scheduler({})
+    for user in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, user, SCHEDULE_FILE), encoding='utf-8') as f:
+            scheduler.load_yaml(user, f.read())
+    return scheduler
+
+
+def best(rounds: int, function) -> float:
+    result = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        result = min(result, time.perf_counter() - start)
+    return result
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare incremental reloads with full reloads.")
+    parser.add_argument('--users', type=int, default=500, help="Users in the bundles directory (default 500)")
+    parser.add_argument('--courses', type=int, default=10, help="Entries per user (default 10)")
+    parser.add_argument('--rounds', type=int, default=5, help="Timing rounds, best is reported (default 5)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_bundles(directory, args.users, args.courses)
+        scheduler = Scheduler({})
+        watcher = BundleWatcher(directory, scheduler, use_inotify=False)
+        start = time.perf_counter()
+        watcher.poll()
+        print(f"{args.users} users, {len(scheduler):,} events; initial load {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        reload_seconds = best(args.rounds, lambda: full_reload(directory))
+        print(f"Full reload: {reload_seconds * 1000:.1f} ms")
+        print(f"Poll, nothing changed: {best(args.rounds, watcher.poll) * 1000:.1f} ms")
+
+        def touch_all():
+            for user in os.listdir(directory):
+                for name in (SCHEDULE_FILE, XPATH_FILE):
+                    path = os.path.join(directory, user, name)
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                    with open(path, 'wb') as f:
+                        f.write(data)
+
+        def rewrite_then_poll():
+            touch_all()
+            start = time.perf_counter()
+            watcher.poll()
+            return time.perf_counter() - start
+
+        rewritten = min(rewrite_then_poll() for _ in range(args.rounds))
+        print(f"Poll, every file rewritten unchanged: {rewritten * 1000:.1f} ms "
+              f"({watcher.stats['same_content']:,} hash skips, {watcher.stats['parsed']:,} parses in total)")
+
+        path = os.path.join(directory, 'user0000', SCHEDULE_FILE)
+        with open(path, encoding='utf-8') as f:
+            original = f.read()
+        edits = [original.replace('08:50', f'08:{45 + i}', 1) for i in range(args.rounds)]
+
+        def edit_then_poll(text):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            start = time.perf_counter()
+            changes = watcher.poll()
+            seconds = time.perf_counter() - start
+            assert len(changes) == 1 and (changes[0].added, changes[0].removed) == (1, 1), changes
+            return seconds
+
+        edited = min(edit_then_poll(text) for text in edits)
+        print(f"Poll, one entry changed: {edited * 1000:.1f} ms ({reload_seconds / edited:.0f}x faster than a full reload)")
+
+        expected = len(full_reload(directory))
+        print(f"Events after edits: incremental {len(scheduler):,}, full reload {expected:,}")
+        return 0 if len(scheduler) == expected else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
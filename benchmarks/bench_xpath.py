@@ -0,0 +1,102 @@
+"""
+Evaluation time and robustness of derived XPaths vs absolute ones.
+
+Builds a large synthetic LMS dashboard (navigation, filler blocks and one
+card per course), derives a selector for every course with
+xpath_tools.derive_xpaths and compares it with the absolute path of the
+same link: time to evaluate each set against the page, and how many still
+find their course after the LMS adds a wrapper div above the content.
+
+Usage:
+    python benchmarks/bench_xpath.py [--courses 40] [--filler 20000] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xpath_tools import compile_xpath, derive_xpaths, node_text, parse_snapshot
+
+
+def synthetic_page(courses: int, filler: int, wrapped: bool = False) -> str:
+    """Dashboard with a course list in the side navigation and a card per course in the main region."""
+    nav = ''.join(f'<li><a href="/course/view.php?id={i}&amp;nav=1">Course {i}</a></li>' for i in range(courses))
+    blocks = ''.join(f'<div class="block"><p>Notice {i}</p><a href="/mod/forum/{i}">Read more</a></div>'
+                     for i in range(filler))
+    cards = ''.join(
+        f'<div class="card"><div class="card-body"><a href="/course/view.php?id={i}" class="coursename">'
+        f'<span class="sr-only">Course name</span><span>Course {i}</span></a></div></div>'
+        for i in range(courses))
+    main = f'<section id="region-main"><div class="course-list">{cards}</div></section>'
+    if wrapped:
+        main = f'<div class="new-wrapper">{main}</div>'
+    return (f'<html><body><div id="page"><nav><ul>{nav}</ul></nav>'
+            f'<aside>{blocks}</aside>{main}</div></body></html>')
+
+
+def evaluate(root, xpaths: Dict[str, str], repeat: int) -> float:
+    """Return the seconds one evaluation of every XPath takes, best of ``repeat``."""
+    selectors = [compile_xpath(xpath) for xpath in xpaths.values()]
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for selector in selectors:
+            selector(root)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def still_found(root, xpaths: Dict[str, str]) -> int:
+    """Count XPaths that select exactly one node whose text still names their course."""
+    found = 0
+    for course, xpath in xpaths.items():
+        matches = compile_xpath(xpath)(root)
+        if len(matches) == 1 and course in node_text(matches[0]):
+            found += 1
+    return found
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare derived and absolute course XPaths.")
+    parser.add_argument('--courses', type=int, default=40, help="Courses on the page (default 40)")
+    parser.add_argument('--filler', type=int, default=20000, help="Unrelated blocks on the page (default 20000)")
+    parser.add_argument('--repeat', type=int, default=20, help="Timing rounds, best is reported (default 20)")
+    args = parser.parse_args(argv)
+
+    courses = [f"Course {i}" for i in range(args.courses)]
+    root = parse_snapshot(synthetic_page(args.courses, args.filler))
+    elements = sum(1 for _ in root.iter())
+
+    start = time.perf_counter()
+    proposals = derive_xpaths(root, courses)
+    derive_seconds = time.perf_counter() - start
+    derived = {course: proposal.xpath for course, proposal in proposals.items()}
+    # The card link, as a browser's "Copy full XPath" gives it
+    absolute = {course: root.getroottree().getpath(root.xpath('id("region-main")//a[.//span[.=$name]]',
+                                                              name=course)[0])
+                for course in courses}
+
+    print(f"Page: {elements:,} elements, {args.courses} courses; "
+          f"derived {len(proposals)} XPaths in {derive_seconds * 1000:.1f} ms")
+    print(f"Strategies: {dict(Counter(proposal.strategy for proposal in proposals.values()))}")
+    print(f"Example: {absolute[courses[0]]}  ->  {derived.get(courses[0])}")
+
+    absolute_seconds = evaluate(root, absolute, args.repeat)
+    derived_seconds = evaluate(root, derived, args.repeat)
+    print(f"Evaluate all: absolute {absolute_seconds * 1000:.2f} ms, derived {derived_seconds * 1000:.2f} ms "
+          f"({absolute_seconds / derived_seconds:.2f}x)")
+    print(f"Mean length: absolute {sum(map(len, absolute.values())) / len(absolute):.0f} chars, "
+          f"derived {sum(map(len, derived.values())) / max(len(derived), 1):.0f} chars")
+
+    wrapped = parse_snapshot(synthetic_page(args.courses, args.filler, wrapped=True))
+    print(f"After wrapping the main region in a new div: absolute {still_found(wrapped, absolute)}/{len(absolute)}, "
+          f"derived {still_found(wrapped, derived)}/{len(derived)} still find their course")
+    return 0 if len(proposals) == len(courses) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+Import-time benchmark for the Streamlit-free modules.
+
+Runs ``python -X importtime`` in a fresh interpreter for each module and
+fails if a module pulls in a forbidden dependency or exceeds its budget.
+
+Usage:
+    python benchmarks/import_time.py [--budget-ms 50] [--repeat 5]
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must import without Streamlit or PyYAML
+MODULES = ['core', 'batch']
+FORBIDDEN = ('streamlit', 'yaml')
+
+
+def measure_import(module: str) -> Tuple[float, Dict[str, int]]:
+    """
+    Import a module in a fresh interpreter under ``-X importtime``.
+
+    Args:
+        module: Module name to import
+
+    Returns:
+        Tuple of (cumulative import time of the module in ms, mapping of
+        every imported module to its cumulative time in microseconds)
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        # Format: "import time: self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = int(cumulative)
+    return timings.get(module, 0) / 1000, timings
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check import time of Streamlit-free modules.")
+    parser.add_argument('--budget-ms', type=float, default=50.0,
+                        help="Maximum median import time per module (default 50 ms)")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per module (default 5)")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in MODULES:
+        runs = []
+        imported = {}
+        for _ in range(args.repeat):
+            elapsed, imported = measure_import(module)
+            runs.append(elapsed)
+        median = sorted(runs)[len(runs) // 2]
+
+        leaked = sorted(name for name in imported if name.split('.')[0] in FORBIDDEN)
+        status = 'ok'
+        if leaked:
+            status = f"FAIL: imports {', '.join(leaked[:5])}"
+            failed = True
+        elif median > args.budget_ms:
+            status = f"FAIL: over {args.budget_ms:.0f} ms budget"
+            failed = True
+        print(f"{module:<10} {median:8.2f} ms  ({len(imported)} modules)  {status}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
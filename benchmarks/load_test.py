@@ -0,0 +1,221 @@
+"""
+Concurrent-session load test for the Streamlit app.
+
+Drives N simulated sessions through the schedule, XPath and credentials
+flows of app.py with Streamlit's AppTest, all in one process the way a
+single server runs every session's script thread. For each N it records
+p50/p95/p99 rerun latency, memory per live session (RSS growth and the
+accounting.session_report total of its state) and process RSS, and writes
+the results to a JSON report.
+
+AppTest patches process-wide state (config options, the Runtime singleton)
+for the duration of each run, so runs from different session threads are
+serialized with a lock. Reported latency includes the time a rerun waits
+for that lock, which models the queueing a GIL-bound server sees under
+load; the time spent actually running the script is reported as service
+time.
+
+The app runs from a temporary copy of the repository, so the .env files
+written by the credentials flow never touch the working tree.
+
+Usage:
+    python benchmarks/load_test.py [--sessions 1,5,10,25] [--courses 20]
+        [--report benchmarks/load_report.json]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_REPORT = os.path.join(ROOT, 'benchmarks', 'load_report.json')
+
+
+def rss_bytes() -> int:
+    """Return the current resident set size of this process."""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+# Serializes AppTest runs, see the module docstring
+_run_lock = threading.Lock()
+
+
+class Session:
+    """One simulated user, timing every rerun it triggers."""
+
+    def __init__(self, app_path: str, session_no: int, timeout: float):
+        from streamlit.testing.v1 import AppTest
+
+        self.no = session_no
+        self.at = AppTest.from_file(app_path, default_timeout=timeout)
+        self.latencies: Dict[str, List[float]] = {}
+        self.service_times: List[float] = []
+
+    def _run(self, flow: str, element) -> None:
+        start = time.perf_counter()
+        with _run_lock:
+            service_start = time.perf_counter()
+            element.run()
+            end = time.perf_counter()
+        self.latencies.setdefault(flow, []).append(end - start)
+        self.service_times.append(end - service_start)
+        if self.at.exception:
+            raise RuntimeError(f"session {self.no}: {self.at.exception[0].message}")
+
+    def _button(self, label: str):
+        return next(button for button in self.at.button if button.label == label)
+
+    def _text_input(self, label: str):
+        return next(text_input for text_input in self.at.text_input if text_input.label == label)
+
+    def schedule_flow(self, courses: int) -> None:
+        self._run('schedule', self._button("Create Course Schedule YAML").click())
+        for i in range(courses):
+            start = 8 * 60 + i * 30
+            next(box for box in self.at.selectbox if box.label == "Select Day").select(
+                ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'][i % 5])
+            self._text_input("Course Name *").input(f"Course {self.no}-{i % 7}")
+            self._text_input("Start Time (HH:MM) *").input(f"{start // 60 % 24}:{start % 60:02d}")
+            self._text_input("End Time (HH:MM) *").input(f"{(start + 25) // 60 % 24}:{(start + 25) % 60:02d}")
+            self._run('schedule', self._button("Add Course").click())
+        self._run('schedule', self._text_input("Search courses").input("course"))
+        self._run('schedule', self._button("Generate Schedule YAML").click())
+
+    def xpath_flow(self) -> None:
+        self._run('xpath', self._button("Create Course XPath YAML").click())
+        if self.at.text_area:
+            self.at.text_area[0].input(f"//div[{self.no}]/a")
+            self._run('xpath', self._button("Add Course").click())
+        self._run('xpath', self._button("Generate XPath YAML").click())
+
+    def credentials_flow(self) -> None:
+        self._run('credentials', self._button("Configure Credentials").click())
+        self._text_input("LMS ID").input(f"user{self.no}")
+        self._text_input("Password").input("load-test")
+        self._run('credentials', self._button("Save Credentials").click())
+
+    def drive(self, courses: int) -> None:
+        self._run('startup', self.at)
+        self.schedule_flow(courses)
+        self.xpath_flow()
+        self.credentials_flow()
+
+
+def run_level(app_path: str, sessions: int, courses: int, timeout: float) -> Dict:
+    """
+    Drive ``sessions`` concurrent sessions and summarize the run.
+
+    Returns:
+        Mapping with latency percentiles per flow and overall, service time
+        percentiles, memory per session, RSS and wall time
+    """
+    gc.collect()
+    rss_before = rss_bytes()
+    active = [Session(app_path, no, timeout) for no in range(sessions)]
+    start_barrier = threading.Barrier(sessions)
+
+    def drive(session: Session) -> None:
+        # Start every session together so their reruns contend from the first one
+        start_barrier.wait()
+        session.drive(courses)
+
+    wall = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        for future in [pool.submit(drive, session) for session in active]:
+            future.result()
+    wall = time.perf_counter() - wall
+
+    gc.collect()
+    # Sessions are still referenced here, so the growth is what they retain
+    rss_after = rss_bytes()
+    from accounting import session_report
+
+    state_bytes = [session_report(session.at.session_state.schedule, session.at.session_state.xpath_values)['total']
+                   for session in active]
+
+    def summary(values: List[float]) -> Dict[str, float]:
+        return {'count': len(values), 'mean_ms': statistics.mean(values) * 1000,
+                'p50_ms': percentile(values, 50) * 1000, 'p95_ms': percentile(values, 95) * 1000,
+                'p99_ms': percentile(values, 99) * 1000}
+
+    flows: Dict[str, List[float]] = {}
+    for session in active:
+        for flow, values in session.latencies.items():
+            flows.setdefault(flow, []).extend(values)
+    return {
+        'sessions': sessions,
+        'reruns': summary([value for values in flows.values() for value in values]),
+        'flows': {flow: summary(values) for flow, values in flows.items()},
+        'service': summary([value for session in active for value in session.service_times]),
+        'memory_per_session_bytes': max(0, rss_after - rss_before) / sessions,
+        'state_bytes_per_session': statistics.mean(state_bytes),
+        'rss_bytes': rss_after,
+        'wall_s': wall,
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test app.py with concurrent AppTest sessions.")
+    parser.add_argument('--sessions', default='1,5,10,25',
+                        help="Comma-separated concurrent session counts (default 1,5,10,25)")
+    parser.add_argument('--courses', type=int, default=20, help="Courses each session adds (default 20)")
+    parser.add_argument('--timeout', type=float, default=120.0, help="Per-rerun timeout in seconds (default 120)")
+    parser.add_argument('--report', default=DEFAULT_REPORT, help="JSON report path")
+    args = parser.parse_args(argv)
+    report_path = os.path.abspath(args.report)
+    # Bare-mode AppTest runs warn about the missing ScriptRunContext on every rerun
+    import streamlit.logger
+
+    streamlit.logger.set_log_level('error')
+
+    workdir = tempfile.mkdtemp(prefix='load_test_')
+    for name in os.listdir(ROOT):
+        if name.endswith('.py'):
+            shutil.copy(os.path.join(ROOT, name), workdir)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    sys.path.insert(0, workdir)
+
+    levels = []
+    try:
+        for sessions in [int(n) for n in args.sessions.split(',') if n.strip()]:
+            level = run_level(os.path.join(workdir, 'app.py'), sessions, args.courses, args.timeout)
+            levels.append(level)
+            reruns = level['reruns']
+            print(f"{sessions:>4} sessions  {reruns['count']:>6} reruns  "
+                  f"p50 {reruns['p50_ms']:8.1f} ms  p95 {reruns['p95_ms']:8.1f} ms  "
+                  f"p99 {reruns['p99_ms']:8.1f} ms  service p50 {level['service']['p50_ms']:6.1f} ms  "
+                  f"{level['memory_per_session_bytes'] / 1e6:7.2f} MB/session "
+                  f"(state {level['state_bytes_per_session'] / 1e3:.1f} kB)  "
+                  f"RSS {level['rss_bytes'] / 1e6:8.1f} MB", flush=True)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    import streamlit
+
+    with open(report_path, 'w') as f:
+        json.dump({'python': platform.python_version(), 'streamlit': streamlit.__version__,
+                   'cpus': os.cpu_count(), 'courses_per_session': args.courses, 'levels': levels}, f, indent=2)
+    print(f"Report written to {report_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
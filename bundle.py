@@ -0,0 +1,138 @@
+"""
+One-file export of a user's configuration as a ZIP bundle.
+
+A bundle holds ``course_details.yaml``, ``course_xpath.yaml``, their
+compiled ``course_schedule.bin`` sidecar and a ``.env`` credential
+template. The schedule YAML comes from the Schedule's cached per-day
+fragments and the XPath YAML is memoized on the course/XPath pairs, so
+exporting again after a small edit only re-emits what changed.
+The archive is produced in chunks as each member is written and is
+byte-for-byte reproducible for the same content.
+
+Usage from Python:
+    from bundle import build_bundle
+    data = build_bundle(schedule, xpath_values, env={'lmsid': 'jdoe'})
+"""
+import zipfile
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from compiled import COMPILED_FILE, compile_schedule
+from core import generate_xpath_yaml
+from credentials import format_env
+from schedule import Schedule
+
+# Keys written by the credentials form, in file order
+ENV_TEMPLATE = {'lmsid': '', 'password': '', 'webhookurl': 'null'}
+# Fixed member timestamp so equal content gives an identical archive
+_ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+
+
+class _ChunkWriter:
+    """Write-only, unseekable sink that hands out what was written so far."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+@lru_cache(maxsize=256)
+def _xpath_yaml(pairs: Tuple[Tuple[str, Optional[str]], ...]) -> str:
+    return generate_xpath_yaml([course for course, _ in pairs],
+                               {course: xpath for course, xpath in pairs if xpath})
+
+
+def xpath_yaml(schedule: Schedule, xpath_values: Dict[str, str]) -> str:
+    """Return course_xpath.yaml for a schedule, reusing the last result for unchanged XPaths."""
+    return _xpath_yaml(tuple((course, xpath_values.get(course)) for course in schedule.courses))
+
+
+def env_template(values: Optional[Dict[str, str]] = None) -> str:
+    """
+    Render the .env credential file with the given values filled in.
+
+    Args:
+        values: Values for any of the ENV_TEMPLATE keys; the rest stay blank
+
+    Raises:
+        ValueError: If a key is unknown or a value contains a line break
+    """
+    values = values or {}
+    unknown = set(values) - set(ENV_TEMPLATE)
+    if unknown:
+        raise ValueError(f"Unknown .env keys: {', '.join(sorted(unknown))}")
+    return format_env({key: values.get(key) or default for key, default in ENV_TEMPLATE.items()}) + '\n'
+
+
+def bundle_files(schedule: Schedule, xpath_values: Dict[str, str],
+                 env: Optional[Dict[str, str]] = None) -> List[Tuple[str, Union[str, bytes]]]:
+    """Return the (file name, content) pairs that make up a bundle."""
+    details = schedule.to_yaml()
+    xpaths = xpath_yaml(schedule, xpath_values)
+    return [
+        ('course_details.yaml', details),
+        ('course_xpath.yaml', xpaths),
+        (COMPILED_FILE, compile_schedule(schedule, xpath_values, details, xpaths)),
+        ('.env', env_template(env)),
+    ]
+
+
+def iter_bundle(schedule: Schedule, xpath_values: Dict[str, str],
+                env: Optional[Dict[str, str]] = None) -> Iterator[bytes]:
+    """
+    Stream a bundle ZIP, yielding each member as soon as it is compressed.
+
+    Args:
+        schedule: Schedule to export
+        xpath_values: Mapping of course name to XPath
+        env: Values to fill into the .env template
+
+    Yields:
+        Consecutive chunks of the archive
+    """
+    sink = _ChunkWriter()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in bundle_files(schedule, xpath_values, env):
+            info = zipfile.ZipInfo(name, date_time=_ZIP_DATE)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o600 << 16 if name == '.env' else 0o644 << 16
+            archive.writestr(info, content)
+            yield sink.take()
+    # Central directory, written on close
+    yield sink.take()
+
+
+def build_bundle(schedule: Schedule, xpath_values: Dict[str, str],
+                 env: Optional[Dict[str, str]] = None) -> bytes:
+    """Return a whole bundle ZIP in memory, see iter_bundle()."""
+    return b''.join(iter_bundle(schedule, xpath_values, env))
+
+
+def write_bundle(path: str, schedule: Schedule, xpath_values: Dict[str, str],
+                 env: Optional[Dict[str, str]] = None) -> str:
+    """
+    Write a bundle ZIP to a file, chunk by chunk.
+
+    Returns:
+        The path written
+    """
+    with open(path, 'wb') as f:
+        for chunk in iter_bundle(schedule, xpath_values, env):
+            f.write(chunk)
+    return path
@@ -0,0 +1,169 @@
+"""
+Server-wide course catalog aggregated from every saved session.
+
+People in a cohort schedule the same courses, so the catalog collects,
+per course, the spelling most sessions use, the XPath most sessions use
+and the time slots it is usually held in. Course names are matched
+case-insensitively with whitespace collapsed.
+
+Lookups by prefix bisect a sorted list of normalized names, so each
+keystroke costs O(log n) plus the courses that actually match, never a
+scan of the whole catalog. Catalog strings are interned, so sessions that
+take an XPath from the catalog share it instead of holding a copy.
+
+Usage:
+    catalog = catalog_from_store(store)
+    for course in catalog.complete('mat'):
+        print(course.name, course.xpath, course.slots[:1])
+"""
+import heapq
+import sys
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+# Usual slots kept per course
+SLOTS_KEPT = 3
+# Sorts after any character a course name holds, closing a prefix range
+_PREFIX_END = '\U0010ffff'
+
+
+def normalize(name: str) -> str:
+    """Key a course name is matched on: case-folded, whitespace collapsed."""
+    return ' '.join(name.casefold().split())
+
+
+class Slot(NamedTuple):
+    """A time slot a course is held in and how many sessions schedule it there."""
+    day: str
+    start_time: str
+    end_time: str
+    sessions: int
+
+
+class CatalogCourse:
+    """
+    One catalog course.
+
+    Args:
+        name: Most common spelling
+        xpath: Most common XPath, None if no session set one
+        slots: Usual slots, most common first
+        sessions: Number of sessions using the course
+    """
+
+    __slots__ = ('name', 'xpath', 'slots', 'sessions')
+
+    def __init__(self, name: str, xpath: Optional[str], slots: Tuple[Slot, ...], sessions: int):
+        self.name = name
+        self.xpath = xpath
+        self.slots = slots
+        self.sessions = sessions
+
+    def __repr__(self) -> str:
+        return f"CatalogCourse({self.name!r}, sessions={self.sessions}, slots={len(self.slots)})"
+
+
+class Catalog:
+    """
+    Immutable course catalog with prefix lookups.
+
+    Args:
+        courses: Catalog courses; later ones with the same normalized name win
+    """
+
+    def __init__(self, courses: Iterable[CatalogCourse] = ()):
+        self._courses: Dict[str, CatalogCourse] = {normalize(course.name): course for course in courses}
+        self._keys: List[str] = sorted(self._courses)
+        # time.monotonic() when the catalog was built, to rate-limit rebuilds
+        self.built = time.monotonic()
+
+    @classmethod
+    def build(cls, sessions: Iterable[Tuple[Dict[str, List[list]], Dict[str, str]]]) -> 'Catalog':
+        """
+        Aggregate sessions into a catalog.
+
+        Every session counts once per course, slot and XPath, however many
+        entries it has for them.
+
+        Args:
+            sessions: (day -> entry rows, XPath values) per session; entry
+                rows start with name, start_time and end_time, as saved by
+                store.SessionStore
+
+        Returns:
+            The catalog
+        """
+        spellings: Dict[str, Counter] = {}
+        slots: Dict[str, Counter] = {}
+        xpaths: Dict[str, Counter] = {}
+        sessions_using: Counter = Counter()
+        for days, xpath_values in sessions:
+            used: Set[str] = set()
+            session_slots: Set[Tuple[str, str, str, str]] = set()
+            for day, entries in days.items():
+                for name, start_time, end_time, *_ in entries:
+                    key = normalize(name)
+                    if key not in used:
+                        used.add(key)
+                        spellings.setdefault(key, Counter())[name] += 1
+                    session_slots.add((key, day, start_time, end_time))
+            for key, day, start_time, end_time in session_slots:
+                slots.setdefault(key, Counter())[(day, start_time, end_time)] += 1
+            for name, xpath in xpath_values.items():
+                key = normalize(name)
+                if xpath and key in used:
+                    xpaths.setdefault(key, Counter())[xpath] += 1
+            sessions_using.update(used)
+
+        courses = []
+        for key, names in spellings.items():
+            xpath = xpaths[key].most_common(1)[0][0] if key in xpaths else None
+            usual = tuple(Slot(*slot, sessions=count)
+                          for slot, count in slots.get(key, Counter()).most_common(SLOTS_KEPT))
+            courses.append(CatalogCourse(sys.intern(names.most_common(1)[0][0]),
+                                         sys.intern(xpath) if xpath else None, usual, sessions_using[key]))
+        return cls(courses)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[CatalogCourse]:
+        """Courses in normalized name order."""
+        return (self._courses[key] for key in self._keys)
+
+    def __contains__(self, name: str) -> bool:
+        return normalize(name) in self._courses
+
+    def get(self, name: str) -> Optional[CatalogCourse]:
+        """Return the catalog entry for a course name, in any case or spacing."""
+        return self._courses.get(normalize(name))
+
+    def complete(self, prefix: str, limit: int = 10) -> List[CatalogCourse]:
+        """
+        Find courses whose name starts with a prefix.
+
+        Args:
+            prefix: Start of a course name, in any case
+            limit: Most courses to return
+
+        Returns:
+            Matching courses, most used first
+        """
+        key = normalize(prefix)
+        if not key:
+            return []
+        start = bisect_left(self._keys, key)
+        end = bisect_left(self._keys, key + _PREFIX_END, start)
+        courses = self._courses
+        if end - start <= limit:
+            matches = [courses[name] for name in self._keys[start:end]]
+            return sorted(matches, key=lambda course: -course.sessions)
+        return heapq.nlargest(limit, (courses[name] for name in self._keys[start:end]),
+                              key=lambda course: course.sessions)
+
+
+def catalog_from_store(store) -> Catalog:
+    """Build the catalog from every session in a store.SessionStore."""
+    return Catalog.build((days, xpath_values) for _, days, xpath_values in store.scan())
@@ -0,0 +1,394 @@
+"""
+Compiled binary sidecar of a schedule bundle, loaded with mmap.
+
+``course_schedule.bin`` sits next to ``course_details.yaml`` and
+``course_xpath.yaml`` and holds the same schedule in fixed-width tables,
+so a consumer can answer "what's next" straight from the mapped file
+instead of parsing YAML and building entry objects. The YAML files stay
+the source of truth: the header carries a hash of both, and a sidecar
+whose hash does not match the YAML next to it is ignored.
+
+Layout (little-endian, every section starts on a 4-byte boundary):
+    header      magic, version, flags, counts and the 16-byte source hash
+    keys        u16 per row: day index * 1440 + start minute, sorted
+    rows        day, flags, start minute, end minute, course id, rule id
+    rules       every_weeks, exception count, start/end date ordinals
+                (0 for none) and the index of the first exception
+    exceptions  u32 date ordinals, sorted per rule
+    offsets     u32 per string, plus one for the end of the last
+    strings     UTF-8: course names by course id, then their XPaths
+                ('' when a course has none)
+
+Usage:
+    from compiled import open_compiled
+    table = open_compiled('bundles/alice')  # None if missing or stale
+    if table is not None:
+        print(table.next_class(datetime.now()))
+"""
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from core import DAYS, time_to_minutes
+from recurrence import Recurrence
+
+COMPILED_FILE = 'course_schedule.bin'
+MAGIC = b'CSCH'
+VERSION = 1
+
+# Header flag: some rows have a recurrence rule, so lookups cannot use the key index alone
+_HAS_RULES = 0x1
+# Row flag
+_SEND_MESSAGE = 0x1
+
+_HEADER = struct.Struct('<4sHHIIIII16s')
+_ROW = struct.Struct('<BBHHHH')
+_RULE = struct.Struct('<HHIII')
+
+Row = Tuple[str, str, str, str, bool, Optional[Recurrence]]
+
+
+class NextClass(NamedTuple):
+    """The next class found in a compiled schedule."""
+    start: datetime
+    end: datetime
+    course: str
+    send_message: bool
+    xpath: Optional[str]
+
+
+def source_hash(details: bytes, xpath: bytes) -> bytes:
+    """Hash of the YAML files a sidecar was compiled from."""
+    digest = hashlib.blake2b(digest_size=16)
+    for data in (details, xpath):
+        digest.update(len(data).to_bytes(8, 'little'))
+        digest.update(data)
+    return digest.digest()
+
+
+def _pad(data: bytearray) -> None:
+    data.extend(b'\0' * (-len(data) % 4))
+
+
+def compile_rows(rows: Iterable[Row], courses: Iterable[str], xpath_values: Dict[str, str],
+                 digest: bytes) -> bytes:
+    """
+    Encode schedule rows and XPaths as a sidecar.
+
+    Args:
+        rows: (day, course, start_time, end_time, send_message, recurrence)
+            tuples, as produced by importer
+        courses: Course order; courses only found in rows are appended
+        xpath_values: Mapping of course name to XPath
+        digest: source_hash() of the YAML files the rows come from
+
+    Returns:
+        The sidecar file content
+
+    Raises:
+        ValueError: If the schedule does not fit the format's field widths
+    """
+    names = list(dict.fromkeys(courses))
+    course_ids = {name: i for i, name in enumerate(names)}
+    rules: Dict[Recurrence, int] = {}
+    encoded = []
+    for day, course, start_time, end_time, send_message, *rule in rows:
+        if course not in course_ids:
+            course_ids[course] = len(names)
+            names.append(course)
+        recurrence = rule[0] if rule else None
+        rule_id = 0
+        if recurrence is not None:
+            rule_id = rules.setdefault(recurrence, len(rules) + 1)
+        start, end = time_to_minutes(start_time), time_to_minutes(end_time)
+        encoded.append((DAYS.index(day), start, end, _SEND_MESSAGE if send_message else 0,
+                        course_ids[course], rule_id))
+    if len(names) > 0xFFFF or len(rules) >= 0xFFFF:
+        raise ValueError("Too many courses or recurrence rules for the compiled format")
+    encoded.sort()
+
+    data = bytearray(_HEADER.size)
+    for day, start, *_ in encoded:
+        data += struct.pack('<H', day * 1440 + start)
+    _pad(data)
+    for day, start, end, flags, course_id, rule_id in encoded:
+        data += _ROW.pack(day, flags, start, end, course_id, rule_id)
+    _pad(data)
+    exceptions: List[int] = []
+    for rule in rules:
+        data += _RULE.pack(rule.every_weeks, len(rule.exceptions),
+                           rule.start.toordinal() if rule.start else 0,
+                           rule.end.toordinal() if rule.end else 0, len(exceptions))
+        exceptions.extend(sorted(day.toordinal() for day in rule.exceptions))
+    data += struct.pack(f'<{len(exceptions)}I', *exceptions)
+
+    strings = [name.encode('utf-8') for name in names]
+    strings += [(xpath_values.get(name) or '').encode('utf-8') for name in names]
+    offset = 0
+    offsets = [0]
+    for value in strings:
+        offset += len(value)
+        offsets.append(offset)
+    data += struct.pack(f'<{len(offsets)}I', *offsets)
+    data += b''.join(strings)
+
+    _HEADER.pack_into(data, 0, MAGIC, VERSION, _HAS_RULES if rules else 0, len(encoded), len(names),
+                      len(rules), len(exceptions), offset, digest)
+    return bytes(data)
+
+
+def compile_schedule(schedule, xpath_values: Dict[str, str], details_yaml: str, xpath_yaml: str) -> bytes:
+    """
+    Encode a Schedule as a sidecar for the YAML generated from it.
+
+    Args:
+        schedule: schedule.Schedule the YAML was generated from
+        xpath_values: Mapping of course name to XPath
+        details_yaml: The course_details.yaml text being written
+        xpath_yaml: The course_xpath.yaml text being written
+    """
+    rows = [(day, entry.name, entry.start_time, entry.end_time, entry.send_message, entry.recurrence)
+            for day in schedule.days for _, entry in schedule.entries(day)]
+    return compile_rows(rows, schedule.courses, xpath_values,
+                        source_hash(details_yaml.encode('utf-8'), xpath_yaml.encode('utf-8')))
+
+
+def compile_yaml(details_yaml: str, xpath_yaml: str) -> bytes:
+    """
+    Compile a sidecar from YAML text.
+
+    Raises:
+        ValueError: If either file has errors
+    """
+    from importer import parse_schedule_yaml, parse_xpath_yaml
+
+    schedule = parse_schedule_yaml(details_yaml)
+    xpaths = parse_xpath_yaml(xpath_yaml)
+    errors = schedule.errors + xpaths.errors
+    if errors:
+        raise ValueError('\n'.join(errors))
+    return compile_rows(schedule.rows, xpaths.course_order, xpaths.xpath_values,
+                        source_hash(details_yaml.encode('utf-8'), xpath_yaml.encode('utf-8')))
+
+
+def write_compiled(directory: str, data: bytes) -> str:
+    """
+    Replace the sidecar in a bundle directory atomically.
+
+    Readers that still have the old file mapped keep reading it; new
+    readers see the new one.
+
+    Returns:
+        The path written
+    """
+    path = os.path.join(directory, COMPILED_FILE)
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, 'wb') as f:
+        f.write(data)
+    os.replace(temp, path)
+    return path
+
+
+class CompiledSchedule:
+    """
+    Read-only view of a mapped sidecar.
+
+    Lookups read the tables in place; only the answer is turned into
+    Python objects.
+
+    Args:
+        path: Sidecar file
+
+    Raises:
+        ValueError: If the file is not a sidecar this version can read
+    """
+
+    def __init__(self, path: str):
+        if sys.byteorder != 'little':
+            raise ValueError("Compiled schedules can only be mapped on little-endian hosts")
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open(path)
+        except (ValueError, struct.error, TypeError):
+            self.close()
+            raise
+
+    def _open(self, path: str) -> None:
+        data = memoryview(self._map)
+        if len(data) < _HEADER.size:
+            raise ValueError(f"{path}: too short for a compiled schedule")
+        (magic, version, self.flags, rows, courses, rules, exceptions, strings,
+         self.source_hash) = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a version {VERSION} compiled schedule")
+        position = _HEADER.size
+
+        def section(size: int) -> Tuple[int, int]:
+            nonlocal position
+            start = position
+            position += size + (-size % 4)
+            return start, start + size
+
+        keys = section(2 * rows)
+        self._rows_at = section(_ROW.size * rows)[0]
+        self._rules_at = section(_RULE.size * rules)[0]
+        exceptions = section(4 * exceptions)
+        offsets = (position, position + 4 * (2 * courses + 1))
+        position = offsets[1]
+        if position + strings != len(data):
+            raise ValueError(f"{path}: truncated or corrupt compiled schedule")
+        self._data = data
+        self._keys = data[keys[0]:keys[1]].cast('H')
+        self._exceptions = data[exceptions[0]:exceptions[1]].cast('I')
+        self._offsets = data[offsets[0]:offsets[1]].cast('I')
+        self._strings_at = position
+        self._courses = courses
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __enter__(self) -> 'CompiledSchedule':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        # Views must be released before the map can be closed
+        for name in ('_keys', '_exceptions', '_offsets', '_data'):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        self._map.close()
+
+    @property
+    def course_count(self) -> int:
+        return self._courses
+
+    def _string(self, index: int) -> str:
+        start = self._strings_at + self._offsets[index]
+        return str(self._data[start:self._strings_at + self._offsets[index + 1]], 'utf-8')
+
+    def course(self, course_id: int) -> str:
+        return self._string(course_id)
+
+    def xpath(self, course_id: int) -> Optional[str]:
+        return self._string(self._courses + course_id) or None
+
+    def row(self, index: int) -> Tuple[int, int, int, int, int, int]:
+        """Return a row as (day index, flags, start minute, end minute, course id, rule id)."""
+        return _ROW.unpack_from(self._data, self._rows_at + index * _ROW.size)
+
+    def rule(self, rule_id: int) -> Optional[Recurrence]:
+        """Rebuild a recurrence rule; 0 means every week."""
+        if not rule_id:
+            return None
+        every_weeks, count, start, end, first = _RULE.unpack_from(self._data,
+                                                                  self._rules_at + (rule_id - 1) * _RULE.size)
+        return Recurrence(every_weeks, date.fromordinal(start) if start else None,
+                          date.fromordinal(end) if end else None,
+                          [date.fromordinal(day) for day in self._exceptions[first:first + count]])
+
+    def rows(self) -> Iterator[Row]:
+        """Yield the schedule as importer-style rows, e.g. for Scheduler.set_schedule()."""
+        for index in range(len(self)):
+            day, flags, start, end, course_id, rule_id = self.row(index)
+            yield (DAYS[day], self.course(course_id), f"{start // 60:02d}:{start % 60:02d}",
+                   f"{end // 60:02d}:{end % 60:02d}", bool(flags & _SEND_MESSAGE), self.rule(rule_id))
+
+    def _next_date(self, rule_id: int, day: int) -> Optional[int]:
+        # First date ordinal on or after ``day`` (same weekday) that the rule allows
+        every_weeks, count, start, end, first = _RULE.unpack_from(self._data,
+                                                                  self._rules_at + (rule_id - 1) * _RULE.size)
+        if start and day < start:
+            day += -(-(start - day) // 7) * 7
+        if every_weeks > 1:
+            # Ordinal 1 (0001-01-01) is a Monday
+            behind = ((day - (start - (start - 1) % 7)) // 7) % every_weeks
+            if behind:
+                day += 7 * (every_weeks - behind)
+        exceptions = self._exceptions[first:first + count]
+        index = bisect_left(exceptions, day)
+        while index < count and exceptions[index] <= day:
+            if exceptions[index] == day:
+                day += 7 * every_weeks
+            index += 1
+        return day if not end or day <= end else None
+
+    def next_class(self, now: datetime) -> Optional[NextClass]:
+        """
+        Find the first class starting at or after ``now``.
+
+        Without recurrence rules this is a binary search of the key index;
+        with rules every row's next date is computed arithmetically.
+
+        Returns:
+            The class, or None if the schedule is empty or every rule has ended
+        """
+        if not len(self):
+            return None
+        minute = now.hour * 60 + now.minute + (1 if now.second or now.microsecond else 0)
+        weekday = now.weekday()
+        now_key = weekday * 1440 + minute
+        monday = now.date().toordinal() - weekday
+        if not self.flags & _HAS_RULES:
+            index = bisect_left(self._keys, now_key)
+            week = 0
+            if index == len(self):
+                index, week = 0, 1
+            found = (monday + 7 * week + self._keys[index] // 1440, index)
+        else:
+            found = None
+            for index in range(len(self)):
+                day, _, start, end, _, rule_id = self.row(index)
+                ordinal = monday + day + (7 if day * 1440 + start < now_key else 0)
+                if rule_id:
+                    ordinal = self._next_date(rule_id, ordinal)
+                    if ordinal is None:
+                        continue
+                if found is None or (ordinal, start, end) < found[:3]:
+                    found = (ordinal, start, end, index)
+            if found is None:
+                return None
+            found = (found[0], found[3])
+        day, flags, start, end, course_id, _ = self.row(found[1])
+        midnight = datetime.combine(date.fromordinal(found[0]), time(), now.tzinfo)
+        return NextClass(midnight + timedelta(minutes=start), midnight + timedelta(minutes=end),
+                         self.course(course_id), bool(flags & _SEND_MESSAGE), self.xpath(course_id))
+
+    def xpath_values(self) -> Dict[str, str]:
+        """Return the course -> XPath mapping for courses that have one."""
+        values = {}
+        for course_id in range(self._courses):
+            xpath = self.xpath(course_id)
+            if xpath:
+                values[self.course(course_id)] = xpath
+        return values
+
+
+def open_compiled(directory: str) -> Optional[CompiledSchedule]:
+    """
+    Map a bundle's sidecar if it matches the YAML files next to it.
+
+    Returns:
+        The mapped schedule, or None if the sidecar is missing, unreadable
+        or was compiled from different YAML; read the YAML files then
+    """
+    try:
+        with open(os.path.join(directory, 'course_details.yaml'), 'rb') as f:
+            details = f.read()
+        with open(os.path.join(directory, 'course_xpath.yaml'), 'rb') as f:
+            xpath = f.read()
+        table = CompiledSchedule(os.path.join(directory, COMPILED_FILE))
+    except (OSError, ValueError):
+        return None
+    if table.source_hash != source_hash(details, xpath):
+        table.close()
+        return None
+    return table
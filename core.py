@@ -0,0 +1,304 @@
+"""
+Streamlit-free validation and YAML generation.
+
+Everything here works on plain Python data so it can be used from the app,
+from batch scripts and from worker processes alike. ``yaml`` is imported
+lazily so that importing this module stays cheap.
+"""
+import heapq
+import re
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple, Union
+
+if TYPE_CHECKING:
+    import yaml
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+DEFAULT_XPATH = '/html/body/div[4]/div[2]/div/div/section/div/div/div/aside/section[2]/div/div/div[1]/div[2]/div/div/div[1]/div/div/div[3]/div[1]/div/div[1]/a/span[3]'
+
+
+# The same alternatives datetime.strptime uses for %H, %M and %S, so parsing
+# accepts exactly what the original "%H:%M" / "%I:%M" / "%H:%M:%S" /
+# "%I:%M:%S" strptime loop accepted (the %I formats never matched anything
+# %H did not).
+_TIME_RE = re.compile(r'(2[0-3]|[0-1]\d|\d):([0-5]\d|\d)(?::(6[0-1]|[0-5]\d|\d))?')
+_LOOSE_TIME_RE = re.compile(r'(\d+):(\d+)(?::(\d+))?')
+
+
+def validate_time_format(time_str: str) -> Union[str, bool]:
+    """
+    Validate and standardize time format.
+
+    Accepts H:M or H:M:S with one or two digit fields; seconds are dropped.
+
+    Args:
+        time_str: Time string to validate
+
+    Returns:
+        Standardized time string in HH:MM format if valid, False otherwise
+    """
+    if not isinstance(time_str, str):
+        return False
+    match = _TIME_RE.fullmatch(time_str)
+    # strptime matches seconds up to 61 but datetime rejects leap seconds
+    if match is None or (match.group(3) is not None and int(match.group(3)) > 59):
+        return False
+    return f"{int(match.group(1)):02d}:{int(match.group(2)):02d}"
+
+
+def _time_error(value) -> str:
+    if not isinstance(value, str):
+        return f"expected text, got {type(value).__name__}"
+    if not value.strip():
+        return "missing time"
+    match = _LOOSE_TIME_RE.fullmatch(value)
+    if match is None:
+        return f"'{value}' is not in HH:MM format"
+    hours, minutes, seconds = match.groups()
+    if len(hours) > 2 or int(hours) > 23:
+        return f"hour out of range in '{value}'"
+    if len(minutes) > 2 or int(minutes) > 59:
+        return f"minute out of range in '{value}'"
+    if seconds is not None and (len(seconds) > 2 or int(seconds) > 59):
+        return f"second out of range in '{value}'"
+    return f"'{value}' is not in HH:MM format"
+
+
+def validate_times(values: Iterable) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    Validate a whole column of times in one call.
+
+    Repeated values are only parsed once.
+
+    Args:
+        values: Time values to validate
+
+    Returns:
+        One (normalized HH:MM time, None) or (None, error reason) tuple per value
+    """
+    results = []
+    seen: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+    for value in values:
+        result = seen.get(value) if isinstance(value, str) else None
+        if result is None:
+            normalized = validate_time_format(value)
+            result = (normalized, None) if normalized else (None, _time_error(value))
+            if isinstance(value, str):
+                seen[value] = result
+        results.append(result)
+    return results
+
+
+def time_to_minutes(time_str: str) -> int:
+    """
+    Convert a normalized HH:MM time to minutes since midnight.
+
+    Args:
+        time_str: Time string as returned by validate_time_format
+
+    Returns:
+        Minutes since midnight
+    """
+    hours, minutes = time_str.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def find_conflicts(schedule_data: Dict[str, List[Dict]]) -> List[Tuple[str, Dict, Dict]]:
+    """
+    Report every pair of overlapping entries in a schedule.
+
+    Uses a sweep line over each day's entries sorted by start time, keeping
+    the entries still running in a heap ordered by end time. Entries that
+    merely touch (one ends when the next starts) do not conflict.
+
+    Args:
+        schedule_data: Dictionary containing schedule information
+
+    Returns:
+        List of (day, earlier entry, later entry) tuples
+    """
+    conflicts = []
+    for day, courses in schedule_data.items():
+        spans = sorted(
+            (time_to_minutes(course['start_time']), time_to_minutes(course['end_time']), idx)
+            for idx, course in enumerate(courses)
+        )
+        active = []
+        for start, end, idx in spans:
+            while active and active[0][0] <= start:
+                heapq.heappop(active)
+            for _, other in active:
+                conflicts.append((day, courses[other], courses[idx]))
+            heapq.heappush(active, (end, idx))
+    return conflicts
+
+
+def describe_conflict(day: str, earlier: Dict, later: Dict) -> str:
+    """Format a conflict reported by find_conflicts for display."""
+    return (f"{day}: {later['name']} ({later['start_time']} - {later['end_time']}) overlaps "
+            f"{earlier['name']} ({earlier['start_time']} - {earlier['end_time']})")
+
+
+def parse_bool(value: Union[str, bool, None]) -> Optional[bool]:
+    """
+    Parse a flag such as ``send_message`` from text input.
+
+    Args:
+        value: Raw value; empty values count as False
+
+    Returns:
+        The parsed boolean, or None if the value is not recognised
+    """
+    if isinstance(value, bool):
+        return value
+    text = str(value or '').strip().lower()
+    if text in ('', '0', 'false', 'no', 'n'):
+        return False
+    if text in ('1', 'true', 'yes', 'y'):
+        return True
+    return None
+
+
+def boolean_representer(dumper: 'yaml.Dumper', data: bool) -> 'yaml.ScalarNode':
+    """
+    Custom representer for boolean values to maintain Python capitalization.
+
+    Args:
+        dumper: YAML dumper instance
+        data: Boolean value to represent
+
+    Returns:
+        YAML scalar node with proper capitalization
+    """
+    if data:
+        return dumper.represent_scalar('tag:yaml.org,2002:bool', 'True')
+    return dumper.represent_scalar('tag:yaml.org,2002:bool', 'False')
+
+
+_dumpers: Dict[bool, type] = {}
+
+# libyaml escapes and folds double-quoted scalars differently from PyYAML's
+# own emitter, so documents with strings that could need double quotes
+# (control characters, line breaks, non-BMP characters) or long non-ASCII
+# keys use the pure-Python Dumper to keep output byte-identical.
+# Compiled on first use; the character class costs a few ms to compile at import.
+_LIBYAML_UNSAFE_CHARS = '[^\x20-\x7e\xa0-\u2027\u202a-\ud7ff\ue000-\ufefe\uff00-\ufffd]'
+_libyaml_unsafe = None
+
+
+def get_dumper(pure: bool = False) -> type:
+    """
+    Return the Dumper class used for all generated YAML.
+
+    The class is built on first use from libyaml's CDumper when PyYAML was
+    compiled with it, falling back to the pure-Python Dumper. The boolean
+    representer is registered on this subclass only, leaving yaml's global
+    Dumper untouched.
+
+    Args:
+        pure: Build on the pure-Python Dumper even if libyaml is available
+
+    Returns:
+        Dumper subclass to pass to yaml.dump
+    """
+    dumper = _dumpers.get(pure)
+    if dumper is None:
+        import yaml
+
+        class ScheduleDumper(yaml.Dumper if pure else getattr(yaml, 'CDumper', yaml.Dumper)):
+            pass
+
+        ScheduleDumper.add_representer(bool, boolean_representer)
+        dumper = _dumpers[pure] = ScheduleDumper
+    return dumper
+
+
+def _needs_pure_emitter(data) -> bool:
+    global _libyaml_unsafe
+    if isinstance(data, str):
+        if _libyaml_unsafe is None:
+            _libyaml_unsafe = re.compile(_LIBYAML_UNSAFE_CHARS)
+        return _libyaml_unsafe.search(data) is not None
+    if isinstance(data, dict):
+        # The emitters measure the 128 limit for simple keys differently
+        # (bytes vs characters, before or after quoting), so long keys go
+        # through the pure-Python emitter too
+        return any(_needs_pure_emitter(key) or _needs_pure_emitter(value)
+                   or (isinstance(key, str) and len(key.encode('utf-8')) > 60)
+                   for key, value in data.items())
+    if isinstance(data, list):
+        return any(_needs_pure_emitter(item) for item in data)
+    return False
+
+
+def dump_yaml(data: Dict) -> str:
+    """Serialize data with the shared dumper and the options used for every generated file."""
+    import yaml
+
+    dumper = get_dumper(pure=_needs_pure_emitter(data))
+    return yaml.dump(data, Dumper=dumper, sort_keys=False, allow_unicode=True)
+
+
+def generate_day_yaml(day: str, courses: List[Dict]) -> str:
+    """
+    Generate the YAML fragment for a single day of the schedule.
+
+    Concatenating the fragments of every non-empty day, in order, gives
+    exactly the output of generate_course_schedule_yaml. Entries with a
+    recurrence rule (see recurrence.Recurrence) get its keys after their
+    times; plain weekly entries are written as they always were.
+
+    Args:
+        day: Day name
+        courses: The day's entries
+
+    Returns:
+        Formatted YAML string for the day
+    """
+    items = []
+    for course in courses:
+        item = {
+            'course': course['name'],
+            'start_time': course['start_time'],
+            'end_time': course['end_time'],
+            'send_message': course['send_message']  # Will now use True/False capitalization
+        }
+        recurrence = course.get('recurrence')
+        if recurrence is not None:
+            item.update(recurrence.to_fields())
+        items.append(item)
+    return dump_yaml({day: items})
+
+
+def generate_course_schedule_yaml(schedule_data: Dict[str, List[Dict]]) -> str:
+    """
+    Generate YAML string for course schedule.
+
+    Args:
+        schedule_data: Dictionary containing schedule information
+
+    Returns:
+        Formatted YAML string
+    """
+    # Only include days with courses
+    fragments = [generate_day_yaml(day, courses) for day, courses in schedule_data.items() if courses]
+    return ''.join(fragments) if fragments else dump_yaml({})
+
+
+def generate_xpath_yaml(courses: List[str], xpath_values: Dict[str, str]) -> str:
+    """
+    Generate YAML string for course xpaths.
+
+    Args:
+        courses: List of course names
+        xpath_values: Mapping of course name to XPath; courses without one
+            get DEFAULT_XPATH
+
+    Returns:
+        Formatted YAML string
+    """
+    xpath_data = {}
+    for course in courses:
+        xpath_value = xpath_values.get(course, '')
+        xpath_data[course] = xpath_value if xpath_value else DEFAULT_XPATH
+
+    return dump_yaml(xpath_data)
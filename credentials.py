@@ -0,0 +1,188 @@
+"""
+Per-user credential store.
+
+Each user's credentials are kept in their own ``.env``-format file, so
+concurrent users of one server never overwrite each other. Files are
+replaced atomically (temp file, fsync, rename) under an exclusive lock, and
+writes can run on a background executor so the Streamlit script thread
+never waits on the disk. Reads are cached and only re-parse a file after
+it changes.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: os.replace is still atomic, only the writer lock is lost
+    fcntl = None
+
+SUFFIX = '.env'
+
+
+def user_file_name(user: str) -> str:
+    """
+    Return the credential file name for a user.
+
+    The readable part is filesystem-safe; the hash keeps users whose IDs
+    sanitize to the same text apart.
+    """
+    safe = re.sub(r'[^\w.-]+', '_', user).strip('._') or 'user'
+    digest = hashlib.sha256(user.encode('utf-8')).hexdigest()[:12]
+    return f"{safe[:64]}-{digest}{SUFFIX}"
+
+
+def format_env(values: Dict[str, str]) -> str:
+    """Render values in the key=value format of the original .env file."""
+    for key, value in values.items():
+        if '\n' in value or '\r' in value:
+            raise ValueError(f"{key} must not contain line breaks")
+    return '\n'.join(f"{key}={value}" for key, value in values.items())
+
+
+def parse_env(text: str) -> Dict[str, str]:
+    """Parse key=value lines, ignoring blanks and comments; values are kept exactly as written."""
+    values = {}
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped and not stripped.startswith('#') and '=' in line:
+            key, value = line.split('=', 1)
+            values[key.strip()] = value
+    return values
+
+
+def atomic_write(path: str, content: str) -> None:
+    """
+    Replace a file's content atomically.
+
+    The content goes to a temp file in the same directory, which is fsynced
+    and renamed over the target while an exclusive lock on ``path.lock`` is
+    held, then the directory is fsynced so the rename itself is durable.
+    Readers see either the old or the new file, never a partial one.
+
+    Args:
+        path: File to replace
+        content: New content
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    lock_fd = os.open(path + '.lock', os.O_CREAT | os.O_RDWR, 0o600)
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=SUFFIX)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        if hasattr(os, 'O_DIRECTORY'):
+            dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(lock_fd)
+
+
+class CredentialStore:
+    """
+    Directory of per-user credential files.
+
+    Args:
+        directory: Directory holding one file per user; created if missing
+        workers: Background threads used by save()
+    """
+
+    def __init__(self, directory: str, workers: int = 2):
+        self.directory = directory
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='credential-writer')
+        # path -> ((mtime_ns, size, inode), parsed values)
+        self._cache: Dict[str, Tuple[Tuple[int, int, int], Dict[str, str]]] = {}
+        self._cache_lock = threading.Lock()
+
+    def path(self, user: str) -> str:
+        """Return the credential file path for a user."""
+        return os.path.join(self.directory, user_file_name(user))
+
+    def save_sync(self, user: str, lms_id: str, password: str, webhook_url: Optional[str] = None) -> str:
+        """
+        Write a user's credentials, replacing any previous ones.
+
+        Args:
+            user: User the credentials belong to
+            lms_id: LMS ID/username
+            password: LMS password
+            webhook_url: Notification webhook, ``null`` when not set
+
+        Returns:
+            Path of the written file
+
+        Raises:
+            ValueError: If a value contains a line break
+        """
+        path = self.path(user)
+        atomic_write(path, format_env({'lmsid': lms_id, 'password': password,
+                                       'webhookurl': webhook_url or 'null'}))
+        return path
+
+    def save(self, user: str, lms_id: str, password: str, webhook_url: Optional[str] = None) -> 'Future[str]':
+        """Run save_sync on the background executor and return its future."""
+        return self._executor.submit(self.save_sync, user, lms_id, password, webhook_url)
+
+    def get(self, user: str) -> Optional[Dict[str, str]]:
+        """
+        Return a user's credentials.
+
+        The file is only re-read when its mtime, size or inode changed since
+        the last call, so repeated reads cost one stat.
+
+        Args:
+            user: User to look up
+
+        Returns:
+            Mapping with lmsid, password and webhookurl, or None if the user
+            has no credentials
+        """
+        path = self.path(user)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        cached = self._cache.get(path)
+        if cached is not None and cached[0] == key:
+            return dict(cached[1])
+
+        try:
+            f = open(path, encoding='utf-8')
+        except FileNotFoundError:
+            return None
+        with f:
+            # Key the cache on the file actually read: a write between the
+            # stat above and the open would otherwise be cached under the old key
+            stat = os.fstat(f.fileno())
+            key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+            values = parse_env(f.read())
+        with self._cache_lock:
+            self._cache[path] = (key, values)
+        return dict(values)
+
+    def files(self) -> List[str]:
+        """Return the credential files in the store."""
+        return sorted(name for name in os.listdir(self.directory)
+                      if name.endswith(SUFFIX) and not name.startswith('.tmp-'))
+
+    def close(self) -> None:
+        """Wait for queued writes and stop the background executor."""
+        self._executor.shutdown(wait=True)
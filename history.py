@@ -0,0 +1,233 @@
+"""
+Undo/redo for a session's schedule and XPath values.
+
+Each recorded state is a Snapshot of immutable tuples: one tuple of
+entries per day, plus the course list and one (course, XPath) pair per
+course. A new snapshot is made by path copying: only the days whose
+version changed since the last snapshot get a new tuple, every other day
+tuple is shared with the previous snapshot, and the Entry records
+themselves are always shared with the live schedule. The course list and
+XPath pairs are versioned the same way (Schedule.courses_version,
+schedule.XPathValues), so they are only rebuilt when they changed, and an
+XPath edit then shares every pair but the one it touched. Recording an
+edit therefore costs the size of the day it touched, not the size of the
+schedule. History is bounded; the oldest states are evicted first.
+
+Usage:
+    history = History()
+    history.record(schedule, xpath_values)            # baseline
+    schedule.remove(entry_id)
+    history.record(schedule, xpath_values, "Remove Math")
+    schedule, xpath_values, label = history.undo(schedule, xpath_values)
+"""
+import weakref
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from schedule import Entry, Schedule, XPathValues
+
+DEFAULT_LIMIT = 50
+
+
+class Snapshot:
+    """Immutable state of a schedule and its XPaths at one point in the history."""
+
+    __slots__ = ('days', 'entries', 'courses', 'xpaths')
+
+    def __init__(self, days: Tuple[str, ...], entries: Tuple[Tuple[Entry, ...], ...],
+                 courses: Tuple[str, ...], xpaths: Tuple[Tuple[str, str], ...]):
+        self.days = days
+        # One tuple of entries per day, in start time order
+        self.entries = entries
+        self.courses = courses
+        self.xpaths = xpaths
+
+    def same_as(self, other: 'Snapshot') -> bool:
+        """True if both snapshots hold the same state, compared by shared parts first."""
+        return ((self.courses is other.courses or self.courses == other.courses)
+                and (self.xpaths is other.xpaths or self.xpaths == other.xpaths)
+                and all(mine is theirs or mine == theirs for mine, theirs in zip(self.entries, other.entries)))
+
+    def restore(self) -> Tuple[Schedule, Dict[str, str]]:
+        """Return a new schedule and XPath mapping holding this state; entries are shared, not copied."""
+        return (Schedule.from_entries(dict(zip(self.days, self.entries)), self.courses, days=list(self.days)),
+                XPathValues(self.xpaths))
+
+
+class History:
+    """
+    Bounded undo/redo stacks of Snapshots.
+
+    Record the state after every edit; undo and redo hand back a schedule
+    and XPath mapping to replace the session's with.
+
+    Args:
+        limit: Edits that can be undone; older ones are dropped
+    """
+
+    def __init__(self, limit: int = DEFAULT_LIMIT):
+        # (label of the edit, state before it); appending past maxlen evicts the oldest
+        self._undo: Deque[Tuple[str, Snapshot]] = deque(maxlen=limit)
+        # (label of the edit, state after it), most recent last
+        self._redo: List[Tuple[str, Snapshot]] = []
+        self._current: Optional[Snapshot] = None
+        # Which schedule object and day versions _current was taken from
+        self._source: Optional[Tuple[weakref.ref, Dict[str, int]]] = None
+        # Course list and XPath mapping versions _current was taken from;
+        # the mapping is only tracked when it is an XPathValues
+        self._courses_version: Optional[int] = None
+        self._xpath_source: Optional[Tuple[weakref.ref, int]] = None
+
+    @property
+    def limit(self) -> int:
+        return self._undo.maxlen
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    @property
+    def undo_label(self) -> Optional[str]:
+        """Label of the edit undo() would revert."""
+        return self._undo[-1][0] if self._undo else None
+
+    @property
+    def redo_label(self) -> Optional[str]:
+        """Label of the edit redo() would apply again."""
+        return self._redo[-1][0] if self._redo else None
+
+    def __len__(self) -> int:
+        return len(self._undo)
+
+    def _snapshot(self, schedule: Schedule, xpath_values: Dict[str, str]) -> Snapshot:
+        days = tuple(schedule.days)
+        current = self._current
+        versions = None
+        if current is not None and current.days == days and self._source[0]() is schedule:
+            versions = self._source[1]
+        entries = []
+        for i, day in enumerate(days):
+            if versions is not None and versions.get(day) == schedule.day_version(day):
+                entries.append(current.entries[i])
+            else:
+                day_entries = tuple(entry for _, entry in schedule.entries(day))
+                # A replaced schedule with the same entries still shares the old tuple
+                if current is not None and current.days == days and current.entries[i] == day_entries:
+                    day_entries = current.entries[i]
+                entries.append(day_entries)
+        if versions is not None and self._courses_version == schedule.courses_version:
+            courses = current.courses
+        else:
+            courses = tuple(schedule.courses)
+            if current is not None and courses == current.courses:
+                courses = current.courses
+        return Snapshot(days, tuple(entries), courses, self._xpath_pairs(xpath_values))
+
+    def _xpath_pairs(self, xpath_values: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+        current = self._current
+        if current is None:
+            return tuple(xpath_values.items())
+        source = self._xpath_source
+        if (source is not None and source[0]() is xpath_values
+                and source[1] == getattr(xpath_values, 'version', None)):
+            return current.xpaths
+        # Keep the previous pair of every course whose XPath is unchanged
+        previous = {pair[0]: pair for pair in current.xpaths}
+        pairs = []
+        for course, xpath in xpath_values.items():
+            pair = previous.get(course)
+            pairs.append(pair if pair is not None and pair[1] == xpath else (course, xpath))
+        pairs = tuple(pairs)
+        return current.xpaths if pairs == current.xpaths else pairs
+
+    def _track(self, schedule: Schedule, xpath_values: Dict[str, str], snapshot: Snapshot) -> None:
+        self._current = snapshot
+        # A weak reference: an id could be reused by a later schedule with clashing versions
+        self._source = (weakref.ref(schedule), {day: schedule.day_version(day) for day in snapshot.days})
+        self._courses_version = schedule.courses_version
+        if isinstance(xpath_values, XPathValues):
+            self._xpath_source = (weakref.ref(xpath_values), xpath_values.version)
+        else:
+            self._xpath_source = None
+
+    def record(self, schedule: Schedule, xpath_values: Dict[str, str], label: str = "Edit") -> bool:
+        """
+        Record the state after an edit.
+
+        The first call only sets the baseline. Recording a state equal to
+        the last one does nothing; anything else can be undone and clears
+        the redo stack.
+
+        Args:
+            schedule: The session's schedule
+            xpath_values: The session's XPath mapping
+            label: What the edit did, shown on the undo button
+
+        Returns:
+            True if an undoable step was added
+        """
+        snapshot = self._snapshot(schedule, xpath_values)
+        previous = self._current
+        self._track(schedule, xpath_values, snapshot)
+        if previous is None or snapshot.same_as(previous):
+            return False
+        self._undo.append((label, previous))
+        self._redo.clear()
+        return True
+
+    def undo(self, schedule: Schedule, xpath_values: Dict[str, str]
+             ) -> Optional[Tuple[Schedule, Dict[str, str], str]]:
+        """
+        Revert the last edit.
+
+        Changes made since the last record() are recorded first, so they
+        are what gets undone.
+
+        Args:
+            schedule: The session's schedule
+            xpath_values: The session's XPath mapping
+
+        Returns:
+            (schedule, xpath_values, label of the undone edit) to put in the
+            session, or None if there is nothing to undo
+        """
+        self.record(schedule, xpath_values)
+        if not self._undo:
+            return None
+        label, previous = self._undo.pop()
+        self._redo.append((label, self._current))
+        return self._restore(previous) + (label,)
+
+    def redo(self, schedule: Schedule, xpath_values: Dict[str, str]
+             ) -> Optional[Tuple[Schedule, Dict[str, str], str]]:
+        """
+        Apply the last undone edit again.
+
+        Returns:
+            (schedule, xpath_values, label of the edit), or None if there is
+            nothing to redo; an edit recorded after the undo clears the redo stack
+        """
+        self.record(schedule, xpath_values)
+        if not self._redo:
+            return None
+        label, following = self._redo.pop()
+        self._undo.append((label, self._current))
+        return self._restore(following) + (label,)
+
+    def _restore(self, snapshot: Snapshot) -> Tuple[Schedule, Dict[str, str]]:
+        schedule, xpath_values = snapshot.restore()
+        self._track(schedule, xpath_values, snapshot)
+        return schedule, xpath_values
+
+    def clear(self) -> None:
+        """Forget every step; the next record() sets a new baseline."""
+        self._undo.clear()
+        self._redo.clear()
+        self._current = None
+        self._source = None
+        self._courses_version = None
+        self._xpath_source = None
@@ -0,0 +1,270 @@
+"""
+Bulk import of existing course_details.yaml, course_xpath.yaml and CSV files.
+
+Files are parsed with the libyaml-backed safe loader when available and
+validated in a single pass that collects every row-level error, so a whole
+upload can be checked, reported and then applied to the session at once.
+"""
+import csv
+import io
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from core import DAYS, DEFAULT_XPATH, describe_conflict, parse_bool, time_to_minutes, validate_times
+from recurrence import Recurrence, fields_from_row
+from schedule import Schedule
+
+
+class ImportResult:
+    """Validated rows and XPaths from one or more files, plus every error found."""
+
+    def __init__(self):
+        # (day, name, start_time, end_time, send_message, recurrence) tuples;
+        # recurrence is None for entries that take place every week
+        self.rows: List[Tuple[str, str, str, str, bool, Optional[Recurrence]]] = []
+        self.xpath_values: Dict[str, str] = {}
+        # Course order as listed in XPath files, used to restore the session's course order
+        self.course_order: Dict[str, None] = {}
+        self.errors: List[str] = []
+
+    def merge(self, other: 'ImportResult') -> None:
+        self.rows.extend(other.rows)
+        self.xpath_values.update(other.xpath_values)
+        self.course_order.update(other.course_order)
+        self.errors.extend(other.errors)
+
+
+def _safe_load(text: str):
+    import yaml
+
+    return yaml.load(text, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+
+
+RawRow = Tuple[str, object, object, object, object, object, str, Dict]
+
+
+def _time_text(value):
+    # YAML 1.1 reads unquoted times such as 12:05 as base-60 integers (725),
+    # and 12:05:30 as 43530. Base-60 integers never start with a 0 field, so
+    # an H:M:S value is at least 3600 while any H:M time is below that
+    if isinstance(value, int) and not isinstance(value, bool):
+        if value >= 3600:
+            return f"{value // 3600}:{value // 60 % 60:02d}:{value % 60:02d}"
+        return f"{value // 60}:{value % 60:02d}"
+    return value.strip() if isinstance(value, str) else value
+
+
+def _validate_rows(result: ImportResult, raw_rows: List[RawRow]) -> None:
+    """
+    Validate raw (where, day, name, start, end, send_message, xpath, rule fields) rows in one pass.
+
+    Both time columns are checked with a single validate_times call each;
+    every problem is added to result.errors and valid rows to result.rows.
+    """
+    starts = validate_times([_time_text(row[3]) for row in raw_rows])
+    ends = validate_times([_time_text(row[4]) for row in raw_rows])
+
+    for (where, day, name, _, _, send_message, xpath, rule), (start_time, start_error), (end_time, end_error) \
+            in zip(raw_rows, starts, ends):
+        day = str(day or '').strip().capitalize()
+        # Names are kept verbatim so that generated files round-trip exactly
+        name = str(name) if isinstance(name, (str, int, float)) and not isinstance(name, bool) else ''
+        flag = parse_bool(send_message)
+
+        if day not in DAYS:
+            result.errors.append(f"{where}: unknown day '{day}'")
+        elif not name.strip():
+            result.errors.append(f"{where}: missing course name")
+        elif start_error or end_error:
+            result.errors.append(f"{where}: invalid {'start' if start_error else 'end'} time, "
+                                 f"{start_error or end_error}")
+        elif flag is None:
+            result.errors.append(f"{where}: invalid send_message '{send_message}'")
+        elif time_to_minutes(end_time) <= time_to_minutes(start_time):
+            result.errors.append(f"{where}: end time {end_time} must be after start time {start_time}")
+        else:
+            try:
+                recurrence = Recurrence.from_fields(rule) if rule else None
+            except ValueError as e:
+                result.errors.append(f"{where}: {e}")
+                continue
+            result.rows.append((day, name, start_time, end_time, flag, recurrence))
+            if xpath:
+                result.xpath_values[sys.intern(name)] = sys.intern(xpath)
+
+
+def parse_schedule_yaml(text: str, source: str = 'course_details.yaml') -> ImportResult:
+    """
+    Parse and validate a course_details.yaml document.
+
+    Args:
+        text: YAML text mapping day -> list of course entries
+        source: File name used in error messages
+
+    Returns:
+        ImportResult with the valid rows and every error found
+    """
+    return _schedule_result(_safe_load(text), source)
+
+
+def _schedule_result(data, source: str) -> ImportResult:
+    result = ImportResult()
+    if data is None:
+        return result
+    if not isinstance(data, dict):
+        result.errors.append(f"{source}: expected a mapping of day to courses")
+        return result
+
+    raw_rows = []
+    for day, courses in data.items():
+        if not isinstance(courses, list):
+            result.errors.append(f"{source}: {day}: expected a list of courses")
+            continue
+        for idx, course in enumerate(courses, start=1):
+            where = f"{source}: {day} #{idx}"
+            if not isinstance(course, dict):
+                result.errors.append(f"{where}: expected a course mapping")
+                continue
+            raw_rows.append((where, day, course.get('course'), course.get('start_time'),
+                             course.get('end_time'), course.get('send_message', False), '', course))
+    _validate_rows(result, raw_rows)
+    return result
+
+
+def parse_xpath_yaml(text: str, source: str = 'course_xpath.yaml') -> ImportResult:
+    """
+    Parse and validate a course_xpath.yaml document.
+
+    XPaths equal to DEFAULT_XPATH are treated as unset, matching how they
+    were generated.
+
+    Args:
+        text: YAML text mapping course name -> XPath
+        source: File name used in error messages
+
+    Returns:
+        ImportResult with the XPath values, course order and every error found
+    """
+    return _xpath_result(_safe_load(text), source)
+
+
+def _xpath_result(data, source: str) -> ImportResult:
+    result = ImportResult()
+    if data is None:
+        return result
+    if not isinstance(data, dict):
+        result.errors.append(f"{source}: expected a mapping of course to XPath")
+        return result
+
+    for course, xpath in data.items():
+        if not isinstance(xpath, str) or not xpath.strip():
+            result.errors.append(f"{source}: {course}: XPath must be a non-empty string")
+            continue
+        course = str(course)
+        result.course_order[course] = None
+        if xpath != DEFAULT_XPATH:
+            result.xpath_values[sys.intern(course)] = sys.intern(xpath)
+    return result
+
+
+def parse_csv(text: str, source: str = 'courses.csv') -> ImportResult:
+    """
+    Parse and validate a CSV with day, course, start, end, send_message and
+    optional xpath columns (the batch roster format; a student column is ignored).
+    Optional every_weeks, start_date, end_date and except columns give a
+    recurrence rule; several exception dates are separated by ``;``.
+
+    Args:
+        text: CSV text with a header row
+        source: File name used in error messages
+
+    Returns:
+        ImportResult with the valid rows, XPaths and every error found
+    """
+    result = ImportResult()
+    reader = csv.DictReader(io.StringIO(text))
+    missing = [field for field in ('day', 'course', 'start', 'end') if field not in (reader.fieldnames or [])]
+    if missing:
+        result.errors.append(f"{source}: missing columns: {', '.join(missing)}")
+        return result
+
+    raw_rows = [(f"{source}: line {reader.line_num}", row.get('day'), (row.get('course') or '').strip(),
+                 row.get('start'), row.get('end'), row.get('send_message'), (row.get('xpath') or '').strip(),
+                 fields_from_row(row))
+                for row in reader]
+    _validate_rows(result, raw_rows)
+    return result
+
+
+def parse_file(name: str, text: str) -> ImportResult:
+    """
+    Parse an uploaded file, picking the format from its name and content.
+
+    Args:
+        name: File name
+        text: File content
+
+    Returns:
+        ImportResult for the file
+    """
+    if os.path.splitext(name)[1].lower() == '.csv':
+        return parse_csv(text, name)
+
+    try:
+        data = _safe_load(text)
+    except Exception as e:
+        result = ImportResult()
+        result.errors.append(f"{name}: not valid YAML ({e})")
+        return result
+    # Schedule files map days to lists, XPath files map courses to strings
+    if isinstance(data, dict) and any(isinstance(value, list) for value in data.values()):
+        return _schedule_result(data, name)
+    return _xpath_result(data, name)
+
+
+def parse_files(files: List[Tuple[str, str]]) -> ImportResult:
+    """
+    Parse and validate several files together into one result.
+
+    Args:
+        files: (file name, content) pairs
+
+    Returns:
+        One merged ImportResult
+    """
+    result = ImportResult()
+    for name, text in files:
+        result.merge(parse_file(name, text))
+    return result
+
+
+def unknown_courses(result: ImportResult, schedule: Schedule) -> List[str]:
+    """Return XPath courses that are neither imported nor already scheduled."""
+    imported = {row[1] for row in result.rows}
+    return [course for course in {**result.course_order, **result.xpath_values}
+            if course not in imported and not schedule.has_course(course)]
+
+
+def apply_import(result: ImportResult, schedule: Schedule, xpath_values: Dict[str, str]) -> List[str]:
+    """
+    Apply a validated import to the session state in one pass.
+
+    Overlapping slots are kept and reported rather than rejected, so an
+    imported schedule is never partially applied.
+
+    Args:
+        result: Validated import without errors
+        schedule: Session schedule to add rows to
+        xpath_values: Session XPath mapping to update
+
+    Returns:
+        Human-readable descriptions of overlapping slots after the import
+    """
+    for day, name, start_time, end_time, send_message, recurrence in result.rows:
+        schedule.add(day, name, start_time, end_time, send_message, allow_conflicts=True, recurrence=recurrence)
+    xpath_values.update(result.xpath_values)
+    if result.course_order:
+        schedule.reorder_courses(list(result.course_order))
+
+    return [describe_conflict(*conflict) for conflict in schedule.conflicts()]
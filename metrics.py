@@ -0,0 +1,315 @@
+"""
+In-process metrics for app reruns.
+
+A Registry holds counters, gauges and histograms keyed by name and labels.
+Updates are a dict lookup and an add under one lock, so the hot path
+stays cheap. The registry can be rendered as Prometheus text or JSON and
+served from a small sidecar HTTP server. Rerun tracks one script run:
+total time, widgets rendered and, when enabled, a cProfile dump for runs
+over a threshold.
+"""
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of histogram buckets, +Inf is implied
+TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COUNT_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative bucket counts plus count, sum and max of observed values."""
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'max')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+
+class Registry:
+    """Thread-safe store of counters, gauges and histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._types: Dict[str, str] = {}
+        self._values: Dict[Tuple[str, Labels], object] = {}
+
+    def _key(self, name: str, kind: str, labels: Dict[str, str]) -> Tuple[str, Labels]:
+        known = self._types.setdefault(name, kind)
+        if known != kind:
+            raise ValueError(f"{name} is a {known}, not a {kind}")
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Add to a counter."""
+        with self._lock:
+            key = self._key(name, 'counter', labels)
+            self._values[key] = self._values.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        """Set a gauge."""
+        with self._lock:
+            self._values[self._key(name, 'gauge', labels)] = value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = TIME_BUCKETS, **labels) -> None:
+        """Record a value in a histogram; buckets are fixed by the first observation."""
+        with self._lock:
+            key = self._key(name, 'histogram', labels)
+            histogram = self._values.get(key)
+            if histogram is None:
+                histogram = self._values[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Observe the seconds a block takes, also when it raises (st.rerun() does)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> Dict[str, List[Dict]]:
+        """
+        Return every metric as plain data.
+
+        Returns:
+            Mapping of metric name to a list of {labels, value} or
+            {labels, count, sum, max, buckets} dicts
+        """
+        with self._lock:
+            items = [(name, labels, value if not isinstance(value, Histogram) else
+                      {'count': value.count, 'sum': value.sum, 'max': value.max,
+                       'buckets': dict(zip(map(str, value.buckets), _cumulative(value.counts)))})
+                     for (name, labels), value in self._values.items()]
+        result: Dict[str, List[Dict]] = {}
+        for name, labels, value in sorted(items, key=lambda item: (item[0], item[1])):
+            sample = {'labels': dict(labels)}
+            if isinstance(value, dict):
+                sample.update(value)
+            else:
+                sample['value'] = value
+            result.setdefault(name, []).append(sample)
+        return result
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Render the registry in the Prometheus text exposition format."""
+        with self._lock:
+            types = dict(self._types)
+        lines = []
+        for name, samples in self.snapshot().items():
+            lines.append(f"# TYPE {name} {types[name]}")
+            for sample in samples:
+                labels = sample['labels']
+                if 'value' in sample:
+                    lines.append(f"{name}{_format_labels(labels)} {sample['value']}")
+                    continue
+                for bound, count in sample['buckets'].items():
+                    lines.append(f"{name}_bucket{_format_labels(labels, le=bound)} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels, le='+Inf')} {sample['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {sample['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {sample['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def clear(self) -> None:
+        with self._lock:
+            self._types.clear()
+            self._values.clear()
+
+
+def _cumulative(counts: List[int]) -> List[int]:
+    total = 0
+    result = []
+    for count in counts:
+        total += count
+        result.append(total)
+    return result
+
+
+def _format_labels(labels: Dict[str, str], **extra) -> str:
+    labels = {**labels, **extra}
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + '}'
+
+
+# Process-wide registry the app reports into
+REGISTRY = Registry()
+
+_current = threading.local()
+# Only one run is profiled at a time; Python 3.12+ allows a single active profiler per process
+_profile_lock = threading.Lock()
+
+
+class Rerun:
+    """
+    Measures one script run; use as a context manager around the script.
+
+    Args:
+        registry: Registry to report into
+        kind: Label for the run, e.g. ``app`` or a fragment's name
+        profile_dir: Directory for cProfile dumps; profiling is off if None.
+            Only one run is profiled at a time, overlapping runs go unprofiled
+        profile_threshold: Seconds a run must take for its profile to be kept
+    """
+
+    def __init__(self, registry: Registry = REGISTRY, kind: str = 'app', profile_dir: Optional[str] = None,
+                 profile_threshold: float = 0.5):
+        self.registry = registry
+        self.kind = kind
+        self.profile_dir = profile_dir
+        self.profile_threshold = profile_threshold
+        self.widgets: Dict[str, int] = {}
+        self.seconds = 0.0
+        self._profiler: Optional[cProfile.Profile] = None
+
+    def __enter__(self) -> 'Rerun':
+        self._previous = getattr(_current, 'rerun', None)
+        _current.rerun = self
+        if self.profile_dir and _profile_lock.acquire(blocking=False):
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.seconds = time.perf_counter() - self._start
+        if self._profiler is not None:
+            self._profiler.disable()
+            _profile_lock.release()
+        _current.rerun = self._previous
+        self.registry.observe('rerun_seconds', self.seconds, kind=self.kind)
+        self.registry.observe('rerun_widgets', sum(self.widgets.values()), buckets=COUNT_BUCKETS, kind=self.kind)
+        for kind, count in self.widgets.items():
+            self.registry.inc('widgets_rendered_total', count, kind=kind)
+        if self._profiler is not None and self.seconds >= self.profile_threshold:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            path = os.path.join(self.profile_dir, f"{self.kind}-{time.strftime('%Y%m%d-%H%M%S')}-"
+                                                  f"{int(self.seconds * 1000)}ms-{threading.get_ident()}.prof")
+            self._profiler.dump_stats(path)
+            self.registry.inc('slow_rerun_profiles_total')
+            logger.warning("Rerun took %.0f ms; profile written to %s", self.seconds * 1000, path)
+
+
+@contextmanager
+def section(name: str, registry: Registry = REGISTRY, **rerun_options) -> Iterator[None]:
+    """
+    Time a section of the script as ``section_seconds{section=name}``.
+
+    A fragment rerun executes only its own function; if no run is being
+    measured on this thread, the section is measured as a Rerun of its own
+    kind, with ``rerun_options`` passed on.
+    """
+    if getattr(_current, 'rerun', None) is not None:
+        with registry.timer('section_seconds', section=name):
+            yield
+    else:
+        with Rerun(registry, kind=name, **rerun_options), registry.timer('section_seconds', section=name):
+            yield
+
+
+def timed_section(name: str, **options):
+    """Decorator running a function inside section(name)."""
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with section(name, **options):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count_widget(kind: str) -> None:
+    """Count a rendered widget against the run in progress on this thread, if any."""
+    rerun = getattr(_current, 'rerun', None)
+    if rerun is not None:
+        rerun.widgets[kind] = rerun.widgets.get(kind, 0) + 1
+
+
+def instrument_widgets(module, names: Tuple[str, ...]) -> None:
+    """
+    Wrap widget functions of a module (streamlit) so each call is counted.
+
+    Safe to call more than once; functions already wrapped are left alone.
+    Calls outside a Rerun are passed through uncounted.
+    """
+    for name in names:
+        function = getattr(module, name, None)
+        if function is None or getattr(function, '_counted', False):
+            continue
+
+        def counted(*args, _function=function, _name=name, **kwargs):
+            count_widget(_name)
+            return _function(*args, **kwargs)
+
+        counted._counted = True
+        counted.__wrapped__ = function
+        counted.__doc__ = function.__doc__
+        setattr(module, name, counted)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: Registry = REGISTRY
+
+    def do_GET(self) -> None:
+        if self.path in ('/metrics', '/'):
+            body, content_type = self.registry.to_prometheus(), 'text/plain; version=0.0.4'
+        elif self.path == '/metrics.json':
+            body, content_type = self.registry.to_json(), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def serve(port: int, registry: Registry = REGISTRY, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """
+    Serve /metrics (Prometheus text) and /metrics.json from a daemon thread.
+
+    Returns:
+        The running server; call shutdown() to stop it
+    """
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
@@ -0,0 +1,266 @@
+"""
+Batched webhook notifications for courses with ``send_message`` set.
+
+Events are queued without blocking, coalesced per webhook URL over a short
+window and posted as one message per webhook. Requests go over pooled
+keep-alive connections with bounded concurrency, and failed deliveries are
+retried with jittered exponential backoff.
+"""
+import asyncio
+import http.client
+import json
+import logging
+import queue
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from scheduler import JOIN, ClassEvent
+
+logger = logging.getLogger(__name__)
+
+# Webhook values that mean "not configured", as written by the credentials form
+UNSET_WEBHOOKS = ('', 'null', 'none')
+
+
+def describe_event(event: ClassEvent) -> str:
+    """Return the notification line for one event."""
+    verb = 'Joining' if event.action == JOIN else 'Leaving'
+    return f"{verb} {event.course} ({event.start_time} - {event.end_time})"
+
+
+def default_payload(events: List[ClassEvent]) -> Dict:
+    """Build a webhook body posting all events as one message."""
+    return {'content': '\n'.join(describe_event(event) for event in events)}
+
+
+def webhooks_from_credentials(store) -> Callable[[str], Optional[str]]:
+    """
+    Look up webhook URLs in a credentials.CredentialStore.
+
+    The store caches parsed files, but every call still stats the user's
+    file, so use Notifier.handle() to keep the lookup off the event loop.
+    """
+    def webhook_for(user: str) -> Optional[str]:
+        values = store.get(user) or {}
+        url = values.get('webhookurl', '')
+        return None if url.strip().lower() in UNSET_WEBHOOKS else url
+
+    return webhook_for
+
+
+class DeliveryError(Exception):
+    """Raised for a response that should be retried."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP(S) connections per origin, shared by worker threads.
+
+    Args:
+        size: Idle connections kept per origin
+        timeout: Socket timeout in seconds
+    """
+
+    def __init__(self, size: int = 4, timeout: float = 10.0):
+        self.size = size
+        self.timeout = timeout
+        self._idle: Dict[Tuple[str, str, int], 'queue.LifoQueue[http.client.HTTPConnection]'] = {}
+        self.opened = 0
+
+    def _origin(self, url: str) -> Tuple[str, str, int, str]:
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"Not an HTTP(S) URL: {url}")
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        return parts.scheme, parts.hostname, port, path
+
+    def post(self, url: str, body: bytes) -> int:
+        """
+        POST a JSON body, reusing an idle connection to the origin if there is one.
+
+        Returns:
+            Response status
+
+        Raises:
+            DeliveryError: For 429 and 5xx responses and connection errors
+        """
+        scheme, host, port, path = self._origin(url)
+        idle = self._idle.setdefault((scheme, host, port), queue.LifoQueue(maxsize=self.size))
+        try:
+            conn = idle.get_nowait()
+        except queue.Empty:
+            cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+            conn = cls(host, port, timeout=self.timeout)
+            self.opened += 1
+
+        try:
+            conn.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            raise DeliveryError(f"{type(e).__name__}: {e}") from e
+
+        if response.will_close:
+            conn.close()
+        else:
+            try:
+                idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+        if response.status == 429 or response.status >= 500:
+            retry_after = response.getheader('Retry-After')
+            raise DeliveryError(f"HTTP {response.status}",
+                                float(retry_after) if retry_after and retry_after.isdigit() else None)
+        return response.status
+
+    def close(self) -> None:
+        for idle in self._idle.values():
+            while True:
+                try:
+                    idle.get_nowait().close()
+                except queue.Empty:
+                    break
+
+
+class Notifier:
+    """
+    Coalescing, retrying webhook dispatcher.
+
+    notify() only appends to a buffer and must be called from the event
+    loop thread; delivery runs in tasks on that loop, with the blocking
+    HTTP calls on a small thread pool. handle() does the same but looks
+    the webhook up on the loop's default executor, for lookups that touch
+    the disk.
+
+    Args:
+        webhook_for: Returns a user's webhook URL, or None if they have none
+        window: Seconds events are collected before a batch is sent
+        max_concurrency: Requests in flight at once
+        max_retries: Retries per batch after the first attempt
+        base_delay: First retry delay in seconds, doubled per retry
+        max_delay: Upper bound for a retry delay
+        payload: Builds the request body from a batch of events
+        timeout: Socket timeout in seconds
+        latency_samples: Most recent batch latencies kept in ``latencies``
+    """
+
+    def __init__(self, webhook_for: Callable[[str], Optional[str]], window: float = 1.0,
+                 max_concurrency: int = 8, max_retries: int = 5, base_delay: float = 0.5,
+                 max_delay: float = 30.0, payload: Callable[[List[ClassEvent]], Dict] = default_payload,
+                 timeout: float = 10.0, latency_samples: int = 10000):
+        self.webhook_for = webhook_for
+        self.window = window
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.payload = payload
+        self.pool = ConnectionPool(size=max_concurrency, timeout=timeout)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='webhook')
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # webhook URL -> (events, time the first one was queued)
+        self._buffer: Dict[str, Tuple[List[ClassEvent], float]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        # Seconds from the first event of a batch being queued to its delivery,
+        # bounded so a long-running daemon does not grow it forever
+        self.latencies: Deque[float] = deque(maxlen=latency_samples)
+
+    def notify(self, event: ClassEvent) -> bool:
+        """
+        Queue an event for its user's webhook.
+
+        Returns immediately; events without ``send_message`` or whose user
+        has no webhook are ignored. webhook_for is called inline, so it
+        must not block.
+
+        Returns:
+            True if the event was queued
+        """
+        if not event.send_message:
+            return False
+        return self._queue(self.webhook_for(event.user), event)
+
+    async def handle(self, event: ClassEvent) -> None:
+        """Scheduler handler that queues the event, looking its webhook up off the event loop."""
+        if not event.send_message:
+            return
+        url = await asyncio.get_running_loop().run_in_executor(None, self.webhook_for, event.user)
+        self._queue(url, event)
+
+    def _queue(self, url: Optional[str], event: ClassEvent) -> bool:
+        if not url:
+            return False
+        batch = self._buffer.get(url)
+        if batch is None:
+            self._buffer[url] = ([event], time.perf_counter())
+        else:
+            batch[0].append(event)
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return True
+
+    def _flush(self) -> None:
+        self._flush_handle = None
+        buffer, self._buffer = self._buffer, {}
+        for url, (events, queued) in buffer.items():
+            task = asyncio.ensure_future(self._deliver(url, events, queued))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _deliver(self, url: str, events: List[ClassEvent], queued: float) -> None:
+        body = json.dumps(self.payload(events)).encode('utf-8')
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    status = await loop.run_in_executor(self._executor, self.pool.post, url, body)
+            except DeliveryError as e:
+                if attempt == self.max_retries:
+                    self.failed += 1
+                    logger.error("Giving up on %d notification(s) after %d attempts: %s",
+                                 len(events), attempt + 1, e)
+                    return
+                # +-50% jitter keeps retries from many batches from arriving together
+                delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.5)
+                if e.retry_after is not None:
+                    delay = max(delay, e.retry_after)
+                self.retries += 1
+                await asyncio.sleep(delay)
+            except ValueError as e:
+                self.failed += 1
+                logger.error("Dropping %d notification(s): %s", len(events), e)
+                return
+            else:
+                if status >= 400:
+                    self.failed += 1
+                    logger.error("Webhook rejected %d notification(s) with HTTP %d", len(events), status)
+                    return
+                self.sent += 1
+                self.latencies.append(time.perf_counter() - queued)
+                return
+
+    async def close(self) -> None:
+        """Send everything still buffered, wait for deliveries and close connections."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush()
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        self._executor.shutdown(wait=True)
+        self.pool.close()
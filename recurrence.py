@@ -0,0 +1,270 @@
+"""
+Recurrence rules for schedule entries and lazy expansion into occurrences.
+
+An entry without a rule repeats every week on its day, as before. A
+Recurrence narrows that down: every N weeks, only between a start and an
+end date, and skipping exception dates. Occurrences are produced by
+generators, one date at a time, and entries are merged in time order with
+heapq.merge, so "what's next" or "what's on today" never expands a whole
+term.
+
+In course_details.yaml a rule is written as optional keys next to an
+entry's times (``every_weeks``, ``start_date``, ``end_date``, ``except``);
+entries without them read and write exactly as plain weekly entries.
+"""
+import heapq
+from datetime import date, datetime, time, timedelta
+from math import gcd
+from typing import Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional
+
+from core import DAYS
+
+# YAML keys of a rule, in the order they are written
+FIELDS = ('every_weeks', 'start_date', 'end_date', 'except')
+
+_WEEK = timedelta(days=7)
+
+
+def _parse_date(value, key: str) -> date:
+    # Unquoted YAML dates load as date objects, quoted ones as text
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        try:
+            return date.fromisoformat(value.strip())
+        except ValueError:
+            pass
+    raise ValueError(f"{key} must be a YYYY-MM-DD date, got '{value}'")
+
+
+def _monday(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+class Recurrence:
+    """
+    When a weekly entry actually takes place.
+
+    Args:
+        every_weeks: Repeat every N weeks; weeks are counted from the week
+            of ``start``, which is required when N > 1
+        start: First date the entry can take place
+        end: Last date the entry can take place
+        exceptions: Dates the entry is skipped on (holidays, cancellations)
+
+    Raises:
+        ValueError: If the rule is inconsistent
+    """
+
+    __slots__ = ('every_weeks', 'start', 'end', 'exceptions')
+
+    def __init__(self, every_weeks: int = 1, start: Optional[date] = None, end: Optional[date] = None,
+                 exceptions: Iterable[date] = ()):
+        if isinstance(every_weeks, bool) or not isinstance(every_weeks, int) or every_weeks < 1:
+            raise ValueError(f"every_weeks must be a whole number of at least 1, got '{every_weeks}'")
+        if every_weeks > 1 and start is None:
+            raise ValueError("every_weeks needs a start_date to count weeks from")
+        if start is not None and end is not None and end < start:
+            raise ValueError(f"end_date {end} is before start_date {start}")
+        self.every_weeks = every_weeks
+        self.start = start
+        self.end = end
+        self.exceptions: FrozenSet[date] = frozenset(exceptions)
+
+    @classmethod
+    def from_fields(cls, fields: Dict) -> Optional['Recurrence']:
+        """
+        Build a rule from the optional keys of a YAML entry.
+
+        Args:
+            fields: Entry mapping; keys other than FIELDS are ignored
+
+        Returns:
+            The rule, or None if the entry repeats plainly every week
+
+        Raises:
+            ValueError: If a value is invalid
+        """
+        if not any(fields.get(key) is not None for key in FIELDS):
+            return None
+        exceptions = fields.get('except') or []
+        if not isinstance(exceptions, list):
+            exceptions = [exceptions]
+        every_weeks = fields.get('every_weeks') or 1
+        if isinstance(every_weeks, str) and every_weeks.strip().isdigit():
+            every_weeks = int(every_weeks)
+        start = fields.get('start_date')
+        end = fields.get('end_date')
+        rule = cls(every_weeks=every_weeks,
+                   start=_parse_date(start, 'start_date') if start is not None else None,
+                   end=_parse_date(end, 'end_date') if end is not None else None,
+                   exceptions=[_parse_date(value, 'except') for value in exceptions])
+        return None if rule.is_weekly else rule
+
+    def to_fields(self) -> Dict:
+        """Return the YAML keys for the rule; dates are ISO strings, defaults are left out."""
+        fields = {}
+        if self.every_weeks > 1:
+            fields['every_weeks'] = self.every_weeks
+        if self.start is not None:
+            fields['start_date'] = self.start.isoformat()
+        if self.end is not None:
+            fields['end_date'] = self.end.isoformat()
+        if self.exceptions:
+            fields['except'] = [day.isoformat() for day in sorted(self.exceptions)]
+        return fields
+
+    @property
+    def is_weekly(self) -> bool:
+        """True if the rule is the same as no rule at all."""
+        return self.every_weeks == 1 and self.start is None and self.end is None and not self.exceptions
+
+    def occurs_on(self, weekday: int, day: date) -> bool:
+        """Return True if an entry on ``weekday`` (Monday is 0) takes place on ``day``."""
+        if day.weekday() != weekday or day in self.exceptions:
+            return False
+        if (self.start is not None and day < self.start) or (self.end is not None and day > self.end):
+            return False
+        return self.every_weeks == 1 or ((day - _monday(self.start)).days // 7) % self.every_weeks == 0
+
+    def dates(self, weekday: int, since: date, until: Optional[date] = None) -> Iterator[date]:
+        """
+        Yield the dates an entry on ``weekday`` takes place, in order.
+
+        Args:
+            weekday: Monday is 0
+            since: First date to consider
+            until: Last date to consider; without it and without an end
+                date the generator never ends
+
+        Yields:
+            Dates from ``since`` on
+        """
+        if self.start is not None and since < self.start:
+            since = self.start
+        day = since + timedelta(days=(weekday - since.weekday()) % 7)
+        if self.every_weeks > 1:
+            behind = ((day - _monday(self.start)).days // 7) % self.every_weeks
+            if behind:
+                day += _WEEK * (self.every_weeks - behind)
+        last = min((limit for limit in (until, self.end) if limit is not None), default=None)
+        step = _WEEK * self.every_weeks
+        while last is None or day <= last:
+            if day not in self.exceptions:
+                yield day
+            day += step
+
+    def may_coincide(self, other: 'Recurrence') -> bool:
+        """
+        Return True if two rules on the same weekday can fall on the same date.
+
+        Exception dates are not taken into account, so the answer errs on
+        the side of reporting a clash.
+        """
+        if ((self.end is not None and other.start is not None and self.end < other.start)
+                or (other.end is not None and self.start is not None and other.end < self.start)):
+            return False
+        if self.every_weeks == 1 or other.every_weeks == 1:
+            return True
+        # Week numbers w = a (mod m) and w = b (mod n) share a solution iff a = b (mod gcd(m, n))
+        offset = (_monday(other.start) - _monday(self.start)).days // 7
+        return offset % gcd(self.every_weeks, other.every_weeks) == 0
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Recurrence) and (self.every_weeks, self.start, self.end, self.exceptions) == \
+            (other.every_weeks, other.start, other.end, other.exceptions)
+
+    def __hash__(self) -> int:
+        return hash((self.every_weeks, self.start, self.end, self.exceptions))
+
+    def __repr__(self) -> str:
+        return f"Recurrence({', '.join(f'{key}={value!r}' for key, value in self.to_fields().items())})"
+
+
+def fields_from_row(row: Dict) -> Dict:
+    """
+    Collect rule keys from a flat CSV or roster row.
+
+    Blank cells count as missing, and ``except`` may hold several dates
+    separated by ``;``.
+    """
+    fields = {}
+    for key in FIELDS:
+        value = row.get(key)
+        if isinstance(value, str):
+            value = value.strip() or None
+        if value is not None:
+            fields[key] = value
+    if isinstance(fields.get('except'), str):
+        fields['except'] = [value for value in fields['except'].split(';') if value.strip()]
+    return fields
+
+
+# Shared rule for entries without one
+WEEKLY = Recurrence()
+
+
+def rule_of(entry) -> Recurrence:
+    """Return an entry's rule, WEEKLY if it has none."""
+    return getattr(entry, 'recurrence', None) or WEEKLY
+
+
+def may_overlap(first, second) -> bool:
+    """Return True if two entries on the same day can take place on the same date."""
+    return rule_of(first).may_coincide(rule_of(second))
+
+
+class Occurrence(NamedTuple):
+    """One dated occurrence of a schedule entry."""
+    start: datetime
+    end: datetime
+    entry: object
+
+
+def entry_occurrences(entry, since: datetime, until: Optional[datetime] = None) -> Iterator[Occurrence]:
+    """
+    Yield an entry's occurrences that have not ended by ``since``, in order.
+
+    Args:
+        entry: schedule.Entry (anything with day, start and end minutes)
+        since: Start of the window
+        until: Occurrences starting after this are not yielded
+    """
+    weekday = DAYS.index(entry.day)
+    for day in rule_of(entry).dates(weekday, since.date(), until.date() if until is not None else None):
+        midnight = datetime.combine(day, time(), since.tzinfo)
+        start = midnight + timedelta(minutes=entry.start)
+        if until is not None and start > until:
+            return
+        end = midnight + timedelta(minutes=entry.end)
+        if end > since:
+            yield Occurrence(start, end, entry)
+
+
+def occurrences(entries: Iterable, since: datetime, until: Optional[datetime] = None) -> Iterator[Occurrence]:
+    """
+    Yield the occurrences of many entries merged in start time order.
+
+    Each entry is expanded lazily, so taking the first few items of an
+    open-ended window only generates a date or two per entry.
+
+    Args:
+        entries: Schedule entries
+        since: Start of the window; classes still running then are included
+        until: End of the window, or None for no end
+    """
+    return heapq.merge(*(entry_occurrences(entry, since, until) for entry in entries),
+                       key=lambda occurrence: (occurrence.start, occurrence.end))
+
+
+def next_occurrence(entries: Iterable, now: datetime) -> Optional[Occurrence]:
+    """Return the next class starting at or after ``now``, or None if nothing is left."""
+    return next((occurrence for occurrence in occurrences(entries, now) if occurrence.start >= now), None)
+
+
+def occurrences_on(entries: Iterable, day: date) -> List[Occurrence]:
+    """Return the classes taking place on a date, in start time order."""
+    midnight = datetime.combine(day, time())
+    return list(occurrences(entries, midnight, midnight + timedelta(days=1) - timedelta(microseconds=1)))
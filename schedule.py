@@ -0,0 +1,423 @@
+"""
+Indexed in-memory schedule model.
+
+Keeps every entry under a stable ID together with a course reference count,
+so adding, removing and checking whether a course is still used are all
+constant time regardless of how large the schedule grows. Each day's entries
+are also kept sorted by start time so overlapping slots are caught on insert.
+
+Entries are compact: slotted records with interned course names and times
+held as minutes since midnight, indexed per day by parallel typed arrays.
+"""
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core import DAYS, dump_yaml, find_conflicts, generate_day_yaml, time_to_minutes
+from recurrence import Occurrence, Recurrence, may_overlap, occurrences
+
+# One shared int and HH:MM string per minute of the day, so entries never
+# hold their own copies
+_MINUTES = tuple(range(24 * 60))
+_TIME_TEXT = tuple(f"{minute // 60:02d}:{minute % 60:02d}" for minute in _MINUTES)
+_FIELDS = frozenset(('name', 'start_time', 'end_time', 'send_message', 'recurrence'))
+
+
+class Entry:
+    """
+    A schedule entry.
+
+    Reads like the original entry dict (``entry['name']``,
+    ``entry['start_time']``, ...) so it can be passed to the core helpers,
+    but stores the times as minutes since midnight. ``recurrence`` is None
+    for entries that take place every week.
+    """
+
+    __slots__ = ('name', 'day', 'start', 'end', 'send_message', 'recurrence')
+
+    def __init__(self, name: str, day: str, start: int, end: int, send_message: bool,
+                 recurrence: Optional[Recurrence] = None):
+        self.name = name
+        self.day = day
+        self.start = start
+        self.end = end
+        self.send_message = send_message
+        self.recurrence = recurrence
+
+    @property
+    def start_time(self) -> str:
+        return _TIME_TEXT[self.start]
+
+    @property
+    def end_time(self) -> str:
+        return _TIME_TEXT[self.end]
+
+    def __getitem__(self, key: str):
+        if key not in _FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in _FIELDS else default
+
+    def to_dict(self) -> Dict:
+        """Return the entry as a plain dict."""
+        data = {'name': self.name, 'start_time': self.start_time, 'end_time': self.end_time,
+                'send_message': self.send_message}
+        if self.recurrence is not None:
+            data['recurrence'] = self.recurrence
+        return data
+
+    def __repr__(self) -> str:
+        rule = f" {self.recurrence!r}" if self.recurrence is not None else ''
+        return (f"Entry({self.day} {self.name!r} {self.start_time}-{self.end_time} "
+                f"send_message={self.send_message}{rule})")
+
+
+class ScheduleConflict(ValueError):
+    """Raised when a new entry overlaps existing entries on the same day."""
+
+    def __init__(self, day: str, entry: Entry, conflicts: List[Entry]):
+        names = ', '.join(f"{c['name']} ({c['start_time']} - {c['end_time']})" for c in conflicts)
+        super().__init__(f"{entry['name']} overlaps with {names} on {day}")
+        self.day = day
+        self.entry = entry
+        self.conflicts = conflicts
+
+
+class Schedule:
+    """
+    Weekly course schedule with stable entry IDs and course reference counts.
+
+    Entries are Entry records, readable with the ``name``, ``start_time``,
+    ``end_time`` and ``send_message`` keys generate_course_schedule_yaml
+    expects. Within a day they are returned in start time order.
+    """
+
+    def __init__(self, days: Optional[List[str]] = None):
+        self._entries: Dict[int, Entry] = {}
+        # Per-day start minutes and entry IDs, parallel arrays kept sorted with bisect
+        self._starts: Dict[str, array] = {day: array('H') for day in (days or DAYS)}
+        self._ids: Dict[str, array] = {day: array('I') for day in self._starts}
+        # Longest entry per day, so overlap checks know how far back to look
+        self._longest: Dict[str, int] = {day: 0 for day in self._starts}
+        self._refs: Dict[str, int] = {}
+        # Insertion-ordered set of course names shown in the XPath section
+        self._courses: Dict[str, None] = {}
+        self._next_id = 1
+        # Bumped on every change; per-day versions key the YAML fragment cache
+        self.version = 0
+        self._day_versions: Dict[str, int] = {day: 0 for day in self._starts}
+        # Bumped whenever the course list changes, so undo history can share it
+        self.courses_version = 0
+        self._yaml_cache: Dict[str, Tuple[int, str]] = {}
+
+    @classmethod
+    def from_entries(cls, entries: Dict[str, Iterable[Entry]], courses: Iterable[str],
+                     days: Optional[List[str]] = None) -> 'Schedule':
+        """
+        Build a schedule around existing entries without copying or re-checking them.
+
+        Entries are treated as immutable, so several schedules (or saved
+        states of one) can hold the same records.
+
+        Args:
+            entries: Day -> entries in start time order, e.g. from to_dict()
+            courses: Course list in display order
+            days: Days in display order, DAYS by default
+
+        Returns:
+            New schedule with fresh entry IDs
+        """
+        schedule = cls(days)
+        for day, day_entries in entries.items():
+            starts, ids = schedule._starts[day], schedule._ids[day]
+            for entry in day_entries:
+                entry_id = schedule._next_id
+                schedule._next_id += 1
+                schedule._entries[entry_id] = entry
+                starts.append(entry.start)
+                ids.append(entry_id)
+                if entry.end - entry.start > schedule._longest[day]:
+                    schedule._longest[day] = entry.end - entry.start
+                schedule._refs[entry.name] = schedule._refs.get(entry.name, 0) + 1
+        schedule._courses = dict.fromkeys(courses)
+        return schedule
+
+    @property
+    def days(self) -> List[str]:
+        """Days in display order."""
+        return list(self._starts)
+
+    @property
+    def courses(self) -> List[str]:
+        """Course names in the order they were first added."""
+        return list(self._courses)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def count(self, day: str) -> int:
+        """Return the number of entries scheduled on a day."""
+        return len(self._ids[day])
+
+    def entries(self, day: str) -> List[Tuple[int, Entry]]:
+        """
+        Return a day's entries.
+
+        Args:
+            day: Day name
+
+        Returns:
+            List of (entry ID, entry) tuples sorted by start time
+        """
+        entries = self._entries
+        return [(entry_id, entries[entry_id]) for entry_id in self._ids[day]]
+
+    def overlapping(self, day: str, start: int, end: int) -> List[int]:
+        """
+        Find entries that overlap a slot.
+
+        Only entries starting inside the slot, or less than the day's
+        longest entry before it, are inspected, so the check is
+        O(log n + k) for typical days. It is exhaustive even when the day
+        holds overlapping entries (imports, alternate-week rules).
+
+        Args:
+            day: Day name
+            start: Slot start in minutes since midnight
+            end: Slot end in minutes since midnight
+
+        Returns:
+            IDs of the overlapping entries
+        """
+        starts = self._starts[day]
+        ids = self._ids[day]
+        entries = self._entries
+        idx = bisect_left(starts, start)
+        found = []
+        before = idx - 1
+        earliest = start - self._longest[day]
+        while before >= 0 and starts[before] > earliest:
+            if entries[ids[before]].end > start:
+                found.append(ids[before])
+            before -= 1
+        found.reverse()
+        while idx < len(starts) and starts[idx] < end:
+            found.append(ids[idx])
+            idx += 1
+        return found
+
+    def add(self, day: str, name: str, start_time: str, end_time: str, send_message: bool,
+            allow_conflicts: bool = False, recurrence: Optional[Recurrence] = None) -> int:
+        """
+        Add a course entry to a day.
+
+        Args:
+            day: Day name
+            name: Course name
+            start_time: Start time in HH:MM format
+            end_time: End time in HH:MM format
+            send_message: Whether notifications are sent for this entry
+            allow_conflicts: Keep the entry even if it overlaps another one
+            recurrence: When the entry takes place; every week if None.
+                Entries whose rules never fall on the same date (alternate
+                weeks, separate terms) may share a slot
+
+        Returns:
+            Stable ID of the new entry
+
+        Raises:
+            ValueError: If the end time is not after the start time
+            ScheduleConflict: If the entry overlaps an existing one and
+                allow_conflicts is False
+        """
+        if day not in self._starts:
+            raise KeyError(f"Unknown day: {day}")
+
+        start = _MINUTES[time_to_minutes(start_time)]
+        end = _MINUTES[time_to_minutes(end_time)]
+        if end <= start:
+            raise ValueError(f"End time {end_time} must be after start time {start_time}")
+
+        # Interned so every entry of a course shares one name string
+        name = sys.intern(name)
+        if recurrence is not None and recurrence.is_weekly:
+            recurrence = None
+        entry = Entry(name, day, start, end, bool(send_message), recurrence)
+        if not allow_conflicts:
+            overlapping = [i for i in self.overlapping(day, start, end) if may_overlap(entry, self._entries[i])]
+            if overlapping:
+                raise ScheduleConflict(day, entry, [self._entries[i] for i in overlapping])
+
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = entry
+        # New IDs are the largest, so the entry goes after others starting at the same minute
+        idx = bisect_right(self._starts[day], start)
+        self._starts[day].insert(idx, start)
+        self._ids[day].insert(idx, entry_id)
+        if end - start > self._longest[day]:
+            self._longest[day] = end - start
+        self._touch(day)
+        self._refs[name] = self._refs.get(name, 0) + 1
+        if name not in self._courses:
+            self._courses[name] = None
+            self.courses_version += 1
+        return entry_id
+
+    def remove(self, entry_id: int) -> Entry:
+        """
+        Remove an entry by ID.
+
+        The course is dropped from the course list once its last entry is gone.
+
+        Args:
+            entry_id: ID returned by add
+
+        Returns:
+            The removed entry
+        """
+        entry = self._entries.pop(entry_id)
+        day = entry.day
+        ids = self._ids[day]
+        idx = bisect_left(self._starts[day], entry.start)
+        while ids[idx] != entry_id:
+            idx += 1
+        del self._starts[day][idx]
+        del ids[idx]
+        self._touch(day)
+        name = entry['name']
+        self._refs[name] -= 1
+        if not self._refs[name]:
+            del self._refs[name]
+            if self._courses.pop(name, 0) is None:
+                self.courses_version += 1
+        return entry
+
+    def _touch(self, day: str) -> None:
+        self.version += 1
+        self._day_versions[day] = self.version
+
+    def day_version(self, day: str) -> int:
+        """Return the schedule version at which a day last changed."""
+        return self._day_versions[day]
+
+    def is_used(self, name: str) -> bool:
+        """Return True if any entry still references the course."""
+        return name in self._refs
+
+    def has_course(self, name: str) -> bool:
+        """Return True if the course is in the course list."""
+        return name in self._courses
+
+    def drop_course(self, name: str) -> None:
+        """
+        Remove a course from the course list without touching its entries.
+
+        The course reappears in the list the next time an entry for it is added.
+        """
+        if self._courses.pop(name, 0) is None:
+            self.courses_version += 1
+
+    def reorder_courses(self, order: List[str]) -> None:
+        """
+        Move the given courses to the front of the course list, in that order.
+
+        Names that are not in the course list are ignored.
+        """
+        listed = dict.fromkeys(name for name in order if name in self._courses)
+        courses = {**listed, **self._courses}
+        if list(courses) != list(self._courses):
+            self._courses = courses
+            self.courses_version += 1
+
+    def conflicts(self) -> List[Tuple[str, Dict, Dict]]:
+        """Return every overlapping pair of entries that can fall on the same date, see core.find_conflicts."""
+        return [conflict for conflict in find_conflicts(self.to_dict()) if may_overlap(conflict[1], conflict[2])]
+
+    def occurrences(self, since: datetime, until: Optional[datetime] = None) -> Iterator[Occurrence]:
+        """Lazily yield dated occurrences of every entry in time order, see recurrence.occurrences."""
+        return occurrences(list(self._entries.values()), since, until)
+
+    def to_dict(self) -> Dict[str, List[Entry]]:
+        """Return the schedule as a day -> time-ordered list of entries mapping."""
+        return {day: [entry for _, entry in self.entries(day)] for day in self._starts}
+
+    def day_yaml(self, day: str) -> str:
+        """
+        Return a day's YAML fragment, re-emitting it only if the day changed.
+
+        Args:
+            day: Day name
+
+        Returns:
+            The fragment generate_day_yaml would produce for the day
+        """
+        version = self._day_versions[day]
+        cached = self._yaml_cache.get(day)
+        if cached is None or cached[0] != version:
+            cached = (version, generate_day_yaml(day, [entry for _, entry in self.entries(day)]))
+            self._yaml_cache[day] = cached
+        return cached[1]
+
+    def to_yaml(self) -> str:
+        """
+        Generate the course schedule YAML from cached per-day fragments.
+
+        Returns:
+            The same string as generate_course_schedule_yaml(self.to_dict())
+        """
+        fragments = [self.day_yaml(day) for day in self._starts if self._starts[day]]
+        return ''.join(fragments) if fragments else dump_yaml({})
+
+
+class XPathValues(dict):
+    """
+    Course -> XPath mapping that counts its changes.
+
+    A plain dict otherwise; ``version`` is bumped by every method that
+    writes, so undo history can tell an unchanged mapping apart without
+    comparing it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = 0
+
+    def __setitem__(self, course: str, xpath: str) -> None:
+        super().__setitem__(course, xpath)
+        self.version += 1
+
+    def __delitem__(self, course: str) -> None:
+        super().__delitem__(course)
+        self.version += 1
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def pop(self, course: str, *default):
+        if course in self:
+            self.version += 1
+        return super().pop(course, *default)
+
+    def popitem(self):
+        item = super().popitem()
+        self.version += 1
+        return item
+
+    def setdefault(self, course: str, xpath: Optional[str] = None):
+        if course not in self:
+            self.version += 1
+        return super().setdefault(course, xpath)
+
+    def update(self, *args, **kwargs) -> None:
+        super().update(*args, **kwargs)
+        self.version += 1
+
+    def clear(self) -> None:
+        super().clear()
+        self.version += 1
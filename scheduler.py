@@ -0,0 +1,512 @@
+"""
+Asyncio class scheduler driven by generated course_details.yaml files.
+
+Every entry of every loaded schedule becomes a "join" event at its start
+time and a "leave" event at its end time, on the dates its recurrence rule
+allows (every week by default). The next occurrence of each
+event is kept in one heap, and a single task sleeps until the earliest of
+them, so idle CPU stays flat however many users are loaded. Due events are
+handed to pluggable async handlers; time comes from a clock object, so a
+FakeClock can drive the scheduler in tests.
+"""
+import argparse
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from core import DAYS
+from importer import parse_schedule_yaml
+from recurrence import Recurrence
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = DAYS
+JOIN = 'join'
+LEAVE = 'leave'
+
+
+class ClassEvent:
+    """One join or leave action for a user's course."""
+
+    __slots__ = ('user', 'action', 'day', 'course', 'start_time', 'end_time', 'send_message', 'due', 'recurrence',
+                 'cancelled')
+
+    def __init__(self, user: str, action: str, day: str, course: str, start_time: str, end_time: str,
+                 send_message: bool, due: Optional[datetime] = None, recurrence: Optional[Recurrence] = None):
+        self.user = user
+        self.action = action
+        self.day = day
+        self.course = course
+        self.start_time = start_time
+        self.end_time = end_time
+        self.send_message = send_message
+        self.due = due
+        self.recurrence = recurrence
+        # Set on queued events whose entry was removed; the heap skips them
+        self.cancelled = False
+
+    def __repr__(self) -> str:
+        return f"ClassEvent({self.action} {self.user}: {self.course} {self.day} {self.start_time}-{self.end_time})"
+
+
+Handler = Callable[[ClassEvent], Awaitable[None]]
+
+
+class SystemClock:
+    """
+    Wall-clock time in the local timezone.
+
+    Args:
+        max_sleep: Longest single sleep in seconds; the wall clock is read
+            again after each, so a clock step (DST change, suspend/resume,
+            NTP correction) delays a wake-up by at most this much
+    """
+
+    def __init__(self, max_sleep: float = 60.0):
+        self.max_sleep = max_sleep
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    async def wait_until(self, when: datetime, wake: asyncio.Event) -> bool:
+        """
+        Sleep until ``when`` or until ``wake`` is set.
+
+        Returns:
+            True if woken by the event
+        """
+        while True:
+            delay = (when - self.now()).total_seconds()
+            if delay <= 0:
+                return wake.is_set()
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=min(delay, self.max_sleep))
+            except asyncio.TimeoutError:
+                continue
+            return True
+
+
+class FakeClock:
+    """
+    Manually advanced clock for tests.
+
+    Args:
+        start: Initial time
+    """
+
+    def __init__(self, start: datetime):
+        self._now = start
+        self._waiters: List[Tuple[datetime, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    def now(self) -> datetime:
+        return self._now
+
+    async def wait_until(self, when: datetime, wake: asyncio.Event) -> bool:
+        if when <= self._now:
+            return wake.is_set()
+        timer = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (when, next(self._counter), timer))
+        woken = asyncio.ensure_future(wake.wait())
+        try:
+            done, _ = await asyncio.wait({timer, woken}, return_when=asyncio.FIRST_COMPLETED)
+            # Decided before cancelling: a cancelled timer counts as done too
+            result = woken in done
+        finally:
+            woken.cancel()
+            timer.cancel()
+        return result
+
+    async def advance(self, seconds: float = 0, to: Optional[datetime] = None) -> None:
+        """
+        Move time forward, firing every timer that falls due on the way.
+
+        Time stops at each timer's deadline in order, and the event loop is
+        given a chance to run before moving on, so events fire at the fake
+        time they were scheduled for.
+
+        Args:
+            seconds: How far to advance
+            to: Absolute time to advance to instead
+        """
+        target = to if to is not None else self._now + timedelta(seconds=seconds)
+        while True:
+            await _settle()
+            while self._waiters and self._waiters[0][2].done():
+                heapq.heappop(self._waiters)
+            if not self._waiters or self._waiters[0][0] > target:
+                break
+            when, _, timer = heapq.heappop(self._waiters)
+            self._now = max(self._now, when)
+            timer.set_result(None)
+        self._now = max(self._now, target)
+        await _settle()
+
+
+async def _settle(rounds: int = 20) -> None:
+    # Let woken tasks run until they block again
+    for _ in range(rounds):
+        await asyncio.sleep(0)
+
+
+def next_occurrence(now: datetime, weekday: int, minute: int) -> datetime:
+    """
+    Return the first time at or after ``now`` falling on a weekday and minute of the day.
+
+    Args:
+        now: Reference time
+        weekday: Monday is 0
+        minute: Minutes since midnight
+
+    Returns:
+        The next occurrence, within the coming week
+    """
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    when = midnight + timedelta(days=(weekday - now.weekday()) % 7, minutes=minute)
+    if when < now:
+        when += timedelta(days=7)
+    return when
+
+
+def next_due(now: datetime, weekday: int, minute: int, recurrence: Optional[Recurrence]) -> Optional[datetime]:
+    """
+    Like next_occurrence, but only on dates a recurrence rule allows.
+
+    Returns:
+        The next occurrence, or None once the rule has no dates left
+    """
+    if recurrence is None:
+        return next_occurrence(now, weekday, minute)
+    for day in recurrence.dates(weekday, now.date()):
+        when = datetime.combine(day, datetime.min.time(), now.tzinfo) + timedelta(minutes=minute)
+        if when >= now:
+            return when
+    return None
+
+
+def row_key(row: tuple) -> tuple:
+    """Return a schedule row as a (day, course, start_time, end_time, send_message, recurrence) tuple."""
+    day, course, start_time, end_time, send_message, *rule = row
+    return day, course, start_time, end_time, bool(send_message), rule[0] if rule else None
+
+
+class Scheduler:
+    """
+    Fires join/leave events for many users' weekly schedules.
+
+    Args:
+        handlers: Async callables per action (``join``/``leave``)
+        clock: Time source, SystemClock by default
+        grace: Seconds an event may be late and still fire (after a suspend
+            or a slow handler); later ones are skipped until next week
+        max_concurrency: Handlers allowed to run at once
+    """
+
+    def __init__(self, handlers: Optional[Dict[str, Handler]] = None, clock=None,
+                 grace: float = 300.0, max_concurrency: int = 100):
+        self.handlers: Dict[str, Handler] = dict(handlers or {})
+        self.clock = clock or SystemClock()
+        self.grace = timedelta(seconds=grace)
+        # (due, sequence, generation, weekday, minute, event)
+        self._heap: List[Tuple[datetime, int, int, int, int, ClassEvent]] = []
+        self._counter = itertools.count()
+        # Bumped when a user's schedule is replaced; older heap items are skipped
+        self._generations: Dict[str, int] = {}
+        self._live: Dict[str, int] = {}
+        # user -> row_key -> queued events of each copy of that row, for update_rows()
+        self._rows: Dict[str, Dict[tuple, List[List[ClassEvent]]]] = {}
+        self._stale = 0
+        self._wake: Optional[asyncio.Event] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._max_concurrency = max_concurrency
+        self._tasks: Set[asyncio.Task] = set()
+        self._running = False
+        self.fired = 0
+        self.skipped = 0
+
+    def on(self, action: str, handler: Handler) -> None:
+        """Register the async handler for an action."""
+        self.handlers[action] = handler
+
+    def __len__(self) -> int:
+        """Number of scheduled events."""
+        return len(self._heap) - self._stale
+
+    def set_schedule(self, user: str, rows: Iterable[tuple]) -> int:
+        """
+        Replace a user's schedule.
+
+        Args:
+            user: User the schedule belongs to
+            rows: (day, course, start_time, end_time, send_message) rows with
+                HH:MM times, optionally followed by a Recurrence, as in
+                ImportResult.rows
+
+        Returns:
+            Number of events scheduled
+        """
+        self.remove(user)
+        self._generations[user] = self._generations.get(user, 0) + 1
+        self._live[user] = 0
+        self._rows[user] = {}
+        count = self._push_rows(user, rows)
+        if self._wake is not None:
+            self._wake.set()
+        return count
+
+    def update_rows(self, user: str, added: Iterable[tuple] = (), removed: Iterable[tuple] = ()) -> int:
+        """
+        Change part of a user's schedule, leaving their other events queued.
+
+        Removed rows are matched exactly (see row_key); for a row listed
+        twice in the schedule, each removal drops one copy.
+
+        Args:
+            user: User the schedule belongs to
+            added: Rows to start firing, in set_schedule's format
+            removed: Rows to stop firing
+
+        Returns:
+            Number of events added
+        """
+        if user not in self._rows:
+            return self.set_schedule(user, added)
+        index = self._rows[user]
+        for row in removed:
+            key = row_key(row)
+            copies = index.get(key)
+            if not copies:
+                continue
+            for event in copies.pop():
+                if not event.cancelled:
+                    event.cancelled = True
+                    self._stale += 1
+                    self._live[user] -= 1
+            if not copies:
+                del index[key]
+        count = self._push_rows(user, added)
+        self._compact()
+        if self._wake is not None:
+            self._wake.set()
+        return count
+
+    def _push_rows(self, user: str, rows: Iterable[tuple]) -> int:
+        generation = self._generations[user]
+        index = self._rows[user]
+        now = self.clock.now()
+        count = 0
+        for row in rows:
+            key = row_key(row)
+            day, course, start_time, end_time, send_message, recurrence = key
+            weekday = WEEKDAYS.index(day)
+            events = []
+            for action, time_str in ((JOIN, start_time), (LEAVE, end_time)):
+                hours, minutes = time_str.split(':')
+                minute = int(hours) * 60 + int(minutes)
+                due = next_due(now, weekday, minute, recurrence)
+                if due is None:
+                    continue  # the rule's last date has passed
+                event = ClassEvent(user, action, day, course, start_time, end_time, send_message,
+                                   recurrence=recurrence)
+                heapq.heappush(self._heap, (due, next(self._counter), generation, weekday, minute, event))
+                events.append(event)
+            index.setdefault(key, []).append(events)
+            count += len(events)
+        self._live[user] += count
+        return count
+
+    def load_yaml(self, user: str, text: str) -> int:
+        """
+        Replace a user's schedule from course_details.yaml text.
+
+        Raises:
+            ValueError: If the file has errors; nothing is scheduled then
+        """
+        result = parse_schedule_yaml(text, f"{user}: course_details.yaml")
+        if result.errors:
+            raise ValueError('\n'.join(result.errors))
+        return self.set_schedule(user, result.rows)
+
+    def remove(self, user: str) -> None:
+        """Stop firing events for a user."""
+        if user in self._generations:
+            self._generations[user] += 1
+            self._stale += self._live.pop(user, 0)
+            self._rows.pop(user, None)
+            self._compact()
+
+    def _is_stale(self, item: tuple) -> bool:
+        return item[5].cancelled or self._generations[item[5].user] != item[2]
+
+    def _compact(self) -> None:
+        # Rebuild once stale items make up most of the heap
+        if self._stale * 2 > len(self._heap) > 64:
+            self._heap = [item for item in self._heap if not self._is_stale(item)]
+            heapq.heapify(self._heap)
+            self._stale = 0
+
+    def next_due(self) -> Optional[datetime]:
+        """Return when the next live event fires, or None if nothing is scheduled."""
+        while self._heap and self._is_stale(self._heap[0]):
+            heapq.heappop(self._heap)
+            self._stale -= 1
+        return self._heap[0][0] if self._heap else None
+
+    def _fire_due(self) -> None:
+        now = self.clock.now()
+        while True:
+            due = self.next_due()
+            if due is None or due > now:
+                return
+            _, _, generation, weekday, minute, event = heapq.heappop(self._heap)
+            # Reschedule before handling, so a failing handler does not drop it
+            following = (due + timedelta(days=7) if event.recurrence is None
+                         else next_due(due + timedelta(days=1), weekday, minute, event.recurrence))
+            if following is None:
+                # Out of the heap for good; update_rows() must not count it again
+                event.cancelled = True
+                self._live[event.user] -= 1
+            else:
+                heapq.heappush(self._heap, (following, next(self._counter), generation, weekday, minute, event))
+            if now - due > self.grace:
+                self.skipped += 1
+                logger.warning("Skipped %r, %s late", event, now - due)
+                continue
+            handler = self.handlers.get(event.action)
+            if handler is None:
+                continue
+            fired = ClassEvent(event.user, event.action, event.day, event.course, event.start_time,
+                               event.end_time, event.send_message, due, event.recurrence)
+            self.fired += 1
+            task = asyncio.ensure_future(self._handle(handler, fired))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _handle(self, handler: Handler, event: ClassEvent) -> None:
+        async with self._semaphore:
+            try:
+                await handler(event)
+            except Exception:
+                logger.exception("Handler failed for %r", event)
+
+    async def run(self) -> None:
+        """Fire events until stop() is called."""
+        self._wake = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        self._running = True
+        try:
+            while self._running:
+                self._fire_due()
+                due = self.next_due()
+                self._wake.clear()
+                if due is None:
+                    await self._wake.wait()
+                else:
+                    await self.clock.wait_until(due, self._wake)
+        finally:
+            self._running = False
+
+    def stop(self) -> None:
+        """Ask run() to return after the current wake-up."""
+        self._running = False
+        if self._wake is not None:
+            self._wake.set()
+
+    async def drain(self) -> None:
+        """Wait for every handler started so far to finish."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+
+async def _log_event(event: ClassEvent) -> None:
+    logger.info("%s %s: %s (%s - %s)", event.action, event.user, event.course, event.start_time, event.end_time)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Fire join/leave events for generated schedules.")
+    parser.add_argument('bundles_dir', help="Directory with one sub-directory per user holding course_details.yaml, "
+                                            "as written by batch.py")
+    parser.add_argument('--credentials-dir',
+                        help="Post send_message notifications to the webhooks stored in this credential store")
+    parser.add_argument('--watch', action='store_true',
+                        help="Reload schedules when their files change, applying only the changed entries")
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help="Seconds between checks for changed files with --watch (default 1)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+
+    notifier = None
+    if args.credentials_dir:
+        from credentials import CredentialStore
+        from notifier import Notifier, webhooks_from_credentials
+
+        notifier = Notifier(webhooks_from_credentials(CredentialStore(args.credentials_dir)))
+
+    async def handler(event: ClassEvent) -> None:
+        await _log_event(event)
+        if notifier is not None:
+            await notifier.handle(event)
+
+    scheduler = Scheduler({JOIN: handler, LEAVE: handler})
+
+    async def run(watcher=None) -> None:
+        watching = asyncio.ensure_future(watcher.run()) if watcher is not None else None
+        try:
+            await scheduler.run()
+        finally:
+            if watching is not None:
+                watcher.stop()
+                await watching
+            # Let running handlers finish, then send batches still in their coalescing window
+            await scheduler.drain()
+            if notifier is not None:
+                await notifier.close()
+
+    if args.watch:
+        from watcher import BundleWatcher
+
+        watcher = BundleWatcher(args.bundles_dir, scheduler, interval=args.poll_interval)
+        for change in watcher.poll():
+            for error in change.errors:
+                print(error, file=sys.stderr)
+        print(f"Scheduled {len(scheduler)} event(s); next at {scheduler.next_due()}; watching for changes")
+        try:
+            asyncio.run(run(watcher))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+        return 0
+
+    from compiled import open_compiled
+
+    for user in sorted(os.listdir(args.bundles_dir)):
+        path = os.path.join(args.bundles_dir, user, 'course_details.yaml')
+        if not os.path.isfile(path):
+            continue
+        # An up-to-date compiled sidecar saves parsing the YAML
+        compiled = open_compiled(os.path.dirname(path))
+        if compiled is not None:
+            with compiled:
+                scheduler.set_schedule(user, compiled.rows())
+            continue
+        with open(path, encoding='utf-8') as f:
+            try:
+                scheduler.load_yaml(user, f.read())
+            except ValueError as e:
+                print(f"{user}: {e}", file=sys.stderr)
+    print(f"Scheduled {len(scheduler)} event(s); next at {scheduler.next_due()}")
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
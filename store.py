@@ -0,0 +1,283 @@
+"""
+Durable SQLite-backed session store with write-behind persistence.
+
+Each session's schedule, course list and XPath values are saved under a
+session ID so work survives server restarts and dropped connections.
+Saving only records which days changed; the rows are encoded and written
+by a background thread that batches every pending session into one
+transaction, so the rerun path never waits on disk.
+"""
+import json
+import logging
+import queue
+import sqlite3
+import sys
+import threading
+import weakref
+from itertools import groupby
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from recurrence import Recurrence
+from schedule import Schedule, XPathValues
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_days (
+    sid TEXT NOT NULL,
+    day TEXT NOT NULL,
+    entries TEXT NOT NULL,
+    PRIMARY KEY (sid, day)
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    sid TEXT PRIMARY KEY,
+    courses TEXT NOT NULL,
+    xpath_values TEXT NOT NULL,
+    updated REAL NOT NULL DEFAULT (julianday('now'))
+);
+"""
+
+# (day -> entry tuples for changed days only, course list, XPath values)
+Snapshot = Tuple[Dict[str, List[Tuple[str, str, str, bool]]], List[str], Dict[str, str]]
+
+
+class SessionStore:
+    """
+    Write-behind store for session state in a local SQLite file.
+
+    The database runs in WAL mode so restores can read while the writer
+    commits, and connections are pooled across threads.
+
+    Args:
+        path: SQLite database file
+        flush_interval: Seconds the writer waits to batch more changes
+        pool_size: Maximum number of pooled connections
+    """
+
+    def __init__(self, path: str, flush_interval: float = 0.5, pool_size: int = 4):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._pool: 'queue.LifoQueue[sqlite3.Connection]' = queue.LifoQueue(maxsize=pool_size)
+        # Latest unwritten snapshot per session; newer saves replace older ones
+        self._pending: Dict[str, Snapshot] = {}
+        # Per live schedule object: (session it was saved under, day versions,
+        # XPath values, course list) as last saved. Weakly keyed, so an entry
+        # goes away with the session's schedule (closed session, Reset All, undo)
+        self._saved: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flush_now = threading.Event()
+        self._idle = threading.Condition(self._lock)
+        self._writing = False
+        self._closed = False
+
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+        self._writer = threading.Thread(target=self._write_loop, name='session-store-writer', daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # WAL keeps the database consistent on power loss with NORMAL; only
+        # the last commits can be lost
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _connection(self) -> '_PooledConnection':
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        return _PooledConnection(self, conn)
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def save(self, sid: str, schedule: Schedule, xpath_values: Dict[str, str]) -> bool:
+        """
+        Queue a session's state for writing if it changed since the last save.
+
+        Only days whose version moved are copied, so an unchanged session
+        costs a dict comparison and an edit costs one day's entries.
+
+        Args:
+            sid: Session ID
+            schedule: Session schedule
+            xpath_values: Session XPath values
+
+        Returns:
+            True if anything was queued
+        """
+        saved = self._saved.get(schedule)
+        versions = {day: schedule.day_version(day) for day in schedule.days}
+        if saved is not None and saved[0] == sid:
+            changed = [day for day in schedule.days if versions[day] != saved[1].get(day)]
+            if not changed and xpath_values == saved[2] and schedule.courses == saved[3]:
+                return False
+        else:
+            # A new schedule object (first save or Reset All) rewrites every day
+            changed = schedule.days
+
+        # Recurrence rules are appended only to entries that have one
+        days = {day: [(entry.name, entry.start_time, entry.end_time, entry.send_message)
+                      + ((entry.recurrence.to_fields(),) if entry.recurrence is not None else ())
+                      for _, entry in schedule.entries(day)] for day in changed}
+        courses = schedule.courses
+        xpaths = dict(xpath_values)
+        self._saved[schedule] = (sid, versions, xpaths, courses)
+
+        with self._lock:
+            pending = self._pending.get(sid)
+            if pending is not None:
+                days = {**pending[0], **days}
+            self._pending[sid] = (days, courses, xpaths)
+        self._wake.set()
+        return True
+
+    def _write_loop(self) -> None:
+        while True:
+            self._wake.wait()
+            # Let more edits arrive so they share one transaction
+            self._flush_now.wait(self.flush_interval)
+            with self._lock:
+                self._wake.clear()
+                self._flush_now.clear()
+                batch, self._pending = self._pending, {}
+                self._writing = True
+                closed = self._closed
+            try:
+                if batch:
+                    self._write(batch)
+            except Exception:
+                logger.exception("Failed to persist %d session(s)", len(batch))
+                # The next saves rewrite every day instead of just the changed ones
+                self._saved.clear()
+            finally:
+                with self._lock:
+                    self._writing = False
+                    self._idle.notify_all()
+            if closed and not self._pending:
+                return
+
+    def _write(self, batch: Dict[str, Snapshot]) -> None:
+        day_rows = [(sid, day, json.dumps(entries, ensure_ascii=False))
+                    for sid, (days, _, _) in batch.items() for day, entries in days.items()]
+        session_rows = [(sid, json.dumps(courses, ensure_ascii=False), json.dumps(xpaths, ensure_ascii=False))
+                        for sid, (_, courses, xpaths) in batch.items()]
+        with self._connection() as conn:
+            conn.execute('BEGIN')
+            try:
+                conn.executemany('INSERT OR REPLACE INTO session_days (sid, day, entries) VALUES (?, ?, ?)',
+                                 day_rows)
+                conn.executemany("INSERT OR REPLACE INTO sessions (sid, courses, xpath_values, updated) "
+                                 "VALUES (?, ?, ?, julianday('now'))", session_rows)
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued save has been written.
+
+        Returns:
+            False if the timeout expired first
+        """
+        with self._lock:
+            if self._pending:
+                self._flush_now.set()
+            return self._idle.wait_for(lambda: not self._pending and not self._writing, timeout)
+
+    def load(self, sid: str, days: Optional[List[str]] = None) -> Optional[Tuple[Schedule, Dict[str, str]]]:
+        """
+        Restore a session's state.
+
+        Pending saves are flushed first so the latest state is returned.
+
+        Args:
+            sid: Session ID
+            days: Days of the schedule to create, defaults to Schedule's
+
+        Returns:
+            (schedule, XPath values), or None if the session is unknown
+        """
+        self.flush()
+        with self._connection() as conn:
+            row = conn.execute('SELECT courses, xpath_values FROM sessions WHERE sid = ?', (sid,)).fetchone()
+            if row is None:
+                return None
+            day_rows = dict(conn.execute('SELECT day, entries FROM session_days WHERE sid = ?', (sid,)))
+
+        schedule = Schedule(days)
+        for day in schedule.days:
+            for name, start_time, end_time, send_message, *rule in json.loads(day_rows.get(day, '[]')):
+                # Saved schedules may hold imported overlaps, keep them as they were
+                schedule.add(day, name, start_time, end_time, send_message, allow_conflicts=True,
+                             recurrence=Recurrence.from_fields(rule[0]) if rule else None)
+        courses = json.loads(row[0])
+        for course in schedule.courses:
+            if course not in courses:
+                schedule.drop_course(course)
+        schedule.reorder_courses(courses)
+        xpath_values = XPathValues((sys.intern(course), sys.intern(xpath))
+                                   for course, xpath in json.loads(row[1]).items())
+
+        self._saved[schedule] = (sid, {day: schedule.day_version(day) for day in schedule.days},
+                                 dict(xpath_values), schedule.courses)
+        return schedule, xpath_values
+
+    def scan(self) -> Iterator[Tuple[str, Dict[str, List[list]], Dict[str, str]]]:
+        """
+        Read every saved session as raw rows, without building schedules.
+
+        Pending saves are flushed first. Meant for server-wide aggregation
+        such as the course catalog.
+
+        Yields:
+            (session ID, day -> [name, start_time, end_time, send_message,
+            rule fields?] lists, XPath values) per session
+        """
+        self.flush()
+        with self._connection() as conn:
+            rows = conn.execute('SELECT sid, xpath_values, day, entries FROM sessions '
+                                'LEFT JOIN session_days USING (sid) ORDER BY sid').fetchall()
+        for sid, session_rows in groupby(rows, key=lambda row: row[0]):
+            days = {}
+            xpath_values = None
+            for _, xpaths, day, entries in session_rows:
+                xpath_values = xpaths
+                if day is not None:
+                    days[day] = json.loads(entries)
+            yield sid, days, json.loads(xpath_values)
+
+    def close(self) -> None:
+        """Write everything still queued and close all connections."""
+        with self._lock:
+            self._closed = True
+        self._flush_now.set()
+        self._wake.set()
+        self._writer.join()
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class _PooledConnection:
+    """Context manager that hands a pooled connection back on exit."""
+
+    def __init__(self, store: SessionStore, conn: sqlite3.Connection):
+        self._store = store
+        self._conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        return self._conn
+
+    def __exit__(self, *exc) -> None:
+        self._store._release(self._conn)
@@ -0,0 +1,98 @@
+"""
+Per-user credential store: concurrent writers and value round trips.
+
+Several processes, each with several writer threads, repeatedly save
+credentials for a small set of shared users while reader threads call
+CredentialStore.get. A reader must never see a partial or mixed file,
+every final file must be one complete write, and no temp files may be
+left behind.
+"""
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from credentials import CredentialStore
+
+
+def expected_values(writer: str, seq: int) -> Tuple[str, str]:
+    """Credentials written by one writer; the password repeats the ID so mixed files are detectable."""
+    lms_id = f"{writer}-{seq}"
+    return lms_id, f"pw-{lms_id}-" + 'x' * (seq % 50)
+
+
+def consistent(values) -> bool:
+    return (values is not None and set(values) == {'lmsid', 'password', 'webhookurl'}
+            and values['password'].startswith(f"pw-{values['lmsid']}-"))
+
+
+def worker(directory: str, process_no: int, threads: int, writes: int, users: int) -> Tuple[int, int, List[str]]:
+    """
+    Run writer and reader threads in one process.
+
+    Returns:
+        (writes done, reads done, problems found)
+    """
+    store = CredentialStore(directory)
+    problems: List[str] = []
+    reads = 0
+    stop = threading.Event()
+
+    def write(thread_no: int) -> None:
+        for seq in range(writes):
+            lms_id, password = expected_values(f"p{process_no}t{thread_no}", seq)
+            store.save_sync(f"user{seq % users}", lms_id, password)
+
+    def read() -> None:
+        nonlocal reads
+        while not stop.is_set():
+            for user in range(users):
+                values = store.get(f"user{user}")
+                reads += 1
+                if values is not None and not consistent(values):
+                    problems.append(f"inconsistent read for user{user}: {values}")
+
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    writers = [threading.Thread(target=write, args=(no,)) for no in range(threads)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+    store.close()
+    return threads * writes, reads, problems
+
+
+def test_parallel_writers_never_expose_partial_files(tmp_path):
+    processes, threads, writes, users = 2, 4, 20, 3
+    directory = str(tmp_path)
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        results = list(pool.map(worker, [directory] * processes, range(processes), [threads] * processes,
+                                [writes] * processes, [users] * processes))
+
+    assert [problem for _, _, found in results for problem in found] == []
+    assert sum(result[0] for result in results) == processes * threads * writes
+    store = CredentialStore(directory)
+    try:
+        for user in range(users):
+            assert consistent(store.get(f"user{user}")), f"final file for user{user} is not one complete write"
+    finally:
+        store.close()
+    assert [name for name in os.listdir(directory) if name.startswith('.tmp-')] == []
+
+
+def test_values_round_trip_as_written(tmp_path):
+    store = CredentialStore(str(tmp_path))
+    try:
+        store.save_sync('alice', 'alice', '  spaced = password  ', 'https://example.test/hook')
+        assert store.get('alice') == {'lmsid': 'alice', 'password': '  spaced = password  ',
+                                      'webhookurl': 'https://example.test/hook'}
+        store.save_sync('alice', 'alice', 'changed')
+        assert store.get('alice')['password'] == 'changed'
+    finally:
+        store.close()
@@ -0,0 +1,60 @@
+import os
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import generate_xpath_yaml
+from importer import apply_import, parse_schedule_yaml, parse_xpath_yaml
+from recurrence import Recurrence
+from schedule import Schedule, XPathValues
+
+
+def sample_schedule():
+    schedule = Schedule()
+    schedule.add('Monday', 'Math', '09:00', '10:30', True)
+    schedule.add('Monday', 'Bio: Lab', '13:05', '15:00', False)
+    schedule.add('Wednesday', 'Math', '09:00', '10:30', True)
+    schedule.add('Friday', "O'Brien Seminar #2", '16:00', '17:15', True,
+                 recurrence=Recurrence(every_weeks=2, start=date(2026, 9, 7)))
+    return schedule
+
+
+def reimport(schedule, xpath_values):
+    result = parse_schedule_yaml(schedule.to_yaml())
+    result.merge(parse_xpath_yaml(generate_xpath_yaml(schedule.courses, xpath_values)))
+    assert result.errors == []
+    restored, restored_xpaths = Schedule(), XPathValues()
+    apply_import(result, restored, restored_xpaths)
+    return restored, restored_xpaths
+
+
+def test_export_then_import_gives_the_same_schedule():
+    schedule = sample_schedule()
+    xpath_values = XPathValues({'Math': "//a[normalize-space()='Math']", 'Bio: Lab': '//div[@id="bio"]'})
+    restored, restored_xpaths = reimport(schedule, xpath_values)
+    assert restored.to_yaml() == schedule.to_yaml()
+    assert restored.courses == schedule.courses
+    assert generate_xpath_yaml(restored.courses, restored_xpaths) == \
+        generate_xpath_yaml(schedule.courses, xpath_values)
+
+
+@pytest.mark.parametrize('start, end, expected', [
+    ('9:05', '10:00', ('09:05', '10:00')),
+    ('12:05:30', '13:00:00', ('12:05', '13:00')),
+    ("'08:15'", '23:59', ('08:15', '23:59')),
+])
+def test_unquoted_times_are_read_as_times(start, end, expected):
+    text = f"Monday:\n- course: Math\n  start_time: {start}\n  end_time: {end}\n  send_message: true\n"
+    result = parse_schedule_yaml(text)
+    assert result.errors == []
+    assert [row[2:4] for row in result.rows] == [expected]
+
+
+def test_out_of_range_unquoted_time_is_rejected():
+    result = parse_schedule_yaml("Monday:\n- course: Math\n  start_time: 9:00\n  end_time: 25:00\n"
+                                 "  send_message: true\n")
+    assert result.rows == []
+    assert len(result.errors) == 1
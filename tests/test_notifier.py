@@ -0,0 +1,102 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import notifier
+from notifier import Notifier
+from scheduler import JOIN, ClassEvent
+
+
+class StubServer(ThreadingHTTPServer):
+    """Webhook stub answering 503 to the first ``failures`` requests, then 204."""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.failures = 0
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/hook"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        with self.server.lock:
+            self.server.requests.append((time.perf_counter(), body))
+            failed = len(self.server.requests) <= self.server.failures
+        self.send_response(503 if failed else 204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    stub = StubServer()
+    thread = threading.Thread(target=stub.serve_forever, daemon=True)
+    thread.start()
+    yield stub
+    stub.shutdown()
+    stub.server_close()
+
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(notifier.random, 'uniform', lambda low, high: 1.0)
+
+
+def event(course='Math', send_message=True):
+    return ClassEvent('alice', JOIN, 'Monday', course, '09:00', '10:00', send_message)
+
+
+def deliver(server, events, **options):
+    """Queue events, close the notifier and return it with the seconds close() took."""
+    async def scenario():
+        sender = Notifier(lambda user: server.url, **options)
+        for item in events:
+            sender.notify(item)
+        start = time.perf_counter()
+        await sender.close()
+        return sender, time.perf_counter() - start
+
+    return asyncio.run(scenario())
+
+
+def test_close_flushes_the_open_batch(server):
+    sender, elapsed = deliver(server, [event('Math'), event('Bio'), event('Chem', send_message=False)], window=60)
+    assert elapsed < 5
+    assert sender.sent == 1
+    assert [body for _, body in server.requests] == [
+        b'{"content": "Joining Math (09:00 - 10:00)\\nJoining Bio (09:00 - 10:00)"}']
+
+
+def test_failed_deliveries_are_retried_with_growing_backoff(server, no_jitter):
+    server.failures = 2
+    sender, _ = deliver(server, [event()], window=0.01, base_delay=0.05)
+    assert (sender.sent, sender.failed, sender.retries) == (1, 0, 2)
+    times = [when for when, _ in server.requests]
+    first, second = times[1] - times[0], times[2] - times[1]
+    assert first >= 0.05
+    assert second >= 0.1
+
+
+def test_gives_up_after_max_retries(server, no_jitter):
+    server.failures = 10
+    sender, _ = deliver(server, [event()], window=0.01, base_delay=0.01, max_retries=2)
+    assert (sender.sent, sender.failed, sender.retries) == (0, 1, 2)
+    assert len(server.requests) == 3
@@ -0,0 +1,108 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import JOIN, LEAVE, FakeClock, Scheduler, SystemClock
+
+START = datetime(2026, 9, 7, 8, 0)
+
+
+def test_fake_clock_wait_until_returns_true_when_woken():
+    async def scenario():
+        clock = FakeClock(START)
+        wake = asyncio.Event()
+        waiter = asyncio.ensure_future(clock.wait_until(START + timedelta(hours=1), wake))
+        await asyncio.sleep(0)
+        wake.set()
+        return await waiter
+
+    assert asyncio.run(scenario()) is True
+
+
+def test_fake_clock_wait_until_returns_false_on_timeout():
+    async def scenario():
+        clock = FakeClock(START)
+        wake = asyncio.Event()
+        waiter = asyncio.ensure_future(clock.wait_until(START + timedelta(hours=1), wake))
+        await clock.advance(3600)
+        return await waiter
+
+    assert asyncio.run(scenario()) is False
+
+
+def test_system_clock_wait_until_rechecks_the_wall_clock():
+    class SteppedClock(SystemClock):
+        # Wall clock that jumps forward an hour after the first sleep, like a resume from suspend
+        def __init__(self):
+            super().__init__(max_sleep=0.01)
+            self.reads = 0
+
+        def now(self):
+            self.reads += 1
+            return START if self.reads == 1 else START + timedelta(hours=2)
+
+    async def scenario():
+        return await asyncio.wait_for(SteppedClock().wait_until(START + timedelta(hours=1), asyncio.Event()), 1)
+
+    assert asyncio.run(scenario()) is False
+
+
+def run_scheduler(rows, steps):
+    """Run a FakeClock-driven scheduler and return the (time, action, course) it fired, per step."""
+    async def scenario():
+        clock = FakeClock(START)
+        fired = []
+
+        async def record(event):
+            fired.append((clock.now(), event.action, event.course))
+
+        scheduler = Scheduler({JOIN: record, LEAVE: record}, clock=clock)
+        scheduler.set_schedule('alice', rows)
+        task = asyncio.ensure_future(scheduler.run())
+        results = []
+        for step in steps:
+            await step(scheduler, clock)
+            await scheduler.drain()
+            results.append(list(fired))
+            fired.clear()
+        scheduler.stop()
+        await task
+        return results
+
+    return asyncio.run(scenario())
+
+
+def advance(**delta):
+    async def step(scheduler, clock):
+        await clock.advance(timedelta(**delta).total_seconds())
+    return step
+
+
+def test_scheduler_fires_join_and_leave_at_their_times():
+    [fired] = run_scheduler([('Monday', 'Math', '09:00', '10:00', True)], [advance(hours=3)])
+    assert fired == [(START + timedelta(hours=1), JOIN, 'Math'), (START + timedelta(hours=2), LEAVE, 'Math')]
+
+
+def test_scheduler_reschedules_weekly():
+    first, second = run_scheduler([('Monday', 'Math', '09:00', '10:00', True)],
+                                  [advance(hours=3), advance(days=7)])
+    assert [action for _, action, _ in first] == [JOIN, LEAVE]
+    assert second == [(START + timedelta(days=7, hours=1), JOIN, 'Math'),
+                      (START + timedelta(days=7, hours=2), LEAVE, 'Math')]
+
+
+def test_scheduler_update_rows_replaces_only_changed_rows():
+    math = ('Monday', 'Math', '09:00', '10:00', True)
+    bio = ('Monday', 'Bio', '11:00', '12:00', False)
+    chem = ('Monday', 'Chem', '13:00', '14:00', False)
+
+    async def update(scheduler, clock):
+        scheduler.update_rows('alice', added=[chem], removed=[bio])
+        await clock.advance(6 * 3600)
+
+    [fired] = run_scheduler([math, bio], [update])
+    assert [(action, course) for _, action, course in fired] == [
+        (JOIN, 'Math'), (LEAVE, 'Math'), (JOIN, 'Chem'), (LEAVE, 'Chem')]
@@ -0,0 +1,61 @@
+import asyncio
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import watcher
+from scheduler import Scheduler
+from watcher import SCHEDULE_FILE, XPATH_FILE, BundleWatcher
+
+SCHEDULE = "Monday:\n- course: Math\n  start_time: '09:00'\n  end_time: '10:00'\n  send_message: true\n"
+
+
+def write_bundle(directory, user, schedule=SCHEDULE, xpaths="Math: //a[@id='math']\n"):
+    os.makedirs(os.path.join(directory, user), exist_ok=True)
+    for name, text in ((SCHEDULE_FILE, schedule), (XPATH_FILE, xpaths)):
+        with open(os.path.join(directory, user, name), 'w') as f:
+            f.write(text)
+
+
+def test_poll_applies_new_changed_and_removed_files(tmp_path):
+    write_bundle(tmp_path, 'alice')
+    scheduler = Scheduler({})
+    bundles = BundleWatcher(str(tmp_path), scheduler, use_inotify=False)
+    assert [(change.name, change.added, change.removed) for change in bundles.poll()] == [
+        (SCHEDULE_FILE, 1, 0), (XPATH_FILE, 1, 0)]
+    assert bundles.selectors == {'alice': {'Math': "//a[@id='math']"}}
+    assert bundles.poll() == []
+
+    os.remove(tmp_path / 'alice' / XPATH_FILE)
+    assert [(change.name, change.added, change.removed) for change in bundles.poll()] == [(XPATH_FILE, 0, 1)]
+    assert bundles.selectors == {}
+
+
+def test_run_reads_and_parses_off_the_event_loop(tmp_path, monkeypatch):
+    parsed_on = []
+    parse = watcher._parse
+
+    def recording_parse(*args):
+        parsed_on.append(threading.current_thread())
+        return parse(*args)
+
+    monkeypatch.setattr(watcher, '_parse', recording_parse)
+    scheduler = Scheduler({})
+    bundles = BundleWatcher(str(tmp_path), scheduler, interval=0.01, use_inotify=False)
+
+    async def scenario():
+        task = asyncio.ensure_future(bundles.run())
+        write_bundle(tmp_path, 'alice')
+        for _ in range(200):
+            if 'alice' in bundles.selectors and len(scheduler):
+                break
+            await asyncio.sleep(0.01)
+        bundles.stop()
+        await task
+
+    asyncio.run(scenario())
+    assert bundles.selectors == {'alice': {'Math': "//a[@id='math']"}}
+    assert len(scheduler) > 0
+    assert parsed_on and threading.main_thread() not in parsed_on
@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip('lxml')
+
+from xpath_tools import SnapshotIndex, compile_xpath, normalize_space, parse_snapshot
+
+PAGE = ("<html><body><ul>"
+        "<li><a href='/bio'>Intro&nbsp;Biology</a></li>"
+        "<li><a href='/bio-lab'>Intro&nbsp;Biology Lab</a></li>"
+        "<li><a>Chem&#8201;101</a></li>"
+        "<li><a>Math 101</a></li>"
+        "</ul></body></html>")
+
+
+@pytest.fixture(scope='module')
+def index():
+    return SnapshotIndex(parse_snapshot(PAGE))
+
+
+def test_normalize_space_folds_unicode_spaces_only():
+    assert normalize_space(' Intro\u00a0\tBiology\n') == 'Intro Biology'
+    assert normalize_space('Chem\u2009101') == 'Chem 101'
+    assert normalize_space('A\u200bB') == 'A\u200bB'
+
+
+@pytest.mark.parametrize('course, expected', [
+    ('Intro Biology', 'Intro\u00a0Biology'),
+    ('Biology Lab', 'Intro\u00a0Biology Lab'),
+    ('Chem 101', 'Chem\u2009101'),
+    ('Math 101', 'Math 101'),
+])
+def test_proposed_xpath_selects_the_indexed_link(index, course, expected):
+    proposal = index.propose(course)
+    assert proposal is not None and proposal.strategy != 'absolute'
+    assert [link.text_content() for link in compile_xpath(proposal.xpath)(index.root)] == [expected]
+
+
+def test_text_predicates_translate_only_when_needed(index):
+    assert 'translate' in index.propose('Chem 101').xpath
+    assert index.propose('Math 101').xpath == '//a[normalize-space()="Math 101"]'
@@ -0,0 +1,113 @@
+"""
+Byte-for-byte parity of generated YAML with the original emitter.
+
+core.generate_course_schedule_yaml, core.generate_xpath_yaml and the cached
+Schedule.to_yaml must produce exactly what the original pure-Python
+emitter did, whether or not libyaml's CDumper is used, on random schedules
+and after random edits.
+"""
+import os
+import random
+import sys
+from typing import Dict, List
+
+import pytest
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import DAYS, DEFAULT_XPATH, generate_course_schedule_yaml, generate_xpath_yaml
+from schedule import Schedule
+
+NAMES = [
+    'Math', 'True', 'null', 'yes', '123', '09:00', 'Ünïcode «x»', "O'Neil: intro #1",
+    'Data "Structures"', ' leading space', 'trailing space ', 'emoji 📚', '- dash', 'x' * 200,
+    'multi\nline', 'tab\there', 'a: b', '[list]', '{map}', '*star', '&anchor', '!tag', '%pct', '@at',
+]
+ALPHABETS = ['ab c:#-\'"é{}[]*&!%@`|>?,', "ab '", 'a€漢 b', 'ab\n ', 'a\t"\\ b']
+
+
+class LegacyDumper(yaml.Dumper):
+    pass
+
+
+def _legacy_bool(dumper: yaml.Dumper, data: bool) -> yaml.ScalarNode:
+    return dumper.represent_scalar('tag:yaml.org,2002:bool', 'True' if data else 'False')
+
+
+LegacyDumper.add_representer(bool, _legacy_bool)
+
+
+def legacy_schedule_yaml(schedule_data: Dict[str, List[Dict]]) -> str:
+    """The original implementation, emitted with the pure-Python Dumper."""
+    formatted_data = {}
+    for day, courses in schedule_data.items():
+        if courses:
+            formatted_data[day] = [{
+                'course': course['name'],
+                'start_time': course['start_time'],
+                'end_time': course['end_time'],
+                'send_message': course['send_message']
+            } for course in courses]
+    return yaml.dump(formatted_data, Dumper=LegacyDumper, sort_keys=False, allow_unicode=True)
+
+
+def legacy_xpath_yaml(courses: List[str], xpath_values: Dict[str, str]) -> str:
+    """The original XPath implementation, emitted with the pure-Python Dumper."""
+    xpath_data = {course: xpath_values.get(course) or DEFAULT_XPATH for course in courses}
+    return yaml.dump(xpath_data, Dumper=LegacyDumper, sort_keys=False, allow_unicode=True)
+
+
+def random_name(rng: random.Random) -> str:
+    if rng.random() < 0.5:
+        return rng.choice(NAMES) + rng.choice(['', str(rng.randrange(50))])
+    alphabet = rng.choice(ALPHABETS)
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randrange(1, rng.choice([30, 70, 140, 300]))))
+
+
+def random_schedule(rng: random.Random, size: int) -> Schedule:
+    schedule = Schedule()
+    for _ in range(size):
+        start = rng.randrange(0, 23 * 60)
+        end = rng.randrange(start + 1, 24 * 60)
+        schedule.add(rng.choice(DAYS), random_name(rng),
+                     f"{start // 60:02d}:{start % 60:02d}", f"{end // 60:02d}:{end % 60:02d}",
+                     rng.random() < 0.5, allow_conflicts=True)
+    return schedule
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_schedule_yaml_matches_original_emitter(seed):
+    rng = random.Random(seed)
+    for round_no in range(50):
+        schedule = random_schedule(rng, rng.randrange(0, 40))
+        for edit in range(5):
+            expected = legacy_schedule_yaml(schedule.to_dict())
+            assert generate_course_schedule_yaml(schedule.to_dict()) == expected, (round_no, edit)
+            # The cached per-day fragments must stay identical across edits
+            assert schedule.to_yaml() == expected, (round_no, edit)
+            ids = [entry_id for day in schedule.days for entry_id, _ in schedule.entries(day)]
+            if ids and rng.random() < 0.5:
+                schedule.remove(rng.choice(ids))
+            else:
+                schedule.add(rng.choice(DAYS), random_name(rng), '23:58', '23:59', True, allow_conflicts=True)
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_xpath_yaml_matches_original_emitter(seed):
+    rng = random.Random(seed)
+    for round_no in range(50):
+        schedule = random_schedule(rng, rng.randrange(0, 40))
+        xpath_values = {course: rng.choice(['', '//a[1]', DEFAULT_XPATH + '[2]', 'x' * 300])
+                        for course in schedule.courses}
+        assert (generate_xpath_yaml(schedule.courses, xpath_values)
+                == legacy_xpath_yaml(schedule.courses, xpath_values)), round_no
+
+
+@pytest.mark.parametrize('name', NAMES)
+def test_tricky_course_names_match_original_emitter(name):
+    schedule = Schedule()
+    schedule.add('Monday', name, '09:00', '10:00', True)
+    schedule.add('Friday', name, '23:58', '23:59', False)
+    assert schedule.to_yaml() == legacy_schedule_yaml(schedule.to_dict())
+    assert generate_xpath_yaml(schedule.courses, {}) == legacy_xpath_yaml(schedule.courses, {})
@@ -105,89 +105,34 @@
 
 #     return yaml.dump(url_data, sort_keys=False, allow_unicode=True)
 
-import streamlit as st
-from datetime import datetime
-import yaml
-from typing import Dict, List, Union
-
-def validate_time_format(time_str: str) -> Union[str, bool]:
-    """
-    Validate and standardize time format.
-
-    Args:
-        time_str: Time string to validate
-
-    Returns:
-        Standardized time string in HH:MM format if valid, False otherwise
-    """
-    try:
-        # Try parsing with different formats
-        for fmt in ["%H:%M", "%I:%M", "%H:%M:%S", "%I:%M:%S"]:
-            try:
-                parsed_time = datetime.strptime(time_str, fmt)
-                return parsed_time.strftime("%H:%M")
-            except ValueError:
-                continue
-        return False
-    except:
-        return False
-
-def boolean_representer(dumper: yaml.Dumper, data: bool) -> yaml.ScalarNode:
-    """
-    Custom representer for boolean values to maintain Python capitalization.
-
-    Args:
-        dumper: YAML dumper instance
-        data: Boolean value to represent
-
-    Returns:
-        YAML scalar node with proper capitalization
-    """
-    if data:
-        return dumper.represent_scalar('tag:yaml.org,2002:bool', 'True')
-    return dumper.represent_scalar('tag:yaml.org,2002:bool', 'False')
-
-def generate_course_schedule_yaml(schedule_data: Dict[str, List[Dict]]) -> str:
-    """
-    Generate YAML string for course schedule.
-
-    Args:
-        schedule_data: Dictionary containing schedule information
-
-    Returns:
-        Formatted YAML string
-    """
-    # Add custom boolean representer
-    yaml.add_representer(bool, boolean_representer)
-
-    # Convert the data to proper format
-    formatted_data = {}
-    for day, courses in schedule_data.items():
-        if courses:  # Only include days with courses
-            formatted_data[day] = []
-            for course in courses:
-                formatted_data[day].append({
-                    'course': course['name'],
-                    'start_time': course['start_time'],
-                    'end_time': course['end_time'],
-                    'send_message': course['send_message']  # Will now use True/False capitalization
-                })
-
-    return yaml.dump(formatted_data, sort_keys=False, allow_unicode=True)
-
-def generate_xpath_yaml(courses: List[str]) -> str:
+# Validation and YAML generation live in core.py, which has no Streamlit
+# dependency. This module keeps the original names for the app.
+from typing import Dict, List, Optional
+
+from core import (
+    DAYS,
+    DEFAULT_XPATH,
+    boolean_representer,
+    generate_course_schedule_yaml,
+    parse_bool,
+    validate_time_format,
+)
+from core import generate_xpath_yaml as _generate_xpath_yaml
+
+def generate_xpath_yaml(courses: List[str], xpath_values: Optional[Dict[str, str]] = None) -> str:
     """
     Generate YAML string for course xpaths.
 
     Args:
         courses: List of course names
+        xpath_values: Mapping of course name to XPath, defaults to the
+            values stored in the Streamlit session
 
     Returns:
         Formatted YAML string
     """
-    xpath_data = {}
-    for course in courses:
-        xpath_value = st.session_state.xpath_values.get(course, '')
-        xpath_data[course] = xpath_value if xpath_value else '/html/body/div[4]/div[2]/div/div/section/div/div/div/aside/section[2]/div/div/div[1]/div[2]/div/div/div[1]/div/div/div[3]/div[1]/div/div[1]/a/span[3]'
+    if xpath_values is None:
+        import streamlit as st
+        xpath_values = st.session_state.xpath_values
 
-    return yaml.dump(xpath_data, sort_keys=False, allow_unicode=True)
\ No newline at end of file
+    return _generate_xpath_yaml(courses, xpath_values)
@@ -0,0 +1,359 @@
+"""
+Hot reload of generated schedule and XPath files into a running scheduler.
+
+Watches a bundles directory laid out as batch.py writes it (one
+sub-directory per user holding ``course_details.yaml`` and
+``course_xpath.yaml``). A file is only looked at again when its mtime,
+size or inode changed, and only parsed when its content hash changed too,
+so a rewrite with identical content costs a stat and a hash. A changed
+schedule is diffed against the rows loaded before and only the added and
+removed entries are applied to the Scheduler; a changed XPath file only
+updates the courses whose selector changed.
+
+Changes are found by polling, or on Linux through inotify (via ctypes,
+no extra dependency), which wakes the watcher as soon as a file is
+written; polling stays on as a fallback at a slower interval. The
+bundles directory is watched too, so a new user's directory is picked up
+(and watched) as soon as it is created.
+"""
+import asyncio
+import ctypes
+import ctypes.util
+import hashlib
+import logging
+import os
+import struct
+import threading
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from importer import ImportResult, parse_schedule_yaml, parse_xpath_yaml
+from scheduler import Scheduler, row_key
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_FILE = 'course_details.yaml'
+XPATH_FILE = 'course_xpath.yaml'
+
+
+class FileChange(NamedTuple):
+    """What one changed file did to the loaded state."""
+    user: str
+    name: str
+    # Rows for schedules, courses for XPath files
+    added: int
+    removed: int
+    # Days (schedules) or courses (XPath files) that changed
+    touched: Tuple[str, ...]
+    errors: Tuple[str, ...] = ()
+
+
+class _Found(NamedTuple):
+    """A bundle file that changed, as read by BundleWatcher.scan()."""
+    user: str
+    name: str
+    path: str
+    # (stat key, content hash, parse result), or None if the file is gone
+    new: Optional[Tuple[Tuple[int, int, int], bytes, ImportResult]]
+
+
+class _Loaded(NamedTuple):
+    stat: Tuple[int, int, int]
+    digest: bytes
+    # Counter of row_key tuples, or course -> XPath mapping
+    content: object
+
+
+def content_hash(data: bytes) -> bytes:
+    """Stable hash of a file's content, used to skip parsing unchanged files."""
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def diff_rows(old: Counter, new: Counter) -> Tuple[List[tuple], List[tuple]]:
+    """
+    Compare two multisets of schedule rows.
+
+    Returns:
+        (added rows, removed rows); a row whose send_message or recurrence
+        changed appears in both
+    """
+    return list((new - old).elements()), list((old - new).elements())
+
+
+def diff_xpaths(old: Dict[str, str], new: Dict[str, str]) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Compare two course -> XPath mappings.
+
+    Returns:
+        (courses added or changed with their new XPath, courses removed)
+    """
+    changed = {course: xpath for course, xpath in new.items() if old.get(course) != xpath}
+    return changed, [course for course in old if course not in new]
+
+
+def _parse(name: str, data: bytes, source: str) -> ImportResult:
+    parse = parse_schedule_yaml if name == SCHEDULE_FILE else parse_xpath_yaml
+    try:
+        return parse(data.decode('utf-8', errors='replace'), source)
+    except Exception as e:
+        # Typically a file caught half-written
+        result = ImportResult()
+        result.errors.append(f"{source}: not valid YAML ({e})")
+        return result
+
+
+class BundleWatcher:
+    """
+    Keeps a Scheduler and per-user selector tables in step with bundle files.
+
+    Args:
+        bundles_dir: Directory with one sub-directory per user
+        scheduler: Scheduler to apply schedule changes to
+        selectors: user -> course -> XPath tables to update in place
+        interval: Seconds between polls; with inotify this is only a fallback
+        use_inotify: Use inotify when available (Linux); False forces polling
+    """
+
+    def __init__(self, bundles_dir: str, scheduler: Optional[Scheduler] = None,
+                 selectors: Optional[Dict[str, Dict[str, str]]] = None, interval: float = 1.0,
+                 use_inotify: bool = True):
+        self.bundles_dir = bundles_dir
+        self.scheduler = scheduler
+        self.selectors: Dict[str, Dict[str, str]] = selectors if selectors is not None else {}
+        self.interval = interval
+        self._loaded: Dict[str, _Loaded] = {}
+        self._inotify = _Inotify.create() if use_inotify else None
+        self._stop: Optional[asyncio.Event] = None
+        self.stats = Counter()
+
+    def poll(self) -> List[FileChange]:
+        """
+        Check every bundle file once and apply what changed.
+
+        Returns:
+            One FileChange per file whose parsed content changed or that
+            could not be applied
+        """
+        return self.apply(self.scan())
+
+    def scan(self) -> List[_Found]:
+        """
+        Read and parse every bundle file that changed, without applying it.
+
+        Only does file I/O and parsing, so run() calls it in a worker thread
+        and applies the result on the event loop. A scan must be applied
+        before the next one starts.
+
+        Returns:
+            Changed files for apply()
+        """
+        found = []
+        seen = set()
+        if self._inotify is not None:
+            # User directories created later show up as events on the bundles directory
+            self._inotify.watch(self.bundles_dir)
+        try:
+            users = sorted(entry.name for entry in os.scandir(self.bundles_dir) if entry.is_dir())
+        except FileNotFoundError:
+            users = []
+        for user in users:
+            directory = os.path.join(self.bundles_dir, user)
+            if self._inotify is not None:
+                self._inotify.watch(directory)
+            for name in (SCHEDULE_FILE, XPATH_FILE):
+                path = os.path.join(directory, name)
+                seen.add(path)
+                item = self._check(user, name, path)
+                if item is not None:
+                    found.append(item)
+        for path in [path for path in self._loaded if path not in seen]:
+            found.append(_Found(os.path.basename(os.path.dirname(path)), os.path.basename(path), path, None))
+        return found
+
+    def apply(self, found: List[_Found]) -> List[FileChange]:
+        """
+        Apply scanned changes to the scheduler and selector tables.
+
+        Args:
+            found: Result of scan()
+
+        Returns:
+            One FileChange per file
+        """
+        return [self._apply(*item) for item in found]
+
+    def _check(self, user: str, name: str, path: str) -> Optional[_Found]:
+        loaded = self._loaded.get(path)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return _Found(user, name, path, None) if loaded is not None else None
+        key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if loaded is not None and loaded.stat == key:
+            self.stats['unchanged'] += 1
+            return None
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            # Replaced between stat and open; the next poll sees the new file
+            return None
+        digest = content_hash(data)
+        if loaded is not None and loaded.digest == digest:
+            self._loaded[path] = loaded._replace(stat=key)
+            self.stats['same_content'] += 1
+            return None
+        self.stats['parsed'] += 1
+        return _Found(user, name, path, (key, digest, _parse(name, data, f"{user}: {name}")))
+
+    def _apply(self, user: str, name: str, path: str,
+               new: Optional[Tuple[Tuple[int, int, int], bytes, ImportResult]]) -> FileChange:
+        loaded = self._loaded.get(path)
+        result = None
+        if new is not None:
+            result = new[2]
+            if result.errors:
+                # Keep the last good state, but remember the hash so the
+                # broken file is not parsed again until it changes
+                empty = Counter() if name == SCHEDULE_FILE else {}
+                self._loaded[path] = _Loaded(new[0], new[1], loaded.content if loaded is not None else empty)
+                return FileChange(user, name, 0, 0, (), tuple(result.errors))
+
+        if name == SCHEDULE_FILE:
+            content = Counter(row_key(row) for row in result.rows) if result is not None else Counter()
+            old = loaded.content if loaded is not None else Counter()
+            added, removed = diff_rows(old, content)
+            if self.scheduler is not None:
+                if new is None:
+                    self.scheduler.remove(user)
+                else:
+                    self.scheduler.update_rows(user, added, removed)
+            touched = tuple(sorted({row[0] for row in added + removed}))
+            count = (len(added), len(removed))
+        else:
+            content = result.xpath_values if result is not None else {}
+            old = loaded.content if loaded is not None else {}
+            changed, removed = diff_xpaths(old, content)
+            table = self.selectors.setdefault(user, {})
+            table.update(changed)
+            for course in removed:
+                table.pop(course, None)
+            if not table:
+                self.selectors.pop(user, None)
+            touched = tuple(sorted(set(changed) | set(removed)))
+            count = (len(changed), len(removed))
+
+        if new is None:
+            self._loaded.pop(path, None)
+        else:
+            self._loaded[path] = _Loaded(new[0], new[1], content)
+        return FileChange(user, name, count[0], count[1], touched)
+
+    async def run(self) -> None:
+        """Poll until stop() is called, waking early on inotify events."""
+        self._stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+        if self._inotify is not None:
+            loop.add_reader(self._inotify.fd, lambda: (self._inotify.drain(), wake.set()))
+        # With inotify, polling only catches what the kernel queue dropped
+        interval = self.interval * 30 if self._inotify is not None else self.interval
+        try:
+            while not self._stop.is_set():
+                # Reading and parsing stay off the loop so due events fire on time
+                found = await loop.run_in_executor(None, self.scan)
+                for change in self.apply(found):
+                    if change.errors:
+                        logger.error("Not reloading %s/%s:\n%s", change.user, change.name, '\n'.join(change.errors))
+                    else:
+                        logger.info("Reloaded %s/%s: +%d -%d (%s)", change.user, change.name,
+                                    change.added, change.removed, ', '.join(change.touched) or 'no changes')
+                wake.clear()
+                waiters = {asyncio.ensure_future(wake.wait()), asyncio.ensure_future(self._stop.wait())}
+                done, pending = await asyncio.wait(waiters, timeout=interval, return_when=asyncio.FIRST_COMPLETED)
+                for waiter in pending:
+                    waiter.cancel()
+                if wake.is_set():
+                    # Let a burst of writes (temp file, rename) settle before reading
+                    await asyncio.sleep(0.05)
+        finally:
+            if self._inotify is not None:
+                loop.remove_reader(self._inotify.fd)
+
+    def stop(self) -> None:
+        if self._stop is not None:
+            self._stop.set()
+
+    def close(self) -> None:
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+
+# inotify(7) flags
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_IGNORED = 0x00008000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT = struct.Struct('iIII')
+
+
+class _Inotify:
+    """Minimal non-blocking inotify wrapper; events only wake the poller."""
+
+    def __init__(self, libc, fd: int):
+        self._libc = libc
+        self.fd = fd
+        # directory -> watch descriptor, and back
+        self._watched: Dict[str, int] = {}
+        self._paths: Dict[int, str] = {}
+        # watch() runs in the scan thread, drain() on the event loop
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls) -> Optional['_Inotify']:
+        """Return a watcher, or None where inotify is not available."""
+        name = ctypes.util.find_library('c')
+        if not name:
+            return None
+        try:
+            libc = ctypes.CDLL(name, use_errno=True)
+            fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        return cls(libc, fd) if fd >= 0 else None
+
+    def watch(self, directory: str) -> None:
+        with self._lock:
+            if directory not in self._watched:
+                wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), _MASK)
+                if wd >= 0:
+                    self._watched[directory] = wd
+                    self._paths[wd] = directory
+
+    def drain(self) -> None:
+        # Only the fact that something happened matters, the poll does the rest;
+        # watches the kernel dropped (directory deleted) are forgotten so a
+        # directory created again under the same name is watched again
+        try:
+            while True:
+                data = os.read(self.fd, 64 * (_EVENT.size + 256))
+                if not data:
+                    break
+                offset = 0
+                while offset < len(data):
+                    wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                    offset += _EVENT.size + length
+                    if mask & _IN_IGNORED:
+                        with self._lock:
+                            self._watched.pop(self._paths.pop(wd, None), None)
+        except BlockingIOError:
+            pass
+
+    def close(self) -> None:
+        os.close(self.fd)
@@ -0,0 +1,304 @@
+"""
+Offline XPath checks against saved LMS page snapshots.
+
+A snapshot is parsed once and every course's XPath is evaluated against
+that one tree. Compiled selectors are cached by XPath string, so the same
+path is only compiled once per process however many sessions use it.
+``lxml`` is imported lazily; everything else in the app works without it.
+"""
+import re
+import time
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Union
+
+if TYPE_CHECKING:
+    from lxml import etree
+
+
+class XPathCheck(NamedTuple):
+    """Result of evaluating one course's XPath against a snapshot."""
+    course: str
+    xpath: str
+    matches: int
+    # Text of the first matched node, for eyeballing the right link was found
+    text: str
+    seconds: float
+    error: Optional[str] = None
+
+
+@lru_cache(maxsize=4096)
+def compile_xpath(xpath: str) -> 'etree.XPath':
+    """
+    Compile an XPath once; later calls with the same string hit the cache.
+
+    Raises:
+        ValueError: If the XPath is not valid
+    """
+    from lxml import etree
+
+    try:
+        return etree.XPath(xpath)
+    except etree.XPathSyntaxError as e:
+        raise ValueError(f"invalid XPath: {e}") from None
+
+
+def parse_snapshot(html: Union[str, bytes]) -> 'etree._Element':
+    """
+    Parse a saved HTML page into a tree that XPaths can be evaluated against.
+
+    Args:
+        html: Page source as saved by the browser
+
+    Returns:
+        Root element of the document
+    """
+    import lxml.html
+
+    if isinstance(html, str):
+        # lxml rejects str input that carries an XML encoding declaration
+        html = html.encode('utf-8')
+    return lxml.html.document_fromstring(html)
+
+
+# XPath's normalize-space() only collapses ASCII whitespace. Pages also
+# space words with these (&nbsp;, thin and ideographic spaces), which text
+# predicates translate() to plain spaces first
+UNICODE_SPACES = '\u00a0\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a\u202f\u205f\u3000'
+_TO_SPACE = str.maketrans(UNICODE_SPACES, ' ' * len(UNICODE_SPACES))
+_UNICODE_SPACE_SET = frozenset(UNICODE_SPACES)
+_XPATH_SPACE = re.compile('[ \t\r\n]+')
+
+
+def normalize_space(text: str) -> str:
+    """Collapse whitespace the way normalize-space(translate(., UNICODE_SPACES, ...)) does."""
+    return _XPATH_SPACE.sub(' ', text.translate(_TO_SPACE)).strip(' ')
+
+
+def node_text(node) -> str:
+    """Return the whitespace-normalized text of a matched node or value."""
+    if isinstance(node, str):
+        return normalize_space(node)
+    if hasattr(node, 'text_content'):
+        return normalize_space(node.text_content())
+    return str(node)
+
+
+def check_xpaths(root: 'etree._Element', xpaths: Dict[str, str]) -> List[XPathCheck]:
+    """
+    Evaluate every course's XPath against one parsed snapshot.
+
+    Args:
+        root: Tree returned by parse_snapshot
+        xpaths: Mapping of course name to XPath
+
+    Returns:
+        One XPathCheck per course, in mapping order
+    """
+    from lxml import etree
+
+    results = []
+    for course, xpath in xpaths.items():
+        start = time.perf_counter()
+        try:
+            selector = compile_xpath(xpath)
+            # Only evaluation is timed; compiling happens once per XPath string
+            start = time.perf_counter()
+            found = selector(root)
+        except (ValueError, etree.XPathEvalError) as e:
+            results.append(XPathCheck(course, xpath, 0, '', time.perf_counter() - start, str(e)))
+            continue
+        elapsed = time.perf_counter() - start
+        # Expressions like count() return a scalar instead of a node list
+        if not isinstance(found, list):
+            found = [found]
+        results.append(XPathCheck(course, xpath, len(found), node_text(found[0]) if found else '', elapsed))
+    return results
+
+
+# Link attributes that identify a course link, most stable first
+_ANCHOR_ATTRIBUTES = ('title', 'aria-label', 'href')
+
+
+class XPathProposal(NamedTuple):
+    """A derived XPath for a course link."""
+    course: str
+    xpath: str
+    # Text of the link the XPath selects
+    text: str
+    # How the XPath is anchored: id, scoped-text, scoped-attribute, text, attribute or absolute
+    strategy: str
+
+
+def xpath_literal(value: str) -> str:
+    """Quote a string as an XPath 1.0 literal, using concat() if it holds both quote kinds."""
+    if '"' not in value:
+        return f'"{value}"'
+    if "'" not in value:
+        return f"'{value}'"
+    return 'concat(' + ', \'"\', '.join(f'"{part}"' for part in value.split('"')) + ')'
+
+
+class SnapshotIndex:
+    """
+    Lookup tables for one parsed snapshot, built in a single pass.
+
+    Maps normalized link text to links, counts link attribute values and
+    element ids, so candidate XPaths can be checked for uniqueness without
+    evaluating them against the whole page.
+
+    Args:
+        root: Tree returned by parse_snapshot
+    """
+
+    def __init__(self, root: 'etree._Element'):
+        self.root = root
+        self.links_by_text: Dict[str, List] = {}
+        # Normalized link text -> the UNICODE_SPACES its links hold, if any
+        self.text_spaces: Dict[str, str] = {}
+        self.attribute_counts: Dict[tuple, int] = {}
+        self.id_counts: Dict[str, int] = {}
+        self._scope_sizes: Dict = {}
+        self.size = 0
+        for element in root.iter():
+            self.size += 1
+            if not isinstance(element.tag, str):
+                continue  # comments and processing instructions
+            element_id = element.get('id')
+            if element_id:
+                self.id_counts[element_id] = self.id_counts.get(element_id, 0) + 1
+            if element.tag == 'a':
+                raw = element.text_content()
+                text = normalize_space(raw)
+                self.links_by_text.setdefault(text, []).append(element)
+                spaces = _UNICODE_SPACE_SET.intersection(raw)
+                if spaces:
+                    self.text_spaces[text] = ''.join(sorted(spaces.union(self.text_spaces.get(text, ''))))
+                for attribute in _ANCHOR_ATTRIBUTES:
+                    value = element.get(attribute)
+                    if value:
+                        key = (attribute, value)
+                        self.attribute_counts[key] = self.attribute_counts.get(key, 0) + 1
+        # Link texts by the words they hold, for links whose text contains a course name
+        self.texts_by_word: Dict[str, List[str]] = {}
+        for text in self.links_by_text:
+            for word in set(text.split(' ')) if text else ():
+                self.texts_by_word.setdefault(word, []).append(text)
+
+    def find_links(self, course: str) -> List[tuple]:
+        """
+        Return (link, exact) for every link whose text is the course name,
+        or contains it, exact matches first.
+
+        Exact matches come straight from the text index and links containing
+        the name from the word index, so neither scans the page's links.
+        Only a course with no such link falls back to a substring scan,
+        which also finds names inside longer words.
+        """
+        course = normalize_space(course)
+        found = [(link, True) for link in self.links_by_text.get(course, ())]
+        if course:
+            # Only texts holding the name's rarest word can contain the name
+            texts = min((self.texts_by_word.get(word, ()) for word in course.split(' ')), key=len)
+            found.extend((link, False) for text in texts if text != course and course in text
+                         for link in self.links_by_text[text])
+        if found:
+            return found
+        return [(link, False) for text, links in self.links_by_text.items() if course in text for link in links]
+
+    def unique_id(self, element) -> Optional[str]:
+        element_id = element.get('id')
+        return element_id if element_id and self.id_counts.get(element_id) == 1 else None
+
+    def scope(self, link) -> tuple:
+        """
+        Return the closest ancestor with a unique id and the size of its
+        subtree, or (None, page size) if there is none.
+        """
+        scope = next((ancestor for ancestor in link.iterancestors() if self.unique_id(ancestor)), None)
+        if scope is None:
+            return None, self.size
+        if scope not in self._scope_sizes:
+            self._scope_sizes[scope] = sum(1 for _ in scope.iter())
+        return scope, self._scope_sizes[scope]
+
+    def propose(self, course: str) -> Optional[XPathProposal]:
+        """
+        Derive the XPath for a course's link.
+
+        Of the links naming the course, the one whose closest uniquely-id'd
+        ancestor has the smallest subtree is used. Candidates are tried in
+        tiers, taking the shortest unique one in the first tier that has
+        any: the link's own id; a text or attribute match scoped under that
+        ancestor; the same match over the whole page; and finally the
+        absolute path. id() lookups use libxml2's id table, so scoped XPaths
+        only scan the ancestor's subtree instead of the whole page.
+
+        Returns:
+            The proposal, or None if no link mentions the course
+        """
+        candidates = self.find_links(course)
+        if not candidates:
+            return None
+        # A course often has several links (navigation, course card); the one
+        # under the smallest id-anchored subtree gives the cheapest XPath
+        scopes = [self.scope(link) for link, _ in candidates]
+        best = min(range(len(candidates)), key=lambda i: (scopes[i][1], not candidates[i][1], i))
+        (link, exact), (scope, _) = candidates[best], scopes[best]
+        text = node_text(link)
+        # normalize-space() alone would not see these links' Unicode spaces
+        spaces = self.text_spaces.get(text)
+        space = f"normalize-space(translate(., '{spaces}', '{' ' * len(spaces)}'))" if spaces else 'normalize-space()'
+        text_predicate = (f"{space}={xpath_literal(text)}" if exact
+                          else f"contains({space}, {xpath_literal(normalize_space(course))})")
+        predicates = [('text', text_predicate, len(self.links_by_text[text]) == 1 if exact else None)]
+        for attribute in _ANCHOR_ATTRIBUTES:
+            value = link.get(attribute)
+            if value:
+                predicates.append(('attribute', f"@{attribute}={xpath_literal(value)}",
+                                   self.attribute_counts[(attribute, value)] == 1))
+
+        link_id = self.unique_id(link)
+        if link_id:
+            return XPathProposal(course, f"id({xpath_literal(link_id)})", text, 'id')
+
+        if scope is not None:
+            prefix = f"id({xpath_literal(scope.get('id'))})//a"
+            scoped = [(f"{prefix}[{predicate}]", f"scoped-{strategy}") for strategy, predicate, _ in predicates]
+            found = self._shortest_unique(scoped, link, scope)
+            if found:
+                return XPathProposal(course, found[0], text, found[1])
+
+        # Global candidates are only evaluated when the index says they are unique
+        page = [(f"//a[{predicate}]", strategy) for strategy, predicate, unique in predicates if unique is not False]
+        found = self._shortest_unique(page, link, self.root)
+        if found:
+            return XPathProposal(course, found[0], text, found[1])
+        return XPathProposal(course, link.getroottree().getpath(link), text, 'absolute')
+
+    def _shortest_unique(self, candidates: List[tuple], link, context) -> Optional[tuple]:
+        for xpath, strategy in sorted(candidates, key=lambda candidate: len(candidate[0])):
+            # Evaluated from the scope element so only its subtree is searched
+            relative = xpath if context is self.root else '.' + xpath[xpath.index('//'):]
+            if compile_xpath(relative)(context) == [link]:
+                return xpath, strategy
+        return None
+
+
+def derive_xpaths(root: 'etree._Element', courses: List[str]) -> Dict[str, XPathProposal]:
+    """
+    Propose a short XPath for every course link found in a snapshot.
+
+    Args:
+        root: Tree returned by parse_snapshot
+        courses: Course names to look for
+
+    Returns:
+        Mapping of course name to proposal; courses without a link are left out
+    """
+    index = SnapshotIndex(root)
+    proposals = {}
+    for course in courses:
+        proposal = index.propose(course)
+        if proposal is not None:
+            proposals[course] = proposal
+    return proposals